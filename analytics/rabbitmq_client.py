@@ -1,20 +1,38 @@
+import functools
+import importlib
 import json
 import logging
 import os
 import time
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
-
-import pika
-from pika.exceptions import (
-    AMQPConnectionError,
-    ChannelClosedByBroker,
-    ConnectionClosedByBroker,
-    StreamLostError,
-)
+from typing import Any, Dict, Optional, Tuple, Type
+
+from monitoring.startup import lazy_import
+from monitoring.tracing import current_correlation_id
 
 logger = logging.getLogger(__name__)
 
+# pika нужен только при первой публикации — не тянем его на старте
+pika = lazy_import("pika")
+
+# Ошибки соединения, после которых публикацию стоит повторить
+_RETRYABLE_ERRORS = (
+    "AMQPConnectionError",
+    "StreamLostError",
+    "ConnectionClosedByBroker",
+    "ChannelClosedByBroker",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _retryable_errors() -> Tuple[Type[BaseException], ...]:
+    # Берём из pika.exceptions напрямую: в тестах сам pika подменяется моком.
+    # Импорт — при первой ошибке публикации, дальше кортеж из кэша
+    exceptions = importlib.import_module("pika.exceptions")
+    return tuple(getattr(exceptions, name) for name in _RETRYABLE_ERRORS) + (
+        ConnectionResetError,
+    )
+
 
 class RabbitMQClient:
     def __init__(self):
@@ -29,7 +47,7 @@ class RabbitMQClient:
 
         self._queues_args = {"x-message-ttl": 86_400_000}  # 24h
 
-    def _params(self) -> pika.ConnectionParameters:
+    def _params(self) -> "pika.ConnectionParameters":
         return pika.ConnectionParameters(
             host=self.host,
             port=self.port,
@@ -113,13 +131,7 @@ class RabbitMQClient:
             try:
                 self._publish_once(routing_key, message)
                 return
-            except (
-                AMQPConnectionError,
-                StreamLostError,
-                ConnectionClosedByBroker,
-                ChannelClosedByBroker,
-                ConnectionResetError,
-            ) as e:
+            except _retryable_errors() as e:
                 logger.warning(
                     "Publish failed (attempt %s/%s): %s",
                     attempts,
@@ -138,6 +150,9 @@ class RabbitMQClient:
 
     def _build_message(self, base: Dict[str, Any]) -> Dict[str, Any]:
         m = {"timestamp": datetime.now(timezone.utc).isoformat()}
+        correlation_id = current_correlation_id()
+        if correlation_id:
+            m["correlation_id"] = correlation_id
         m.update(base)
         return m
 
@@ -167,6 +182,11 @@ class RabbitMQClient:
         success: bool,
         video_size: Optional[int] = None,
         processing_time: Optional[float] = None,
+        stages: Optional[Dict[str, Any]] = None,
+        downloaded_bytes: Optional[int] = None,
+        encoded_bytes: Optional[int] = None,
+        compressed: Optional[bool] = None,
+        format_id: Optional[str] = None,
     ):
         try:
             self._publish_with_retries(
@@ -178,6 +198,11 @@ class RabbitMQClient:
                         "success": success,
                         "video_size": video_size,
                         "processing_time": processing_time,
+                        "stages": stages,
+                        "downloaded_bytes": downloaded_bytes,
+                        "encoded_bytes": encoded_bytes,
+                        "compressed": compressed,
+                        "format_id": format_id,
                     }
                 ),
             )
@@ -1,5 +1,7 @@
 import logging
-from typing import Optional
+from typing import Any, Dict, Optional
+
+from providers.registry import PLATFORMS
 
 from .rabbitmq_client import rabbitmq_client
 
@@ -9,15 +11,7 @@ logger = logging.getLogger(__name__)
 class StatsCollector:
 
     # Список известных платформ, для которых мы отслеживаем ошибки
-    KNOWN_PLATFORMS = {
-        "instagram",
-        "tiktok",
-        "youtube",
-        "likee",
-        "facebook",
-        "rutube",
-        "reddit",
-    }
+    KNOWN_PLATFORMS = PLATFORMS
 
     def __init__(self):
         self.rabbitmq = rabbitmq_client
@@ -28,6 +22,18 @@ class StatsCollector:
         logger.debug(f"Skipping stats for unknown platform: {platform}")
         return False
 
+    def _breakdown_fields(self, breakdown: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Раскладывает разбивку по стадиям в поля provider_stats"""
+        if not breakdown:
+            return {}
+        return {
+            "stages": breakdown.get("stages"),
+            "downloaded_bytes": breakdown.get("downloaded_bytes"),
+            "encoded_bytes": breakdown.get("encoded_bytes"),
+            "compressed": breakdown.get("compressed"),
+            "format_id": breakdown.get("format_id"),
+        }
+
     def _get_display_username(self, user_id: int, username: str) -> str:
         """Создает более информативный username для отображения"""
         if username:
@@ -59,6 +65,7 @@ class StatsCollector:
         platform: str,
         video_size: int,
         processing_time: float,
+        breakdown: Optional[Dict[str, Any]] = None,
     ):
         if not self._should_track_platform(platform):
             return
@@ -82,6 +89,7 @@ class StatsCollector:
                 success=True,
                 video_size=video_size,
                 processing_time=processing_time,
+                **self._breakdown_fields(breakdown),
             )
 
             logger.info(
@@ -98,6 +106,7 @@ class StatsCollector:
         platform: str,
         error_message: str,
         processing_time: Optional[float] = None,
+        breakdown: Optional[Dict[str, Any]] = None,
     ):
         # Игнорируем ошибки для неизвестных платформ
         if not self._should_track_platform(platform):
@@ -120,6 +129,7 @@ class StatsCollector:
                 action="download_failed",
                 success=False,
                 processing_time=processing_time,
+                **self._breakdown_fields(breakdown),
             )
 
             logger.info(
@@ -175,6 +185,35 @@ class StatsCollector:
         except Exception as e:
             logger.error(f"Failed to track group message: {e}")
 
+    def track_requests_shed(self, counts: Dict[str, int], estimated_wait: float):
+        try:
+            self.rabbitmq.send_bot_event(
+                "requests_shed",
+                {
+                    "private": counts.get("private", 0),
+                    "group": counts.get("group", 0),
+                    "estimated_wait": round(estimated_wait, 1),
+                },
+            )
+            logger.info(f"Tracked shed requests: {counts}")
+        except Exception as e:
+            logger.error(f"Failed to track shed requests: {e}")
+
+    def track_circuit_change(self, platform: str, old: str, new: str, failures: int):
+        try:
+            self.rabbitmq.send_bot_event(
+                "circuit_state",
+                {
+                    "platform": platform,
+                    "from": old,
+                    "to": new,
+                    "failures": failures,
+                },
+            )
+            logger.info(f"Tracked circuit change: {platform} {old} → {new}")
+        except Exception as e:
+            logger.error(f"Failed to track circuit change: {e}")
+
     def track_user_added(self, user_id: int, username: str):
         try:
             self.rabbitmq.send_bot_event(
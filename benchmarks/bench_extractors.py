@@ -0,0 +1,120 @@
+"""
+Бенчмарк накладных расходов извлечения в yt-dlp: с перебором всех
+экстракторов и с явным ie_key + allowed_extractors (см. BaseProvider).
+
+    python benchmarks/bench_extractors.py [iterations]
+
+Сеть не нужна: извлечение идёт с локального HTTP-сервера (экстрактор
+Generic), поэтому разница — это инициализация YoutubeDL и выбор экстрактора.
+Отдельно замеряется чистый выбор экстрактора для ссылок платформ.
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp  # noqa: E402
+
+from handlers.downloader import Downloader  # noqa: E402
+from providers.base import allowed_extractors, extractor_class  # noqa: E402
+
+VIDEO = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 1024
+
+PLATFORM_URLS = [
+    ("tiktok", ("video", "7301234567890")),
+    ("tiktok", ("short", "ZMabc")),
+    ("instagram", ("reel", "ABC123")),
+    ("youtube", ("watch", "dQw4w9WgXcQ")),
+    ("facebook", ("reel", "123456789")),
+    ("reddit", ("post", "abc123")),
+]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(VIDEO)))
+        self.end_headers()
+
+    def do_GET(self):  # noqa: N802
+        self.do_HEAD()
+        self.wfile.write(VIDEO)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def timed(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+    base_opts = {"quiet": True, "no_warnings": True, "logger": None}
+
+    def scan():
+        with yt_dlp.YoutubeDL(dict(base_opts)) as ydl:
+            ydl.extract_info(url, download=False)
+
+    def direct():
+        opts = dict(base_opts, allowed_extractors=allowed_extractors(("Generic",)))
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            ydl.extract_info(url, download=False, ie_key="Generic")
+
+    # Прогрев: импорт ленивых экстракторов и компиляция регулярок
+    scan()
+    direct()
+
+    full = timed(scan, iterations)
+    forced = timed(direct, iterations)
+    print(f"extract_info, all extractors:  {full * 1000:.1f} ms/request")
+    print(f"extract_info, forced ie_key:   {forced * 1000:.1f} ms/request")
+    print(f"speedup:                       {full / forced:.1f}x")
+
+    # Чистый выбор экстрактора для ссылок платформ
+    providers = {p.platform: p for p in Downloader().downloaders}
+    urls = [
+        (providers[name], providers[name]._build_url(*ref))
+        for name, ref in PLATFORM_URLS
+    ]
+    ies = list(yt_dlp.YoutubeDL(dict(base_opts))._ies.values())
+
+    def scan_dispatch():
+        for _, u in urls:
+            next(ie for ie in ies if ie.suitable(u))
+
+    def direct_dispatch():
+        for provider, u in urls:
+            extractor_class(provider.ytdlp_ie_key(u)).suitable(u)
+
+    scan_dispatch()
+    direct_dispatch()
+    n = iterations * 10
+    per_url = 1e6 / len(urls)
+    print(
+        f"dispatch, scan:                {timed(scan_dispatch, n) * per_url:.1f} µs/url"
+    )
+    print(
+        f"dispatch, ie_key:              {timed(direct_dispatch, n) * per_url:.1f} µs/url"
+    )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    main()
@@ -0,0 +1,84 @@
+"""
+Микробенчмарк маршрутизации сообщений: стоимость выбора провайдера и
+извлечения (kind, ident) на одно сообщение.
+
+    python benchmarks/bench_routing.py [iterations]
+
+Сравнивает индекс по хостам (Downloader.route) с прежней схемой:
+перебор провайдеров с urlparse + re.search по строковым шаблонам
+и повторный проход extract_id.
+"""
+
+import os
+import re
+import sys
+import timeit
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handlers.downloader import Downloader  # noqa: E402
+
+URLS = [
+    "https://www.instagram.com/reel/XYZ789/",
+    "https://www.tiktok.com/@user/video/1234567890",
+    "https://vm.tiktok.com/ABC123/",
+    "https://youtu.be/ABC123",
+    "https://likee.video/@user/video/123456789",
+    "https://fb.watch/ABC123DEF/",
+    "https://rutube.ru/shorts/cea63c15281278af170cdaec2115cf87",
+    "https://www.reddit.com/r/videos/comments/abc123/title/",
+    "https://example.com/some/page",
+    "just some chat message without links",
+]
+
+
+def legacy_route(providers, url):
+    for provider in providers:
+        try:
+            host = (urlparse(url).netloc or "").lower()
+            if not any(host.endswith(h) for h in provider.HOSTS):
+                continue
+            clean = url.split("?", 1)[0].split("#", 1)[0]
+            if not any(
+                re.search(p, clean, flags=re.IGNORECASE) for _, p in provider.PATTERNS
+            ):
+                continue
+        except Exception:
+            continue
+        clean = url.split("?", 1)[0].split("#", 1)[0]
+        for kind, pattern in provider.PATTERNS:
+            m = re.search(pattern, clean, flags=re.IGNORECASE)
+            if m:
+                return provider, (kind, m.group(1))
+    return None, None
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    downloader = Downloader()
+    providers = downloader.downloaders
+
+    for url in URLS:
+        new = downloader.route(url)
+        old = legacy_route(providers, url)
+        assert (new[0], new[1]) == (old[0], old[1]), url
+
+    legacy = timeit.timeit(
+        lambda: [legacy_route(providers, u) for u in URLS], number=iterations
+    )
+    indexed = timeit.timeit(
+        lambda: [downloader.route(u) for u in URLS], number=iterations
+    )
+    per_message = 1e6 / (iterations * len(URLS))
+    print(f"messages:        {iterations * len(URLS)}")
+    print(f"legacy scan:     {legacy * per_message:.2f} µs/message")
+    print(f"host index:      {indexed * per_message:.2f} µs/message")
+    print(f"speedup:         {legacy / indexed:.1f}x")
+
+
+if __name__ == "__main__":
+    import logging
+
+    logging.disable(logging.CRITICAL)
+    main()
@@ -0,0 +1,64 @@
+"""
+Симуляция очереди загрузок: медиана и p95 времени ответа при порядке
+«по стоимости» (SJF + aging) и при порядке поступления.
+
+    python benchmarks/bench_scheduler.py [jobs] [seed]
+
+Задачи — смесь коротких роликов и длинных видео с двухпроходным сжатием;
+стоимость выполняется как asyncio.sleep(cost * SCALE), сети и yt-dlp нет.
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handlers.scheduler import FairScheduler  # noqa: E402
+
+SCALE = 0.001  # 1 секунда стоимости = 1 мс симуляции
+
+
+def make_jobs(count: int, seed: int):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(count):
+        # 80% — короткие ролики, 20% — длинные видео со сжатием
+        cost = rng.uniform(2, 8) if rng.random() < 0.8 else rng.uniform(120, 300)
+        jobs.append((i, 1000 + i % 7, cost))
+    return jobs
+
+
+async def simulate(jobs, by_cost: bool) -> list:
+    scheduler = FairScheduler(workers=4, user_limit=4, chat_limit=4, quantum=10)
+    loop = asyncio.get_running_loop()
+    latencies = []
+
+    async def run(user_id, cost):
+        started = loop.time()
+        async with scheduler.slot(user_id, user_id, True, cost=cost if by_cost else 1):
+            await asyncio.sleep(cost * SCALE)
+        latencies.append((loop.time() - started) / SCALE)
+
+    await asyncio.gather(*(run(user_id, cost) for _, user_id, cost in jobs))
+    return latencies
+
+
+def report(name: str, latencies: list) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<14} median {statistics.median(latencies):7.1f} s   p95 {p95:7.1f} s")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    jobs = make_jobs(count, seed)
+    report("arrival order", asyncio.run(simulate(jobs, by_cost=False)))
+    report("by cost (SJF)", asyncio.run(simulate(jobs, by_cost=True)))
+
+
+if __name__ == "__main__":
+    main()
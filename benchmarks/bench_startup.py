@@ -0,0 +1,64 @@
+"""
+Время импорта при старте бота (python -X importtime import main).
+
+    python benchmarks/bench_startup.py [--json startup.json] [--top 15]
+
+Печатает общее время импорта, разбивку по пакетам и самые дорогие модули;
+с --json сохраняет сводку, чтобы сравнивать её между релизами. Отдельно
+проверяет, что тяжёлые зависимости (yt_dlp, pika) на старте не загружаются.
+"""
+
+import argparse
+import json
+import os
+import subprocess  # nosec B404 - запускаем тот же интерпретатор с фиксированными аргументами
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from monitoring.startup import import_report, parse_importtime  # noqa: E402
+
+# Модули, появление которых в sys.modules означает, что ленивый импорт сломан
+DEFERRED = ("yt_dlp.YoutubeDL", "pika.connection")
+
+PROBE = (
+    f"import sys, main; print(','.join(m for m in {DEFERRED!r} if m in sys.modules))"
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--json", help="write the summary to this file")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    env = dict(os.environ, TELEGRAM_BOT_TOKEN="0:bench", METRICS_PORT="0")
+    result = subprocess.run(  # nosec B603
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = import_report(parse_importtime(result.stderr), top=args.top)
+    report["eager_heavy_modules"] = [m for m in result.stdout.strip().split(",") if m]
+
+    print(f"total import time: {report['total_ms']} ms ({report['modules']} modules)")
+    print("by package:")
+    for name, ms in report["packages_ms"].items():
+        print(f"  {name:<28} {ms:>8.1f} ms")
+    print("slowest modules (self time):")
+    for name, ms in report["slowest_ms"].items():
+        print(f"  {name:<40} {ms:>8.1f} ms")
+    eager = report["eager_heavy_modules"]
+    print(f"deferred modules loaded at startup: {', '.join(eager) or 'none'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
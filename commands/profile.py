@@ -0,0 +1,56 @@
+import logging
+import os
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from localization.utils import t
+from monitoring.profiler import profiler, summarize
+
+logger = logging.getLogger(__name__)
+
+MAX_PROFILE_SECONDS = 300
+
+
+def get_admin_ids() -> set:
+    raw = os.getenv("ADMIN_USER_IDS", "")
+    return {int(x) for x in raw.replace(" ", "").split(",") if x.isdigit()}
+
+
+def is_admin(user) -> bool:
+    return bool(user) and user.id in get_admin_ids()
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user = update.effective_user
+    if not is_admin(user):
+        # Для остальных пользователей команды как будто не существует
+        logger.warning(f"🚫 User {user.id if user else None} tried to run /profile")
+        return
+
+    seconds = int(os.getenv("PROFILE_SECONDS", "30"))
+    if context.args and context.args[0].isdigit():
+        seconds = int(context.args[0])
+    seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+
+    if profiler.active:
+        await update.message.reply_text(t("profile_busy", user=user))
+        return
+
+    logger.info(f"🔬 Admin {user.id} started profiling for {seconds}s")
+    await update.message.reply_text(t("profile_started", user=user, seconds=seconds))
+
+    # Сессия идёт в фоне: обработчик сразу возвращается, и бот продолжает
+    # принимать сообщения — иначе профилировался бы простаивающий процесс
+    context.application.create_task(_run_session(update, seconds), update=update)
+
+
+async def _run_session(update: Update, seconds: int) -> None:
+    user = update.effective_user
+    report = await profiler.run_for(seconds)
+    if report is None:
+        await update.message.reply_text(t("profile_busy", user=user))
+        return
+
+    text = f"{t('profile_finished', user=user)}\n\n{summarize(report)}"
+    await update.message.reply_text(text[:4000])
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from handlers.scheduler import GROUP, PRIVATE, FairScheduler
+from monitoring.metrics import SHED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class Decision(NamedTuple):
+    admitted: bool
+    # Оценка ожидания в секундах и число задач впереди (0 — старт сразу)
+    wait_s: float
+    position: int
+
+
+class AdmissionController:
+    """
+    Допуск новых запросов по оценке времени ожидания в очередях.
+
+    Оценка складывается из очереди извлечения (PROBE_COST_S на задачу) и
+    очереди загрузок (стоимость в секундах). Группы отсекаются раньше
+    (ADMISSION_GROUP_MAX_WAIT_S) и молча, личные чаты — при
+    ADMISSION_MAX_WAIT_S с сообщением; 0 отключает порог. Отброшенные
+    ссылки считаются в метрике и раз в report_interval уходят в статистику
+    (run_reports), остаток — при остановке (flush(force=True)).
+    """
+
+    def __init__(
+        self,
+        probe_scheduler: FairScheduler,
+        scheduler: FairScheduler,
+        max_wait: Optional[float] = None,
+        group_max_wait: Optional[float] = None,
+        probe_cost: Optional[float] = None,
+        report_interval: float = 60.0,
+    ):
+        self.probe_scheduler = probe_scheduler
+        self.scheduler = scheduler
+        self.max_wait = (
+            max_wait
+            if max_wait is not None
+            else float(os.getenv("ADMISSION_MAX_WAIT_S", "240"))
+        )
+        self.group_max_wait = (
+            group_max_wait
+            if group_max_wait is not None
+            else float(os.getenv("ADMISSION_GROUP_MAX_WAIT_S", "90"))
+        )
+        self.probe_cost = (
+            probe_cost
+            if probe_cost is not None
+            else float(os.getenv("PROBE_COST_S", "3"))
+        )
+        self.report_interval = report_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[str, int] = {}
+        self._pending_wait = 0.0
+        self._last_report = time.monotonic()
+
+    def estimated_wait(self) -> float:
+        return (
+            self.probe_scheduler.estimated_wait() * self.probe_cost
+            + self.scheduler.estimated_wait()
+        )
+
+    def position(self) -> int:
+        busy = (
+            self.probe_scheduler.running >= self.probe_scheduler.workers
+            or self.scheduler.queued() > 0
+        )
+        if not busy:
+            return 0
+        return self.probe_scheduler.queued() + self.scheduler.queued() + 1
+
+    def admit(self, private: bool) -> Decision:
+        wait = self.estimated_wait()
+        limit = self.max_wait if private else self.group_max_wait
+        admitted = limit <= 0 or wait <= limit
+        return Decision(admitted, wait, self.position())
+
+    def shed(self, private: bool, links: int = 1, wait_s: float = 0.0) -> None:
+        """Учитывает отброшенные ссылки; в статистику они уходят через flush()"""
+        kind = PRIVATE if private else GROUP
+        SHED_REQUESTS.inc(links, kind=kind)
+        with self._lock:
+            self._pending[kind] = self._pending.get(kind, 0) + links
+            self._pending_wait = max(self._pending_wait, wait_s)
+
+    def flush(self, force: bool = False) -> Optional[Tuple[Dict[str, int], float]]:
+        """
+        Накопленные счётчики и наибольшая оценка ожидания, если прошёл
+        report_interval (или force) и было что отбрасывать, иначе None.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not self._pending:
+                return None
+            if not force and now - self._last_report < self.report_interval:
+                return None
+            counts, wait = self._pending, self._pending_wait
+            self._pending, self._pending_wait = {}, 0.0
+            self._last_report = now
+        logger.warning(f"Load shedding: {counts} links rejected")
+        return counts, wait
+
+    async def run_reports(
+        self, report: Callable[[Dict[str, int], float], None]
+    ) -> None:
+        """Раз в report_interval отдаёт накопленное в report (в рабочем потоке)"""
+        while True:
+            await asyncio.sleep(self.report_interval)
+            pending = self.flush()
+            if pending:
+                await asyncio.to_thread(report, *pending)
@@ -0,0 +1,120 @@
+import asyncio
+import os
+from typing import List, NamedTuple, Optional
+
+from telegram import InputMediaVideo, Message
+
+from handlers.downloader import Downloader, Route
+from handlers.filters import iter_message_urls
+from monitoring.stages import RequestStages
+from providers.base import platform_name
+
+# Telegram принимает в одном альбоме от 2 до 10 элементов
+MEDIA_GROUP_LIMIT = 10
+CAPTION_LIMIT = 1024
+
+
+class Link(NamedTuple):
+    """Ссылка сообщения; routed — провайдер и канонический ref, если нашлись"""
+
+    url: str
+    platform: str
+    routed: Optional[Route] = None
+
+
+def extract_links(
+    message: Message, downloader: Downloader, limit: Optional[int] = None
+) -> List[Link]:
+    """
+    Все поддерживаемые ссылки сообщения без дублей: одно и то же видео по
+    разным ссылкам (www/m., reel/p, лишние параметры) скачивается один раз.
+    Только разбор текста, без сети — короткие ссылки разворачивает
+    resolve_links. Если ссылок не нашлось, возвращаем весь текст — так
+    пользователь в личке получит обычный ответ «не найдено».
+    """
+    if limit is None:
+        limit = int(os.getenv("MAX_LINKS_PER_MESSAGE", "10"))
+
+    links: List[Link] = []
+    seen = set()
+    for url in iter_message_urls(message):
+        provider, ref = downloader.route(url)
+        if provider is None or not ref:
+            continue
+        key = provider.content_key(ref)
+        if key in seen:
+            continue
+        seen.add(key)
+        links.append(Link(url, platform_name(provider), (provider, ref)))
+        if len(links) >= limit:
+            break
+
+    if not links:
+        return [Link(message.text or "", "unknown")]
+    return links
+
+
+def resolve_links(links: List[Link], downloader: Downloader) -> List[Link]:
+    """
+    Разворачивает короткие ссылки (через кэш редиректов) и убирает дубли,
+    которые стали видны только после этого: короткая и полная ссылка на одно
+    видео. Ходит в сеть, поэтому вызывать из рабочего потока.
+    """
+    resolved: List[Link] = []
+    seen = set()
+    for link in links:
+        if link.routed is None:
+            resolved.append(link)
+            continue
+        provider, ref = link.routed
+        ref = downloader.canonical_ref(provider, ref)
+        key = provider.content_key(ref)
+        if key in seen:
+            continue
+        seen.add(key)
+        resolved.append(link._replace(routed=(provider, ref)))
+    return resolved
+
+
+class LinkResult:
+    """Результат обработки одной ссылки из сообщения"""
+
+    def __init__(self, url: str, platform: str, stages: RequestStages):
+        self.url = url
+        self.platform = platform
+        self.stages = stages
+        self.started = asyncio.get_running_loop().time()
+        self.video_data: Optional[bytes] = None
+        self.caption: Optional[str] = None
+        self.outcome: Optional[str] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.video_data)
+
+    @property
+    def elapsed(self) -> float:
+        return asyncio.get_running_loop().time() - self.started
+
+
+def trim_caption(caption: Optional[str]) -> Optional[str]:
+    if caption and len(caption) > CAPTION_LIMIT:
+        return caption[: CAPTION_LIMIT - 3] + "..."
+    return caption
+
+
+def as_input_media(result: LinkResult) -> InputMediaVideo:
+    return InputMediaVideo(
+        media=result.video_data,
+        caption=trim_caption(result.caption),
+        filename=f"{result.platform}_video.mp4",
+    )
+
+
+def media_group_chunks(results: List[LinkResult]) -> List[List[LinkResult]]:
+    """Раскладывает готовые видео по альбомам не больше MEDIA_GROUP_LIMIT"""
+    return [
+        results[i : i + MEDIA_GROUP_LIMIT]
+        for i in range(0, len(results), MEDIA_GROUP_LIMIT)
+    ]
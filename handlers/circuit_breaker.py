@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from monitoring.metrics import CIRCUIT_STATE
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Значения для метрики shortly_circuit_state
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# platform, старое состояние, новое состояние, число сбоев подряд
+Listener = Callable[[str, str, str, int], None]
+Change = Tuple[str, str, int]
+
+
+class CircuitBreaker:
+    """
+    Предохранитель одной платформы.
+
+    failures сбоев за window секунд (без успехов между ними) размыкают цепь:
+    следующие cooldown секунд запросы к платформе отклоняются сразу, не занимая
+    воркер на минуты повторов yt-dlp. Затем цепь полуоткрыта — пропускается
+    не больше probes пробных запросов; успех замыкает цепь, сбой снова
+    размыкает.
+    """
+
+    def __init__(
+        self,
+        platform: str,
+        failures: int = 5,
+        window: float = 60.0,
+        cooldown: float = 120.0,
+        probes: int = 1,
+        listeners: Optional[List[Listener]] = None,
+    ):
+        self.platform = platform
+        self.failures = max(failures, 1)
+        self.window = window
+        self.cooldown = cooldown
+        self.probes = max(probes, 1)
+        self.listeners = listeners if listeners is not None else []
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._recent: Deque[float] = deque()
+        self._opened_at = 0.0
+        self._probing = 0
+        CIRCUIT_STATE.set(_STATE_VALUES[CLOSED], platform=platform)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._cooled_down():
+                return HALF_OPEN
+            return self._state
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.cooldown
+
+    def allow(self) -> bool:
+        """Можно ли сейчас идти на платформу; в полуоткрытой цепи занимает пробу"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if not self._cooled_down():
+                    return False
+                changed = self._set_state(HALF_OPEN)
+            else:
+                changed = None
+            allowed = self._probing < self.probes
+            if allowed:
+                self._probing += 1
+        self._notify(changed)
+        return allowed
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._probing = max(self._probing - 1, 0)
+            changed = self._set_state(CLOSED) if self._state != CLOSED else None
+        self._notify(changed)
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._probing = max(self._probing - 1, 0)
+            self._recent.append(now)
+            while self._recent and now - self._recent[0] > self.window:
+                self._recent.popleft()
+            changed = None
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and len(self._recent) >= self.failures
+            ):
+                self._opened_at = now
+                changed = self._set_state(OPEN)
+        self._notify(changed)
+
+    def _set_state(self, state: str) -> Change:
+        old, self._state = self._state, state
+        if state != HALF_OPEN:
+            self._probing = 0
+        CIRCUIT_STATE.set(_STATE_VALUES[state], platform=self.platform)
+        return old, state, len(self._recent)
+
+    def _notify(self, changed: Optional[Change]) -> None:
+        if changed is None:
+            return
+        old, new, failures = changed
+        logger.warning(f"Circuit {self.platform}: {old} → {new} ({failures} failures)")
+        for listener in self.listeners:
+            try:
+                listener(self.platform, old, new, failures)
+            except Exception as e:
+                logger.error(f"Circuit listener failed: {e}")
+
+
+class CircuitBreakers:
+    """
+    Предохранители по платформам. Порог, окно и пауза — CIRCUIT_FAILURES,
+    CIRCUIT_WINDOW_S, CIRCUIT_COOLDOWN_S, CIRCUIT_PROBES; CIRCUIT_FAILURES=0
+    отключает предохранители.
+    """
+
+    def __init__(self):
+        self.failures = int(os.getenv("CIRCUIT_FAILURES", "5"))
+        self.window = float(os.getenv("CIRCUIT_WINDOW_S", "60"))
+        self.cooldown = float(os.getenv("CIRCUIT_COOLDOWN_S", "120"))
+        self.probes = int(os.getenv("CIRCUIT_PROBES", "1"))
+        self.listeners: List[Listener] = []
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.failures > 0
+
+    def subscribe(self, listener: Listener) -> None:
+        self.listeners.append(listener)
+
+    def get(self, platform: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(platform)
+            if breaker is None:
+                breaker = self._breakers[platform] = CircuitBreaker(
+                    platform,
+                    failures=self.failures,
+                    window=self.window,
+                    cooldown=self.cooldown,
+                    probes=self.probes,
+                    listeners=self.listeners,
+                )
+            return breaker
+
+    def allow(self, platform: str) -> bool:
+        return not self.enabled or self.get(platform).allow()
+
+    def record_success(self, platform: str) -> None:
+        if self.enabled:
+            self.get(platform).record_success()
+
+    def record_failure(self, platform: str) -> None:
+        if self.enabled:
+            self.get(platform).record_failure()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._breakers.clear()
+
+
+circuit_breakers = CircuitBreakers()
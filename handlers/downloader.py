@@ -1,76 +1,261 @@
 import logging
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
-from providers.base import BaseProvider
-from providers.facebook import FacebookProvider
-from providers.instagram import InstagramProvider
-from providers.likee import LikeeProvider
-from providers.reddit import RedditProvider
-from providers.rutube import RuTubeProvider
-from providers.tiktok import TikTokProvider
-from providers.youtube import YouTubeProvider
+from handlers.circuit_breaker import circuit_breakers
+from handlers.negative_cache import negative_cache
+from monitoring.metrics import FAILURES
+from monitoring.stages import record, track_stage
+from monitoring.tracing import tracer
+from providers.base import BaseProvider, KindId, platform_name, url_host
+from providers.errors import (
+    LOGIN_REQUIRED,
+    UNAVAILABLE,
+    DownloadError,
+    classify_error,
+    is_resource_error,
+)
+from providers.registry import provider_classes
+from providers.resolver import short_links
 
 logger = logging.getLogger(__name__)
 
+# Провайдер и канонический (kind, ident) ссылки после маршрутизации
+Route = Tuple[BaseProvider, KindId]
+
+
+class DownloadJob:
+    """Ссылка после probe: метаданные yt-dlp и оценка стоимости загрузки"""
+
+    __slots__ = ("provider", "ref", "content_key", "info", "cost")
+
+    def __init__(
+        self,
+        provider: BaseProvider,
+        ref: KindId,
+        content_key: str,
+        info: Dict[str, Any],
+        cost: float,
+    ):
+        self.provider = provider
+        self.ref = ref
+        self.content_key = content_key
+        self.info = info
+        self.cost = cost
+
+    @property
+    def platform(self) -> str:
+        return platform_name(self.provider)
+
 
 class Downloader:
     def __init__(self):
-        self.downloaders: List[BaseProvider] = [
-            InstagramProvider(),
-            TikTokProvider(),
-            YouTubeProvider(),
-            LikeeProvider(),
-            FacebookProvider(),
-            RuTubeProvider(),
-            RedditProvider(),
-        ]
-        logger.info(f"Initialized manager with {len(self.downloaders)} downloaders")
+        self._downloaders: Optional[List[BaseProvider]] = None
 
-    def get_downloader(self, url: str) -> Optional[BaseProvider]:
-        for downloader in self.downloaders:
-            if downloader.is_valid_url(url):
-                logger.info(
-                    f"Found suitable downloader: {downloader.__class__.__name__}"
-                )
-                return downloader
-
-        logger.warning("No suitable downloader found")
+    @property
+    def downloaders(self) -> List[BaseProvider]:
+        # Модули провайдеров импортируются при первой ссылке, а не на старте
+        if self._downloaders is None:
+            self._downloaders = [cls() for cls in provider_classes()]
+            logger.info(
+                f"Initialized manager with {len(self._downloaders)} downloaders"
+            )
+        return self._downloaders
+
+    @downloaders.setter
+    def downloaders(self, providers: List[BaseProvider]) -> None:
+        self._downloaders = providers
+
+    def _host_index(self) -> Dict[str, BaseProvider]:
+        # Индекс «суффикс домена → провайдер» перестраиваем, если список сменился
+        if getattr(self, "_indexed", None) is not self.downloaders:
+            index: Dict[str, BaseProvider] = {}
+            for downloader in self.downloaders:
+                for host in getattr(downloader, "HOSTS", ()):
+                    index.setdefault(host, downloader)
+            self._index = index
+            self._indexed = self.downloaders
+        return self._index
+
+    def _lookup_host(self, host: str) -> Optional[BaseProvider]:
+        index = self._host_index()
+        # www.m.youtube.com → m.youtube.com → youtube.com
+        while host:
+            provider = index.get(host)
+            if provider is not None:
+                return provider
+            host = host.partition(".")[2]
         return None
 
-    def download_video(
-        self, url: str
-    ) -> Tuple[Optional[bytes], Optional[str], Optional[str]]:
-        logger.info(f"Starting video download for URL: {url}")
+    def route(self, url: str) -> Tuple[Optional[BaseProvider], Optional[KindId]]:
+        """
+        Находит провайдера и сразу извлекает (kind, ident) за один проход:
+        сначала по индексу хостов, затем — для провайдеров без HOSTS —
+        перебором is_valid_url.
+        """
+        with tracer.start_span("route") as span:
+            # Тот же разбор хоста, что и в фильтре групп (handlers.filters)
+            host = url_host(url)
+            provider = self._lookup_host(host) if host else None
+            if provider is not None:
+                ref = provider.match(url)
+                if ref is None:
+                    provider = None
+            else:
+                ref = None
+                for downloader in self.downloaders:
+                    if getattr(downloader, "HOSTS", ()):
+                        continue
+                    if downloader.is_valid_url(url):
+                        provider = downloader
+                        ref = downloader.extract_id(url)
+                        break
 
-        downloader = self.get_downloader(url)
-        if not downloader:
-            return None, None, None
+            if provider is None:
+                logger.warning("No suitable downloader found")
+                return None, None
 
-        video_id = downloader.extract_id(url)
-        if not video_id:
-            logger.error("Failed to extract video ID")
-            return None, None, None
+            logger.info(f"Found suitable downloader: {provider.__class__.__name__}")
+            span.set_attribute("provider", provider.__class__.__name__)
+            return provider, ref
+
+    def get_downloader(self, url: str) -> Optional[BaseProvider]:
+        return self.route(url)[0]
+
+    def canonical_ref(self, provider: BaseProvider, ref: KindId) -> KindId:
+        """
+        Короткую ссылку разворачиваем до канонического id (через кэш
+        редиректов), чтобы одно видео всегда имело один ключ и yt-dlp
+        не ходил по редиректам сам.
+        """
+        kind, ident = ref
+        if kind not in getattr(provider, "SHORT_KINDS", ()):
+            return ref
+        with track_stage("resolve", platform_name(provider)):
+            target = short_links.resolve(provider._build_url(kind, ident))
+        canonical = provider.match(target) if target else None
+        if canonical is None or canonical[0] in provider.SHORT_KINDS:
+            return ref
+        return canonical
 
+    def _resolve(
+        self, url: str, routed: Optional[Route] = None
+    ) -> Optional[Tuple[BaseProvider, KindId, str]]:
+        """
+        Провайдер, канонический ref и ключ контента; None — ссылка не наша.
+        routed — уже найденные провайдер и канонический ref (resolve_links),
+        тогда ссылка повторно не маршрутизируется и не разворачивается.
+        """
+        if routed is not None:
+            downloader, video_id = routed
+        else:
+            downloader, video_id = self.route(url)
+            if not downloader:
+                FAILURES.inc(platform="unknown", reason="unsupported_url")
+                return None
+
+            if not video_id:
+                logger.error("Failed to extract video ID")
+                FAILURES.inc(platform=platform_name(downloader), reason="bad_id")
+                return None
+
+            video_id = self.canonical_ref(downloader, video_id)
         logger.info(f"Extracted ID: {video_id}")
+        content_key = downloader.content_key(video_id)
+        record("content_key", content_key)
+
+        # Удалённые/приватные видео не пытаемся скачивать повторно
+        cached_reason = negative_cache.get(content_key)
+        if cached_reason:
+            logger.info(f"Negative cache hit for {content_key}: {cached_reason}")
+            record("negative_cache", True)
+            FAILURES.inc(platform=platform_name(downloader), reason=cached_reason)
+            raise DownloadError(cached_reason)
 
+        # Платформа сбоит подряд — отказываем сразу, не занимая воркер
+        if not circuit_breakers.allow(platform_name(downloader)):
+            logger.info(f"Circuit open for {platform_name(downloader)}, rejecting")
+            FAILURES.inc(platform=platform_name(downloader), reason=UNAVAILABLE)
+            raise DownloadError(UNAVAILABLE)
+        return downloader, video_id, content_key
+
+    def _fail(self, downloader: BaseProvider, content_key: str, error: Exception):
+        """Постоянные ошибки — в негативный кэш и DownloadError, прочие — в счётчик"""
+        logger.error(f"Download error: {error}")
+        reason = classify_error(error)
+        # Удалённое или приватное видео — платформа отвечает; «login required»
+        # у Instagram обычно означает rate limit
+        if reason and reason != LOGIN_REQUIRED:
+            circuit_breakers.record_success(platform_name(downloader))
+        else:
+            circuit_breakers.record_failure(platform_name(downloader))
+        if reason:
+            negative_cache.add(content_key, reason)
+            FAILURES.inc(platform=platform_name(downloader), reason=reason)
+            raise DownloadError(reason, str(error)) from error
+        FAILURES.inc(platform=platform_name(downloader), reason="provider_error")
+
+    def _finish(
+        self, downloader: BaseProvider, video_data: Optional[bytes], caption
+    ) -> Tuple[Optional[bytes], Optional[str], Optional[str]]:
+        platform = platform_name(downloader)
+        if video_data:
+            circuit_breakers.record_success(platform)
+            logger.info(f"Video successfully downloaded from {platform}")
+            return video_data, caption, platform
+        logger.error(f"Failed to download video from {platform}")
+        FAILURES.inc(platform=platform, reason="empty_result")
+        return None, None, platform
+
+    def download_video(
+        self, url: str
+    ) -> Tuple[Optional[bytes], Optional[str], Optional[str]]:
+        """Извлечение и загрузка одним заходом (без планировщика)"""
+        logger.info(f"Starting video download for URL: {url}")
+        resolved = self._resolve(url)
+        if resolved is None:
+            return None, None, None
+        downloader, video_id, content_key = resolved
         try:
             video_data, caption = downloader.download_video(video_id)
-            platform = getattr(
-                downloader,
-                "platform",
-                downloader.__class__.__name__.replace("Provider", "").lower(),
-            )
-            # Если platform пустая строка, используем fallback
-            if not platform:
-                platform = downloader.__class__.__name__.replace("Provider", "").lower()
+        except Exception as e:
+            self._fail(downloader, content_key, e)
+            return None, None, None
+        return self._finish(downloader, video_data, caption)
 
-            if video_data:
-                logger.info(f"Video successfully downloaded from {platform}")
-                return video_data, caption, platform
-            else:
-                logger.error(f"Failed to download video from {platform}")
-                return None, None, platform
+    def probe(self, url: str, routed: Optional[Route] = None) -> Optional[DownloadJob]:
+        """
+        Первая фаза: маршрутизация и извлечение метаданных без скачивания.
+        Возвращает задачу с оценкой стоимости для планировщика.
+        """
+        logger.info(f"Probing URL: {url}")
+        resolved = self._resolve(url, routed)
+        if resolved is None:
+            return None
+        downloader, video_id, content_key = resolved
+        try:
+            info = downloader.probe(video_id)
+        except Exception as e:
+            self._fail(downloader, content_key, e)
+            return None
+        circuit_breakers.record_success(platform_name(downloader))
+        cost = downloader.estimate_cost(info)
+        record("estimated_cost", round(cost, 1))
+        return DownloadJob(downloader, video_id, content_key, info, cost)
 
+    def fetch(
+        self, job: DownloadJob
+    ) -> Tuple[Optional[bytes], Optional[str], Optional[str]]:
+        """
+        Вторая фаза: загрузка и сжатие по уже извлечённым метаданным.
+        Нехватка ресурсов узла пробрасывается: это перегрузка, а не сбой
+        платформы, и предохранитель её не учитывает.
+        """
+        try:
+            video_data, caption = job.provider.download_video(job.ref, info=job.info)
         except Exception as e:
-            logger.error(f"Download error: {e}")
-            return None, None, None
+            if is_resource_error(e):
+                logger.error(f"Out of resources downloading {job.content_key}: {e}")
+                raise
+            self._fail(job.provider, job.content_key, e)
+            return None, None, job.platform
+        return self._finish(job.provider, video_data, caption)
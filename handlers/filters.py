@@ -0,0 +1,45 @@
+from typing import FrozenSet, Iterator, Optional
+
+from telegram import Message, MessageEntity
+from telegram.ext import filters
+
+from providers.base import url_host
+from providers.registry import SUPPORTED_HOSTS
+
+
+def iter_message_urls(message: Message) -> Iterator[str]:
+    """Ссылки из сущностей сообщения: URL в тексте и скрытые text_link"""
+    for entity in message.entities or ():
+        if entity.type == MessageEntity.URL:
+            yield message.parse_entity(entity)
+        elif entity.type == MessageEntity.TEXT_LINK and entity.url:
+            yield entity.url
+
+
+def is_supported_host(host: Optional[str], suffixes: FrozenSet[str]) -> bool:
+    while host:
+        if host in suffixes:
+            return True
+        host = host.partition(".")[2]
+    return False
+
+
+class SupportedLinkFilter(filters.MessageFilter):
+    """
+    Пропускает только сообщения со ссылкой на поддерживаемую платформу.
+    Смотрит лишь на сущности, уже разобранные Telegram, — без регулярок
+    по тексту, поэтому обычная переписка в группах отсекается почти даром.
+    """
+
+    def __init__(self, suffixes: FrozenSet[str] = SUPPORTED_HOSTS):
+        super().__init__(name="SupportedLinkFilter")
+        self.suffixes = suffixes
+
+    def filter(self, message: Message) -> bool:
+        return any(
+            is_supported_host(url_host(url), self.suffixes)
+            for url in iter_message_urls(message)
+        )
+
+
+SUPPORTED_LINK = SupportedLinkFilter()
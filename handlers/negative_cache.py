@@ -0,0 +1,90 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from monitoring.metrics import CACHE_LOOKUPS
+from providers.errors import (
+    GEO_BLOCKED,
+    LIVE,
+    LOGIN_REQUIRED,
+    PRIVATE,
+    REMOVED,
+    TOO_LARGE,
+    TOO_LONG,
+)
+
+logger = logging.getLogger(__name__)
+
+# Сколько помнить ошибку каждого класса (секунды); переопределяется через
+# NEGATIVE_CACHE_TTL_<REASON>_S, например NEGATIVE_CACHE_TTL_PRIVATE_S=600
+DEFAULT_TTLS: Dict[str, float] = {
+    REMOVED: 24 * 3600,
+    PRIVATE: 6 * 3600,
+    GEO_BLOCKED: 24 * 3600,
+    # У Instagram «login required» часто означает rate limit — держим недолго
+    LOGIN_REQUIRED: 15 * 60,
+    TOO_LONG: 24 * 3600,
+    TOO_LARGE: 24 * 3600,
+    # Эфир закончится и станет обычным видео
+    LIVE: 10 * 60,
+}
+
+
+class NegativeCache:
+    """
+    Кэш заведомо неудачных ссылок по каноническому ключу контента:
+    повторный запрос удалённого или приватного видео завершается сразу,
+    без новой попытки извлечения через yt-dlp.
+    """
+
+    def __init__(
+        self, ttls: Optional[Dict[str, float]] = None, max_entries: int = 50000
+    ):
+        self.ttls = dict(DEFAULT_TTLS)
+        for reason in self.ttls:
+            env = os.getenv(f"NEGATIVE_CACHE_TTL_{reason.upper()}_S")
+            if env:
+                self.ttls[reason] = float(env)
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                entry = None
+        CACHE_LOOKUPS.inc(cache="negative", result="hit" if entry else "miss")
+        return entry[0] if entry else None
+
+    def add(self, key: str, reason: str) -> bool:
+        ttl = self.ttls.get(reason, 0)
+        if ttl <= 0:
+            return False
+        with self._lock:
+            self._entries[key] = (reason, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"Remembered {reason} failure for {key} ({ttl:.0f}s)")
+        return True
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+negative_cache = NegativeCache()
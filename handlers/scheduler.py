@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from monitoring.metrics import QUEUE_DEPTH, QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PRIVATE = "private"
+GROUP = "group"
+
+FlowKey = Tuple[str, int]
+
+
+class _Job:
+    __slots__ = ("flow", "user_id", "cost", "enqueued", "future", "granted")
+
+    def __init__(self, flow: "_Flow", user_id: int, cost: float):
+        self.flow = flow
+        self.user_id = user_id
+        self.cost = cost
+        self.enqueued = time.monotonic()
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.granted = False
+
+
+class _Flow:
+    """Очередь одного личного чата или одной группы"""
+
+    __slots__ = ("key", "weight", "jobs", "deficit", "in_turn", "running")
+
+    def __init__(self, key: FlowKey, weight: float):
+        self.key = key
+        self.weight = weight
+        self.jobs: Deque[_Job] = deque()
+        self.deficit = 0.0
+        self.in_turn = False
+        self.running = 0
+
+    @property
+    def kind(self) -> str:
+        return self.key[0]
+
+
+class FairScheduler:
+    """
+    Справедливая очередь перед Downloader.download_video.
+
+    Каждый личный чат и каждая группа — отдельный поток задач; потоки
+    обслуживаются по кругу (deficit round robin): в свой ход поток получает
+    кредит quantum * weight и запускает задачи, пока кредита хватает на их
+    стоимость. Вес личных чатов и групп задаётся отдельно. Поверх этого
+    действуют общий лимит воркеров, лимит на пользователя (во всех чатах
+    сразу) и лимит на чат. Время ожидания в очереди пишется в гистограмму
+    по классу потока.
+
+    Внутри потока первой идёт самая дешёвая задача (стоимость — оценка из
+    метаданных, см. Downloader.probe); чтобы дорогие не голодали, каждая
+    секунда ожидания уменьшает стоимость в сравнении на aging.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        user_limit: Optional[int] = None,
+        chat_limit: Optional[int] = None,
+        weights: Optional[Dict[str, float]] = None,
+        quantum: float = 1.0,
+        aging: Optional[float] = None,
+    ):
+        self.workers = max(
+            workers if workers is not None else int(os.getenv("DOWNLOAD_WORKERS", "4")),
+            1,
+        )
+        self.user_limit = max(
+            (
+                user_limit
+                if user_limit is not None
+                else int(os.getenv("USER_CONCURRENCY", "2"))
+            ),
+            1,
+        )
+        self.chat_limit = max(
+            (
+                chat_limit
+                if chat_limit is not None
+                else int(os.getenv("CHAT_CONCURRENCY", "3"))
+            ),
+            1,
+        )
+        self.weights = weights or {
+            PRIVATE: float(os.getenv("SCHED_WEIGHT_PRIVATE", "2")),
+            GROUP: float(os.getenv("SCHED_WEIGHT_GROUP", "1")),
+        }
+        self.quantum = quantum
+        self.aging = (
+            aging if aging is not None else float(os.getenv("SCHED_AGING", "1"))
+        )
+        self._flows: Dict[FlowKey, _Flow] = {}
+        # Потоки с ожидающими задачами; первый — тот, чей сейчас ход
+        self._active: Deque[_Flow] = deque()
+        self._running = 0
+        self._user_running: Dict[int, int] = {}
+        # Суммарная стоимость ожидающих и выполняющихся задач — для оценки
+        # времени ожидания при допуске новых
+        self._queued_cost = 0.0
+        self._running_cost = 0.0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def queued(self, kind: Optional[str] = None) -> int:
+        return sum(
+            len(flow.jobs) for flow in self._active if kind is None or flow.kind == kind
+        )
+
+    def estimated_wait(self) -> float:
+        """
+        Сколько (в единицах стоимости) подождёт новая задача: очередь плюс
+        в среднем половина выполняющихся, поделённые на число воркеров.
+        """
+        if self._running < self.workers and not self._queued_cost:
+            return 0.0
+        return (self._queued_cost + self._running_cost / 2) / self.workers
+
+    def resize(self, workers: int) -> None:
+        """Меняет число воркеров на лету (адаптивный лимит)"""
+        self.workers = max(workers, 1)
+        self._dispatch()
+
+    @staticmethod
+    def flow_key(user_id: int, chat_id: int, private: bool) -> FlowKey:
+        return (PRIVATE, user_id) if private else (GROUP, chat_id)
+
+    def _flow(self, key: FlowKey) -> _Flow:
+        flow = self._flows.get(key)
+        if flow is None:
+            flow = self._flows[key] = _Flow(
+                key, max(self.weights.get(key[0], 1.0), 0.01)
+            )
+        return flow
+
+    def _next_job(self, flow: _Flow) -> Optional[_Job]:
+        """
+        Самая дешёвая с учётом ожидания задача потока из тех, что не держат
+        лимиты пользователя и чата; при равной стоимости — более ранняя.
+        """
+        if flow.running >= self.chat_limit:
+            return None
+        now = time.monotonic()
+        best, best_priority = None, 0.0
+        for job in flow.jobs:
+            if self._user_running.get(job.user_id, 0) >= self.user_limit:
+                continue
+            priority = job.cost - self.aging * (now - job.enqueued)
+            if best is None or priority < best_priority:
+                best, best_priority = job, priority
+        return best
+
+    def _end_turn(self, flow: _Flow) -> None:
+        flow.in_turn = False
+        if flow.jobs:
+            self._active.rotate(-1)
+        else:
+            # Простаивающий поток не копит кредит
+            self._active.popleft()
+            flow.deficit = 0.0
+            self._forget(flow)
+
+    def _forget(self, flow: _Flow) -> None:
+        if not flow.jobs and not flow.running:
+            self._flows.pop(flow.key, None)
+
+    def _start(self, flow: _Flow, job: _Job) -> None:
+        flow.jobs.remove(job)
+        flow.deficit -= job.cost
+        flow.running += 1
+        self._running += 1
+        self._queued_cost -= job.cost
+        self._running_cost += job.cost
+        self._user_running[job.user_id] = self._user_running.get(job.user_id, 0) + 1
+        job.granted = True
+        job.future.set_result(None)
+        QUEUE_DEPTH.dec(kind=flow.kind)
+
+    def _dispatch(self) -> None:
+        blocked = 0
+        while self._running < self.workers and blocked < len(self._active):
+            flow = self._active[0]
+            job = self._next_job(flow)
+            if job is None:
+                # Поток упёрся в лимиты — ход переходит дальше без кредита
+                blocked += 1
+                self._end_turn(flow)
+                continue
+            if not flow.in_turn:
+                flow.in_turn = True
+                flow.deficit += self.quantum * flow.weight
+            if flow.deficit < job.cost:
+                self._end_turn(flow)
+                continue
+            blocked = 0
+            self._start(flow, job)
+            if not flow.jobs:
+                self._end_turn(flow)
+
+    def _release(self, job: _Job) -> None:
+        flow = job.flow
+        flow.running -= 1
+        self._running -= 1
+        self._running_cost -= job.cost
+        left = self._user_running[job.user_id] - 1
+        if left:
+            self._user_running[job.user_id] = left
+        else:
+            del self._user_running[job.user_id]
+        self._forget(flow)
+        self._dispatch()
+
+    def _withdraw(self, job: _Job) -> None:
+        flow = job.flow
+        flow.jobs.remove(job)
+        self._queued_cost -= job.cost
+        QUEUE_DEPTH.dec(kind=flow.kind)
+        if not flow.jobs:
+            if flow in self._active:
+                self._active.remove(flow)
+            flow.in_turn = False
+            flow.deficit = 0.0
+            self._forget(flow)
+
+    @asynccontextmanager
+    async def slot(
+        self, user_id: int, chat_id: int, private: bool, cost: float = 1.0
+    ) -> AsyncIterator[float]:
+        """Ждёт своей очереди; возвращает время ожидания в секундах"""
+        flow = self._flow(self.flow_key(user_id, chat_id, private))
+        job = _Job(flow, user_id, cost)
+        flow.jobs.append(job)
+        self._queued_cost += cost
+        QUEUE_DEPTH.inc(kind=flow.kind)
+        if len(flow.jobs) == 1 and flow not in self._active:
+            self._active.append(flow)
+        self._dispatch()
+
+        try:
+            await job.future
+        except asyncio.CancelledError:
+            # Отмена могла прийти уже после выдачи слота
+            if job.granted:
+                self._release(job)
+            else:
+                self._withdraw(job)
+            raise
+
+        waited = time.monotonic() - job.enqueued
+        QUEUE_WAIT_SECONDS.observe(waited, kind=flow.kind)
+        try:
+            yield waited
+        finally:
+            self._release(job)
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+import socket
+import subprocess  # nosec B404 - фиксированная команда ffmpeg без пользовательского ввода
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+
+from monitoring.metrics import WARMUP_SECONDS
+from monitoring.startup import lazy_import
+from providers.base import BaseProvider
+
+logger = logging.getLogger(__name__)
+
+yt_dlp = lazy_import("yt_dlp")
+
+TELEGRAM_HOST = "api.telegram.org"
+
+# Секунда тестового сигнала 64x64 через libx264 — проверяет, что ffmpeg
+# запускается и кодек на месте, и прогревает страничный кэш бинарника
+FFMPEG_PROBE = [
+    "ffmpeg",
+    "-hide_banner",
+    "-loglevel",
+    "error",
+    "-f",
+    "lavfi",
+    "-i",
+    "testsrc=size=64x64:rate=10:duration=1",
+    "-c:v",
+    "libx264",
+    "-f",
+    "null",
+    "-",
+]
+
+
+def warmup_enabled() -> bool:
+    return os.getenv("WARMUP", "0") == "1"
+
+
+def _timeout() -> float:
+    return float(os.getenv("WARMUP_TIMEOUT_S", "10"))
+
+
+def _ie_key(provider: BaseProvider) -> Optional[str]:
+    return provider.YTDLP_IE_KEYS[0] if provider.YTDLP_IE_KEYS else None
+
+
+def _parallel(func: Callable, items: Sequence) -> List:
+    with ThreadPoolExecutor(max_workers=max(len(items), 1)) as pool:
+        return list(pool.map(func, items))
+
+
+def warm_providers(providers: Iterable[BaseProvider]) -> int:
+    """
+    Создаёт по экземпляру YoutubeDL в пуле каждого провайдера: импорт
+    экстракторов платформы и инициализация yt-dlp происходят до первого запроса.
+    """
+    count = 0
+    for provider in providers:
+        with provider._ydl_pool(_ie_key(provider)).acquire(tempfile.gettempdir()):
+            count += 1
+    return count
+
+
+def resolve_hosts(hosts: Sequence[str]) -> int:
+    """Разрешает имена хостов параллельно; возвращает число успешных"""
+
+    def resolve(host: str) -> bool:
+        try:
+            socket.getaddrinfo(host, 443, type=socket.SOCK_STREAM)
+            return True
+        except OSError as e:
+            logger.warning(f"Warm-up: cannot resolve {host}: {e}")
+            return False
+
+    return sum(_parallel(resolve, list(hosts)))
+
+
+def preconnect(providers: Sequence[BaseProvider]) -> int:
+    """
+    HEAD-запросы к хостам платформ через тёплые экземпляры пулов: TLS-сессии
+    остаются в keep-alive пуле того YoutubeDL, который возьмёт первая задача.
+    Каждая платформа тратит на прогрев токен своего ограничителя темпа.
+    """
+    timeout = _timeout()
+
+    def connect(provider: BaseProvider) -> int:
+        done = 0
+        home = tempfile.gettempdir()
+        provider._pace()
+        with provider._ydl_pool(_ie_key(provider)).acquire(home) as ydl:
+            for host in provider.HOSTS:
+                request = yt_dlp.networking.HEADRequest(
+                    f"https://{host}/", extensions={"timeout": timeout}
+                )
+                try:
+                    ydl.urlopen(request).close()
+                    done += 1
+                except Exception as e:
+                    # Ответ с ошибкой тоже прогревает соединение
+                    logger.debug(f"Warm-up: HEAD {host} failed: {e}")
+        return done
+
+    return sum(_parallel(connect, list(providers)))
+
+
+def probe_ffmpeg() -> None:
+    subprocess.run(  # nosec B603
+        FFMPEG_PROBE, check=True, capture_output=True, timeout=_timeout() * 3
+    )
+
+
+async def _step(name: str, run: Callable[[], Awaitable], report: Dict) -> None:
+    started = time.monotonic()
+    try:
+        result = await run()
+    except Exception as e:
+        report[name] = None
+        logger.warning(f"Warm-up step {name} failed: {e}")
+        return
+    elapsed = time.monotonic() - started
+    report[name] = elapsed
+    WARMUP_SECONDS.set(elapsed, step=name)
+    suffix = f" ({result})" if result is not None else ""
+    logger.info(f"Warm-up step {name}: {elapsed * 1000:.0f} ms{suffix}")
+
+
+async def warm_up(bot, providers: Sequence[BaseProvider]) -> Dict[str, Optional[float]]:
+    """
+    Прогрев перед приёмом сообщений (WARMUP=1): экстракторы yt-dlp, DNS,
+    соединения с платформами, пробный запуск ffmpeg и первое обращение к
+    Bot API. Каждый шаг замеряется; ошибка шага не останавливает запуск.
+    Возвращает длительность шагов (None — шаг не удался).
+    """
+    hosts = sorted({host for p in providers for host in p.HOSTS} | {TELEGRAM_HOST})
+    report: Dict[str, Optional[float]] = {}
+    started = time.monotonic()
+
+    await _step(
+        "extractors", lambda: asyncio.to_thread(warm_providers, providers), report
+    )
+    await _step("dns", lambda: asyncio.to_thread(resolve_hosts, hosts), report)
+    await _step("connect", lambda: asyncio.to_thread(preconnect, providers), report)
+    await _step("ffmpeg", lambda: asyncio.to_thread(probe_ffmpeg), report)
+    # Соединение с Bot API остаётся в пуле httpx бота
+    await _step("telegram", bot.get_me, report)
+
+    failed = [name for name, elapsed in report.items() if elapsed is None]
+    logger.info(
+        f"Warm-up finished in {time.monotonic() - started:.1f}s"
+        + (f", failed steps: {', '.join(failed)}" if failed else "")
+    )
+    return report
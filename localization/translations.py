@@ -47,12 +47,25 @@ TRANSLATIONS = {
         "error_processing_timeout": "⏰ Превышено время ожидания. Попробуй еще раз.",
         "error_unknown": "❌ Произошла неизвестная ошибка. Попробуй еще раз.",
         "error_invalid_url": "❌ Некорректная ссылка. Проверь правильность URL.",
+        "error_video_removed": "❌ Видео удалено или больше недоступно.",
+        "error_video_private": "🔒 Это приватное видео — скачать его нельзя.",
+        "error_geo_blocked": "🌍 Видео недоступно в регионе сервера.",
+        "error_login_required": "🔑 Платформа требует вход для этого видео. Попробуй позже.",
+        "error_platform_unavailable": "🚧 Платформа временно недоступна. Попробуй через пару минут.",
+        "error_video_too_long": "⏱ Видео слишком длинное для загрузки.",
+        "error_video_too_large": "📦 Видео слишком большое для отправки.",
+        "error_live_stream": "📡 Прямые эфиры не поддерживаются.",
         "processing_video": "🎬 Обрабатываю видео...",
+        "queue_position": "🕒 Ты в очереди: {position}-й, ожидание ~{minutes} мин.",
+        "error_overloaded": "⏳ Сейчас слишком много запросов (очередь ~{minutes} мин). Попробуй чуть позже.",
         "downloading_video": "⬇️ Скачиваю видео...",
         "sending_video": "📤 Отправляю видео...",
         "video_sent": "✅ Видео успешно отправлено!",
         "stats_processing_time": "Время обработки: {time:.1f}с",
         "stats_video_size": "Размер: {size:.1f} МБ",
+        "profile_started": "🔬 Профилирование запущено на {seconds} с...",
+        "profile_busy": "⏳ Профилирование уже идёт, дождись результата.",
+        "profile_finished": "🔬 Отчёт профилирования:",
         "user": "Пользователь",
     },
     "en": {
@@ -103,12 +116,25 @@ TRANSLATIONS = {
         "error_processing_timeout": "⏰ Processing timeout. Please try again.",
         "error_unknown": "❌ An unknown error occurred. Please try again.",
         "error_invalid_url": "❌ Invalid link. Please check the URL format.",
+        "error_video_removed": "❌ The video was removed or is no longer available.",
+        "error_video_private": "🔒 This video is private and cannot be downloaded.",
+        "error_geo_blocked": "🌍 The video is not available in the server's region.",
+        "error_login_required": "🔑 The platform requires login for this video. Try again later.",
+        "error_platform_unavailable": "🚧 The platform is temporarily unavailable. Try again in a couple of minutes.",
+        "error_video_too_long": "⏱ The video is too long to download.",
+        "error_video_too_large": "📦 The video is too large to send.",
+        "error_live_stream": "📡 Live streams are not supported.",
         "processing_video": "🎬 Processing video...",
+        "queue_position": "🕒 You are #{position} in the queue, about {minutes} min.",
+        "error_overloaded": "⏳ Too many requests right now (queue ~{minutes} min). Please try again a bit later.",
         "downloading_video": "⬇️ Downloading video...",
         "sending_video": "📤 Sending video...",
         "video_sent": "✅ Video sent successfully!",
         "stats_processing_time": "Processing time: {time:.1f}s",
         "stats_video_size": "Size: {size:.1f} MB",
+        "profile_started": "🔬 Profiling started for {seconds}s...",
+        "profile_busy": "⏳ Profiling is already running, wait for the result.",
+        "profile_finished": "🔬 Profiling report:",
         # General
         "user": "User",
     },
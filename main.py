@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 import asyncio
 import logging
+import math
 import os
-import time
+import signal
+from typing import List
 
-from telegram import Chat, Update
+from telegram import Chat, Update, User
 from telegram.ext import (
     Application,
     ChatMemberHandler,
@@ -17,9 +19,50 @@ from telegram.ext import (
 from analytics.stats_collector import stats_collector
 from commands.contact import contact_command
 from commands.help import help_command
+from commands.profile import profile_command
 from commands.start import start_command
+from handlers.admission import AdmissionController
+from handlers.batch import (
+    Link,
+    LinkResult,
+    as_input_media,
+    extract_links,
+    media_group_chunks,
+    resolve_links,
+    trim_caption,
+)
+from handlers.circuit_breaker import circuit_breakers
 from handlers.downloader import Downloader
+from handlers.filters import SUPPORTED_LINK
+from handlers.scheduler import FairScheduler
+from handlers.warmup import warm_up, warmup_enabled
 from localization.utils import t
+from monitoring.metrics import (
+    FAILURES,
+    INFLIGHT_JOBS,
+    READY,
+    start_metrics_server,
+)
+from monitoring.profiler import profiler
+from monitoring.slowlog import slow_request_log
+from monitoring.stages import RequestStages, collect_stages, track_stage
+from monitoring.tracing import CorrelationIdFilter, traced
+from monitoring.watchdog import loop_watchdog
+from providers.calibration import ensure_calibrated
+from providers.errors import (
+    GEO_BLOCKED,
+    LIVE,
+    LOGIN_REQUIRED,
+    PRIVATE,
+    REMOVED,
+    TOO_LARGE,
+    TOO_LONG,
+    UNAVAILABLE,
+    DownloadError,
+    is_resource_error,
+)
+from providers.limits import AdaptiveLimit
+from providers.ytdlp_cache import warm_cache
 
 
 def setup_logging() -> None:
@@ -28,9 +71,12 @@ def setup_logging() -> None:
     level = getattr(logging, level_name, logging.ERROR)
 
     logging.basicConfig(
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        format="%(asctime)s - %(name)s - %(levelname)s - [%(correlation_id)s] %(message)s",
         level=level,
     )
+    # correlation_id берётся из текущей трассы (см. monitoring.tracing)
+    for handler in logging.getLogger().handlers:
+        handler.addFilter(CorrelationIdFilter())
 
     # Урезаем шум от сторонних библиотек
     for noisy in (
@@ -54,8 +100,170 @@ if not TELEGRAM_BOT_TOKEN:
     raise ValueError("TELEGRAM_BOT_TOKEN is not set in environment variables")
 
 downloader = Downloader()
+# Размыкание и восстановление предохранителей платформ — в bot_events
+circuit_breakers.subscribe(stats_collector.track_circuit_change)
+
+
+# Извлечение метаданных и загрузка — две очереди: загрузки упорядочиваются
+# по стоимости, которая известна только после извлечения
+probe_scheduler = FairScheduler(workers=int(os.getenv("PROBE_WORKERS", "4")))
+scheduler = FairScheduler(quantum=float(os.getenv("SCHED_QUANTUM_S", "10")))
+admission = AdmissionController(probe_scheduler, scheduler)
+# Число воркеров загрузки подстраивается по скорости скачивания
+download_limit = AdaptiveLimit(
+    "download",
+    initial=scheduler.workers,
+    min_limit=int(os.getenv("DOWNLOAD_WORKERS_MIN", "1")),
+    max_limit=int(os.getenv("DOWNLOAD_WORKERS_MAX", str(scheduler.workers * 2))),
+)
+
+# Сколько апдейтов Telegram обрабатывается одновременно
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "64"))
+# Таймаут на скачивание одной ссылки: 5 минут
+DOWNLOAD_TIMEOUT = 300
+# Исход обработки ссылки → ключ локализованного сообщения об ошибке
+ERROR_KEYS = {
+    "not_found": "error_video_not_found",
+    "timeout": "error_processing_timeout",
+    REMOVED: "error_video_removed",
+    PRIVATE: "error_video_private",
+    GEO_BLOCKED: "error_geo_blocked",
+    LOGIN_REQUIRED: "error_login_required",
+    TOO_LONG: "error_video_too_long",
+    TOO_LARGE: "error_video_too_large",
+    LIVE: "error_live_stream",
+    UNAVAILABLE: "error_platform_unavailable",
+}
+UPLOAD_TIMEOUTS = dict(
+    read_timeout=120,  # 2 минуты на чтение
+    write_timeout=120,  # 2 минуты на запись
+    connect_timeout=30,  # 30 секунд на подключение
+    pool_timeout=30,  # 30 секунд на получение соединения из пула
+)
+
+
+def _minutes(seconds: float) -> int:
+    return max(1, math.ceil(seconds / 60))
+
+
+def _failure_text(failed: List[LinkResult], total: int, user: User) -> str:
+    """Ошибка по каждой не скачанной ссылке; для одной ссылки — без URL"""
+    texts = [
+        t(ERROR_KEYS.get(result.outcome, "error_unknown"), user=user)
+        for result in failed
+    ]
+    if total == 1:
+        return texts[0]
+    return "\n\n".join(f"{result.url}\n{text}" for result, text in zip(failed, texts))
+
+
+def _adapt_downloads(stages: RequestStages, platform: str, ok: bool) -> None:
+    """
+    Сообщает лимиту загрузок секунды на мегабайт (со своей базовой у каждой
+    платформы) или перегрузку и применяет его
+    """
+    saturated = scheduler.running >= scheduler.workers or scheduler.queued() > 0
+    if ok:
+        seconds = stages.duration("download")
+        if seconds is None:
+            return
+        megabytes = max(stages.get("downloaded_bytes", 0) / 2**20, 1.0)
+        download_limit.update(seconds / megabytes, saturated=saturated, key=platform)
+    else:
+        download_limit.update(None, ok=False, saturated=saturated)
+    scheduler.resize(download_limit.limit)
+
+
+async def fetch_link(
+    link: Link, user_id: int, chat_id: int, private: bool
+) -> LinkResult:
+    """Скачивает одну ссылку в рабочем потоке со своей разбивкой по стадиям"""
+    url = link.url
+    with collect_stages() as stages:
+        result = LinkResult(url, link.platform, stages)
+        INFLIGHT_JOBS.inc()
+        try:
+            # Один таймаут на обработку ссылки (без ожидания в очередях):
+            # загрузке достаётся то, что осталось после извлечения
+            loop = asyncio.get_running_loop()
+            remaining = DOWNLOAD_TIMEOUT
+            async with probe_scheduler.slot(user_id, chat_id, private) as waited:
+                started = loop.time()
+                job = await asyncio.wait_for(
+                    asyncio.to_thread(downloader.probe, url, link.routed),
+                    timeout=remaining,
+                )
+                remaining -= loop.time() - started
+            video_data = caption = platform = None
+            if job is not None:
+                async with scheduler.slot(
+                    user_id, chat_id, private, cost=job.cost
+                ) as download_waited:
+                    waited += download_waited
+                    try:
+                        video_data, caption, platform = await asyncio.wait_for(
+                            asyncio.to_thread(downloader.fetch, job),
+                            timeout=max(remaining, 0),
+                        )
+                    except Exception as e:
+                        # Перегрузку узла показывают таймауты и нехватка
+                        # ресурсов; ошибки платформ и контента лимит не трогают
+                        if isinstance(e, asyncio.TimeoutError) or is_resource_error(e):
+                            _adapt_downloads(stages, job.platform, ok=False)
+                        raise
+                    if video_data:
+                        _adapt_downloads(stages, job.platform, ok=True)
+            stages.set("queue_wait", round(waited, 3))
+            result.platform = platform or result.platform
+            if video_data:
+                result.video_data = video_data
+                result.caption = caption
+                stages.set("sent_bytes", len(video_data))
+            else:
+                result.outcome = "not_found"
+                result.error = "Video not found or unavailable"
+        except DownloadError as e:
+            # Постоянная ошибка (удалено, приватное, …) — уже учтена в FAILURES
+            result.outcome = e.reason
+            result.error = str(e)
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout processing video: {url}")
+            result.outcome = "timeout"
+            result.error = "Processing timeout"
+            FAILURES.inc(platform=result.platform, reason="timeout")
+        except Exception as e:
+            logger.error(f"Error downloading video {url}: {e}")
+            result.outcome = "error"
+            result.error = str(e)
+            FAILURES.inc(platform=result.platform, reason="error")
+        finally:
+            INFLIGHT_JOBS.dec()
+        return result
+
+
+async def send_videos(message, results) -> None:
+    """Одно видео — обычным сообщением, несколько — альбомами"""
+    for chunk in media_group_chunks(results):
+        platforms = {result.platform for result in chunk}
+        platform = platforms.pop() if len(platforms) == 1 else "mixed"
+        with track_stage("upload", platform) as upload:
+            if len(chunk) == 1:
+                await message.reply_video(
+                    video=chunk[0].video_data,
+                    caption=trim_caption(chunk[0].caption),
+                    filename=f"{platform}_video.mp4",
+                    **UPLOAD_TIMEOUTS,
+                )
+            else:
+                await message.reply_media_group(
+                    media=[as_input_media(result) for result in chunk],
+                    **UPLOAD_TIMEOUTS,
+                )
+        for result in chunk:
+            result.stages.add_stage("upload", upload.started, upload.elapsed)
 
 
+@traced("update")
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not update.message or not update.message.text:
         return
@@ -71,24 +279,15 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         f"📨 Received message from user {user.id} (@{user.username}) in {'group' if is_group else 'private'} chat: {message_text}"
     )
 
-    # Определяем платформу из URL
-    platform = "unknown"
-    downloader_provider = downloader.get_downloader(message_text)
-    if downloader_provider:
-        platform = getattr(downloader_provider, "platform", "unknown")
-        # Если platform пустая строка, используем fallback
-        if not platform:
-            platform = (
-                downloader_provider.__class__.__name__.replace("Provider", "").lower()
-                or "unknown"
-            )
+    # Для групп статистику ведём по chat.id, для приватных чатов - по user.id
+    if is_group:
+        stats_id, stats_name = chat.id, chat.title or ""
+    else:
+        stats_id, stats_name = user.id, user.username
 
-    # В группах не показываем служебные сообщения
-    processing_msg = None
-    if not is_group:
-        processing_msg = await update.message.reply_text(
-            t("processing_video", user=user)
-        )
+    # Все поддерживаемые ссылки сообщения, без дублей; короткие ссылки
+    # разворачиваются по сети уже после допуска в очередь
+    links = extract_links(update.message, downloader)
 
     # Считаем группу «подписчиком» при любой активности
     if is_group:
@@ -97,141 +296,106 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         except Exception as e:
             logger.debug(f"Failed to track group message: {e}")
 
-    try:
-        # Общий таймаут на весь процесс: 5 минут
-        start_time = time.time()
-
-        async def process_video():
-            video_data, caption, platform = downloader.download_video(message_text)
-
-            if not video_data:
-                processing_time = time.time() - start_time
-                # Для групп используем chat.id, для приватных чатов - user.id
-                if is_group:
-                    stats_collector.track_download_failure(
-                        chat.id,
-                        chat.title or "",
-                        platform or "unknown",
-                        "Video not found or unavailable",
-                        processing_time,
-                    )
-                else:
-                    stats_collector.track_download_failure(
-                        user.id,
-                        user.username,
-                        platform or "unknown",
-                        "Video not found or unavailable",
-                        processing_time,
-                    )
-                # В группах не показываем ошибки
-                if not is_group and processing_msg:
-                    await processing_msg.edit_text(
-                        t("error_video_not_found", user=user)
-                    )
-                return
-
-            processing_time = time.time() - start_time
-            logger.info(
-                f"Video successfully downloaded from {platform} for user {user.id}, size: {len(video_data)} bytes"
+    # При перегрузке не берём задачи, которые всё равно не дождутся очереди:
+    # группы отсекаются раньше и молча, в личке объясняем
+    decision = admission.admit(private=not is_group)
+    if not decision.admitted:
+        logger.warning(
+            f"Shedding {len(links)} link(s) from chat {chat.id}: "
+            f"estimated wait {decision.wait_s:.0f}s"
+        )
+        admission.shed(not is_group, len(links), decision.wait_s)
+        if not is_group:
+            await update.message.reply_text(
+                t("error_overloaded", user=user, minutes=_minutes(decision.wait_s))
             )
+        return
 
-            # В группах не показываем сообщение "Отправляю видео..."
-            if not is_group and processing_msg:
-                await processing_msg.edit_text(t("sending_video", user=user))
-
-            if caption and len(caption) > 1024:
-                caption = caption[:1021] + "..."
-
-            filename = f"{platform}_video.mp4"
-
-            await update.message.reply_video(
-                video=video_data,
-                caption=caption,
-                filename=filename,
-                read_timeout=120,  # 2 минуты на чтение
-                write_timeout=120,  # 2 минуты на запись
-                connect_timeout=30,  # 30 секунд на подключение
-                pool_timeout=30,  # 30 секунд на получение соединения из пула
+    # В группах не показываем служебные сообщения
+    processing_msg = None
+    if not is_group:
+        if decision.position:
+            text = t(
+                "queue_position",
+                user=user,
+                position=decision.position,
+                minutes=_minutes(decision.wait_s),
             )
+        else:
+            text = t("processing_video", user=user)
+        processing_msg = await update.message.reply_text(text)
 
-            # Отслеживаем успешное скачивание
-            # Для групп используем chat.id, для приватных чатов - user.id
-            if is_group:
-                stats_collector.track_download_success(
-                    chat.id,
-                    chat.title or "",
-                    platform,
-                    len(video_data),
-                    processing_time,
-                )
-            else:
-                stats_collector.track_download_success(
-                    user.id,
-                    user.username,
-                    platform,
-                    len(video_data),
-                    processing_time,
-                )
+    # Не в цикле событий: редиректы разворачиваются по сети
+    links = await asyncio.to_thread(resolve_links, links, downloader)
 
-            # Удаляем сообщения только в личных чатах
-            if not is_group:
-                try:
-                    # Удаляем исходное сообщение с ссылкой
-                    await update.message.delete()
-                    logger.info(f"Original message deleted for user {user.id}")
-
-                    # Удаляем сообщение "Отправляю видео..."
-                    if processing_msg:
-                        await processing_msg.delete()
-                        logger.info(f"Processing message deleted for user {user.id}")
-                except Exception as delete_error:
-                    logger.warning(
-                        f"Failed to delete messages for user {user.id}: {delete_error}"
-                    )
-
-            logger.info(f"Video successfully sent to user {user.id}")
-
-        # Выполняем с общим таймаутом 5 минут
-        await asyncio.wait_for(process_video(), timeout=300)
-
-    except asyncio.TimeoutError:
-        processing_time = time.time() - start_time
-        logger.error(f"Timeout processing video for user {user.id}")
-        # Для групп используем chat.id, для приватных чатов - user.id
-        if is_group:
-            stats_collector.track_download_failure(
-                chat.id,
-                chat.title or "",
-                "unknown",
-                "Processing timeout",
+    # Ссылки качаем параллельно через общую справедливую очередь (лимиты
+    # на пользователя и чат), у каждой — своя разбивка по стадиям
+    results = await asyncio.gather(
+        *(fetch_link(link, user.id, chat.id, not is_group) for link in links)
+    )
+    downloaded = [result for result in results if result.ok]
+
+    if downloaded:
+        # В группах не показываем сообщение "Отправляю видео..."
+        if not is_group and processing_msg:
+            await processing_msg.edit_text(t("sending_video", user=user))
+        try:
+            await send_videos(update.message, downloaded)
+            for result in downloaded:
+                result.outcome = "success"
+            logger.info(f"{len(downloaded)} video(s) successfully sent to {user.id}")
+        except Exception as e:
+            logger.error(f"Error sending videos for user {user.id}: {e}")
+            for result in downloaded:
+                result.outcome = "error"
+                result.error = str(e)
+                FAILURES.inc(platform=result.platform, reason="error")
+
+    for result in results:
+        result.stages.set("outcome", result.outcome)
+        processing_time = result.elapsed
+        if result.outcome == "success":
+            stats_collector.track_download_success(
+                stats_id,
+                stats_name,
+                result.platform,
+                len(result.video_data),
                 processing_time,
+                breakdown=result.stages.as_dict(),
             )
         else:
             stats_collector.track_download_failure(
-                user.id,
-                user.username,
-                "unknown",
-                "Processing timeout",
+                stats_id,
+                stats_name,
+                result.platform,
+                result.error,
                 processing_time,
+                breakdown=result.stages.as_dict(),
             )
-        # В группах не показываем ошибки
-        if not is_group and processing_msg:
-            await processing_msg.edit_text(t("error_processing_timeout", user=user))
-    except Exception as e:
-        processing_time = time.time() - start_time
-        logger.error(f"Error downloading video for user {user.id}: {e}")
-        # Для групп используем chat.id, для приватных чатов - user.id
-        if is_group:
-            stats_collector.track_download_failure(
-                chat.id, chat.title or "", "unknown", str(e), processing_time
-            )
-        else:
-            stats_collector.track_download_failure(
-                user.id, user.username, "unknown", str(e), processing_time
+        slow_request_log.maybe_record(processing_time, result.platform, result.stages)
+
+    if is_group:
+        return
+
+    failed = [result for result in results if result.outcome != "success"]
+    if len(failed) < len(results):
+        # Удаляем сообщения только в личных чатах
+        try:
+            # Удаляем исходное сообщение с ссылкой
+            await update.message.delete()
+            logger.info(f"Original message deleted for user {user.id}")
+
+            # Удаляем сообщение "Отправляю видео...", если не о чем сообщить
+            if processing_msg and not failed:
+                await processing_msg.delete()
+                logger.info(f"Processing message deleted for user {user.id}")
+        except Exception as delete_error:
+            logger.warning(
+                f"Failed to delete messages for user {user.id}: {delete_error}"
             )
+    if failed and processing_msg:
         # В группах не показываем ошибки
-        if not is_group and processing_msg:
-            await processing_msg.edit_text(t("error_unknown", user=user))
+        await processing_msg.edit_text(_failure_text(failed, len(results), user))
 
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -261,24 +425,91 @@ async def handle_my_chat_member(
         logger.warning(f"Failed to process my_chat_member: {e}")
 
 
-def main() -> None:
-    logger.info("Starting Telegram Video Downloader Bot")
+async def post_init(application: Application) -> None:
+    # Сторож event loop: задержка планирования + стек при блокировке
+    loop_watchdog.start(application)
 
-    # Отслеживаем запуск бота
-    stats_collector.track_bot_start()
+    # Калибровка пресета и числа сжатий (сохранённая для узла или новая) —
+    # до приёма сообщений: под живой нагрузкой замер исказится, а первые
+    # задачи сжимались бы с настройками по умолчанию
+    try:
+        await asyncio.to_thread(ensure_calibrated)
+    except Exception as e:
+        logger.warning(f"Calibration failed, using defaults: {e}")
+
+    # Прогрев до начала polling: первый запрос не платит за импорт
+    # экстракторов, DNS, TLS и первый запуск ffmpeg
+    if warmup_enabled():
+        await warm_up(application.bot, downloader.downloaders)
+    READY.set(1)
+    logger.info("Bot is ready")
 
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # Отброшенные при перегрузке ссылки — в статистику раз в интервал
+    application.create_task(admission.run_reports(stats_collector.track_requests_shed))
+
+    # Фоновый прогрев кэша yt-dlp (player JS YouTube) и пула YoutubeDL
+    youtube = next(d for d in downloader.downloaders if d.platform == "youtube")
+    application.create_task(asyncio.to_thread(warm_cache, youtube))
+
+    # SIGUSR1 — профилирование на PROFILE_SECONDS с записью отчёта в PROFILE_DIR
+    seconds = int(os.getenv("PROFILE_SECONDS", "30"))
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGUSR1,
+            lambda: application.create_task(profiler.run_for(seconds)),
+        )
+    except (NotImplementedError, AttributeError, RuntimeError) as e:
+        logger.debug(f"Profiling signal handler is not available: {e}")
+
+
+async def post_shutdown(application: Application) -> None:
+    # Остаток счётчиков отброшенных ссылок, не дождавшийся очередного отчёта
+    pending = admission.flush(force=True)
+    if pending:
+        stats_collector.track_requests_shed(*pending)
+
+
+def build_application() -> Application:
+    # Апдейты обрабатываются параллельно: пока одно сообщение ждёт загрузки,
+    # следующие проходят допуск и встают в общую справедливую очередь
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("contact", contact_command))
+    application.add_handler(CommandHandler("profile", profile_command))
+    # В группах до обработчика доходят только сообщения со ссылками платформ
     application.add_handler(
-        MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message)
+        MessageHandler(
+            filters.TEXT
+            & ~filters.COMMAND
+            & (filters.ChatType.PRIVATE | SUPPORTED_LINK),
+            handle_message,
+        )
     )
     application.add_handler(
         ChatMemberHandler(handle_my_chat_member, ChatMemberHandler.MY_CHAT_MEMBER)
     )
     application.add_error_handler(error_handler)
+    return application
+
+
+def main() -> None:
+    logger.info("Starting Telegram Video Downloader Bot")
+
+    # Отслеживаем запуск бота
+    stats_collector.track_bot_start()
+
+    start_metrics_server()
+
+    application = build_application()
 
     logger.info("Bot started and waiting for messages...")
 
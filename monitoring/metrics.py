@@ -0,0 +1,314 @@
+import logging
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+# Бакеты по умолчанию (секунды): от быстрых стадий до «хвостов» в минуты
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counter can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+            for k, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets)) + (math.inf,)
+        # key -> (счётчики по бакетам, сумма, количество)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (k, (list(c), s, n)) for k, (c, s, n) in self._values.items()
+            )
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                labels = _format_labels(
+                    self.labelnames + ("le",), key + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            base = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{base} {_format_value(total)}")
+            lines.append(f"{self.name}_count{base} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "shortly_stage_duration_seconds",
+    "Duration of request processing stages (extract, download, encode, upload)",
+    ("stage", "platform"),
+)
+CACHE_LOOKUPS = registry.counter(
+    "shortly_cache_lookups_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ("cache", "result"),
+)
+ENCODES = registry.counter(
+    "shortly_encodes_total",
+    "Videos re-encoded to fit the size limit",
+    ("platform",),
+)
+FAILURES = registry.counter(
+    "shortly_failures_total",
+    "Failed requests by platform and reason",
+    ("platform", "reason"),
+)
+INFLIGHT_JOBS = registry.gauge(
+    "shortly_inflight_jobs",
+    "Requests currently being processed",
+)
+SCRATCH_BYTES = registry.gauge(
+    "shortly_scratch_bytes",
+    "Bytes held in temporary download/encode directories",
+)
+QUEUE_WAIT_SECONDS = registry.histogram(
+    "shortly_queue_wait_seconds",
+    "Time downloads wait in the fair scheduler by flow kind (private/group)",
+    ("kind",),
+)
+QUEUE_DEPTH = registry.gauge(
+    "shortly_queue_depth",
+    "Downloads waiting in the fair scheduler by flow kind",
+    ("kind",),
+)
+SHED_REQUESTS = registry.counter(
+    "shortly_shed_total",
+    "Links rejected by admission control by flow kind (private/group)",
+    ("kind",),
+)
+CIRCUIT_STATE = registry.gauge(
+    "shortly_circuit_state",
+    "Per-platform circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ("platform",),
+)
+RATE_LIMIT_WAIT_SECONDS = registry.histogram(
+    "shortly_rate_limit_wait_seconds",
+    "Time requests wait for an outbound per-platform rate limit token",
+    ("platform",),
+)
+CONCURRENCY_LIMIT = registry.gauge(
+    "shortly_concurrency_limit",
+    "Current adaptive concurrency limit by pool (download/encode)",
+    ("pool",),
+)
+WARMUP_SECONDS = registry.gauge(
+    "shortly_warmup_step_seconds",
+    "Duration of startup warm-up steps",
+    ("step",),
+)
+READY = registry.gauge(
+    "shortly_ready",
+    "1 once startup (and warm-up, if enabled) has finished",
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics_registry: MetricsRegistry = registry
+
+    def do_GET(self):  # noqa: N802 - имя задано BaseHTTPRequestHandler
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.metrics_registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics: " + format, *args)
+
+
+def start_metrics_server(
+    port: Optional[int] = None, addr: Optional[str] = None
+) -> Optional[ThreadingHTTPServer]:
+    """
+    Поднимает HTTP-эндпоинт /metrics в фоновом потоке.
+    Порт берётся из METRICS_PORT; если он не задан или равен 0 — сервер не стартует.
+    """
+    if port is None:
+        port = int(os.getenv("METRICS_PORT", "0"))
+    if not port:
+        return None
+    if addr is None:
+        addr = os.getenv("METRICS_ADDR", "0.0.0.0")  # nosec B104
+
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name="metrics-server", daemon=True
+    )
+    thread.start()
+    logger.info(f"Metrics endpoint listening on {addr}:{server.server_address[1]}")
+    return server
@@ -0,0 +1,170 @@
+import asyncio
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# С Python 3.12 cProfile построен на sys.monitoring: профиль сессии видит все
+# потоки, а второй активный профайлер не запускается (ValueError)
+SESSION_COVERS_THREADS = sys.version_info >= (3, 12)
+
+
+class ProfilerSession:
+    """
+    Профилирование живого процесса по запросу: cProfile на потоке event loop
+    (handle_message и всё, что в нём выполняется) плюс профили вызовов
+    горячих путей в рабочих потоках (см. @profiled), а также разница
+    снимков tracemalloc за время сессии. Результаты пишутся в PROFILE_DIR.
+    """
+
+    def __init__(self, output_dir: Optional[str] = None, top: int = 15):
+        self.output_dir = output_dir or os.getenv("PROFILE_DIR", "profiles")
+        self.top = top
+        self._lock = threading.Lock()
+        self._active = False
+        self._owner_thread: Optional[int] = None
+        self._loop_profile: Optional[cProfile.Profile] = None
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started_tracemalloc = False
+        self._started_at = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def start(self, memory: bool = True) -> bool:
+        with self._lock:
+            if self._active:
+                return False
+            self._active = True
+            self._owner_thread = threading.get_ident()
+            self._thread_profiles = []
+            self._started_at = time.time()
+
+        if memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._started_tracemalloc = True
+            self._snapshot = tracemalloc.take_snapshot()
+
+        self._loop_profile = cProfile.Profile()
+        self._loop_profile.enable()
+        logger.warning("Profiling session started")
+        return True
+
+    def add_profile(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            if self._active:
+                self._thread_profiles.append(profile)
+
+    def owns_current_thread(self) -> bool:
+        return self._owner_thread == threading.get_ident()
+
+    def stop(self) -> Optional[str]:
+        """Останавливает сессию, пишет отчёт в файл и возвращает его текст."""
+        if not self._active:
+            return None
+        if self._loop_profile is not None:
+            self._loop_profile.disable()
+
+        with self._lock:
+            self._active = False
+            profiles = [p for p in [self._loop_profile] if p] + self._thread_profiles
+            self._thread_profiles = []
+            self._loop_profile = None
+
+        duration = time.time() - self._started_at
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._started_at))
+        base = os.path.join(self.output_dir, f"profile-{stamp}")
+
+        report = io.StringIO()
+        report.write(f"Profiling session: {duration:.1f}s\n\n")
+
+        stats = pstats.Stats(profiles[0], stream=report)
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(base + ".pstats")
+        report.write("Top functions by cumulative time:\n")
+        stats.sort_stats("cumulative").print_stats(self.top)
+
+        if self._snapshot is not None:
+            current = tracemalloc.take_snapshot()
+            report.write("\nTop allocation sites (growth since start):\n")
+            for diff in current.compare_to(self._snapshot, "lineno")[: self.top]:
+                report.write(f"{diff}\n")
+            self._snapshot = None
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+        text = report.getvalue()
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(text)
+        logger.warning(f"Profiling session finished, report: {base}.txt")
+        return text
+
+    async def run_for(self, seconds: float, memory: bool = True) -> Optional[str]:
+        if not self.start(memory=memory):
+            return None
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            report = self.stop()
+        return report
+
+
+def summarize(report: str, lines: int = 25) -> str:
+    """Короткая выжимка отчёта для сообщения в Telegram"""
+    result = []
+    for line in report.splitlines():
+        if line.strip():
+            result.append(line.rstrip())
+        if len(result) >= lines:
+            break
+    return "\n".join(result)
+
+
+def profiled(func):
+    """
+    Декоратор для горячих путей, выполняющихся в рабочих потоках:
+    пока идёт сессия профилирования, вызов профилируется отдельно
+    и добавляется в общий отчёт. На 3.12+ рабочие потоки и так попадают
+    в профиль сессии, и декоратор ничего не делает.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if (
+            not profiler.active
+            or SESSION_COVERS_THREADS
+            or profiler.owns_current_thread()
+        ):
+            # Вызов уже покрыт общим профилем сессии
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Активен другой профайлер — профилировать вызов отдельно нельзя
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            profiler.add_profile(profile)
+
+    return wrapper
+
+
+profiler = ProfilerSession()
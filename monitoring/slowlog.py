@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Optional
+
+from monitoring.stages import RequestStages
+from monitoring.tracing import current_correlation_id
+
+logger = logging.getLogger(__name__)
+
+
+class SlowRequestLog:
+    """
+    Журнал медленных запросов: если общее время обработки превысило порог,
+    пишет JSON-запись с полной разбивкой по стадиям в ротируемый файл.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        backup_count: Optional[int] = None,
+    ):
+        self.path = path or os.getenv("SLOW_REQUEST_LOG", "slow_requests.jsonl")
+        self.threshold = (
+            threshold
+            if threshold is not None
+            else float(os.getenv("SLOW_REQUEST_THRESHOLD_S", "60"))
+        )
+        self.max_bytes = max_bytes or int(
+            os.getenv("SLOW_REQUEST_LOG_MAX_BYTES", str(10 * 1024 * 1024))
+        )
+        self.backup_count = backup_count or int(
+            os.getenv("SLOW_REQUEST_LOG_BACKUPS", "5")
+        )
+        self._handler: Optional[RotatingFileHandler] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0 and bool(self.path)
+
+    def _get_handler(self) -> RotatingFileHandler:
+        # Файл открываем лениво — только при первой медленной записи
+        if self._handler is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._handler = RotatingFileHandler(
+                self.path,
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                encoding="utf-8",
+            )
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+        return self._handler
+
+    def build_record(
+        self, total_time: float, platform: str, stages: RequestStages
+    ) -> Dict[str, Any]:
+        details = stages.as_dict()
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "correlation_id": current_correlation_id(),
+            "total_time": round(total_time, 3),
+            "platform": platform,
+            "content_key": details.pop("content_key", None),
+            "outcome": details.pop("outcome", None),
+            "format_id": details.pop("format_id", None),
+            "retries": details.pop("retries", 0),
+            "downloaded_bytes": details.pop("downloaded_bytes", None),
+            "encoded_bytes": details.pop("encoded_bytes", None),
+            "sent_bytes": details.pop("sent_bytes", None),
+            "encode_profile": details.pop("encode_profile", None),
+            "stages": details.pop("stages", {}),
+            "extra": details,
+        }
+
+    def maybe_record(
+        self, total_time: float, platform: str, stages: RequestStages
+    ) -> bool:
+        if not self.enabled or total_time < self.threshold:
+            return False
+        try:
+            entry = self.build_record(total_time, platform, stages)
+            line = json.dumps(entry, ensure_ascii=False, default=str)
+            record = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0, line, None, None
+            )
+            with self._lock:
+                self._get_handler().emit(record)
+            logger.warning(
+                f"Slow request: {platform} {entry['content_key']} took {total_time:.1f}s"
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write slow request record: {e}")
+            return False
+
+
+slow_request_log = SlowRequestLog()
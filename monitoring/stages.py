@@ -0,0 +1,104 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from monitoring.metrics import STAGE_SECONDS
+from monitoring.tracing import tracer
+
+_current: ContextVar[Optional["RequestStages"]] = ContextVar(
+    "request_stages", default=None
+)
+
+
+class RequestStages:
+    """
+    Разбивка одного запроса по стадиям: смещение начала и длительность каждой
+    стадии относительно старта запроса плюс произвольные детали (байты, формат).
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.details: Dict[str, Any] = {}
+
+    def add_stage(self, name: str, started: float, duration: float) -> None:
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = {
+                "started_at": round(started - self.started, 3),
+                "duration": round(duration, 3),
+            }
+        else:
+            # Стадия могла повториться (например, fallback-скачивание) — суммируем
+            entry["duration"] = round(entry["duration"] + duration, 3)
+
+    def set(self, key: str, value: Any) -> None:
+        self.details[key] = value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.details.get(key, default)
+
+    def duration(self, name: str) -> Optional[float]:
+        entry = self.stages.get(name)
+        return entry["duration"] if entry else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"stages": {k: dict(v) for k, v in self.stages.items()}}
+        data.update(self.details)
+        return data
+
+
+def current_stages() -> Optional[RequestStages]:
+    return _current.get()
+
+
+def record(key: str, value: Any) -> None:
+    """Записывает деталь в текущий запрос; вне запроса — ничего не делает."""
+    stages = _current.get()
+    if stages is not None:
+        stages.set(key, value)
+
+
+def increment(key: str, amount: int = 1) -> None:
+    """Увеличивает счётчик в текущем запросе (например, число повторов)"""
+    stages = _current.get()
+    if stages is not None:
+        stages.set(key, stages.get(key, 0) + amount)
+
+
+@contextmanager
+def collect_stages() -> Iterator[RequestStages]:
+    stages = RequestStages()
+    token = _current.set(stages)
+    try:
+        yield stages
+    finally:
+        _current.reset(token)
+
+
+class track_stage:
+    """
+    Контекстный менеджер: замеряет длительность стадии в STAGE_SECONDS,
+    добавляет её в разбивку текущего запроса и открывает дочерний спан.
+    """
+
+    def __init__(self, stage: str, platform: str):
+        self.stage = stage
+        self.platform = platform or "unknown"
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.span = tracer.start_span(self.stage, platform=self.platform)
+        self.span.__enter__()
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.monotonic() - self.started
+        self.span.__exit__(exc_type, exc, tb)
+        STAGE_SECONDS.observe(self.elapsed, stage=self.stage, platform=self.platform)
+        stages = _current.get()
+        if stages is not None:
+            stages.add_stage(self.stage, self.started, self.elapsed)
+        return False
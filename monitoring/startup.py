@@ -0,0 +1,88 @@
+import importlib
+import re
+import sys
+import threading
+from types import ModuleType
+from typing import Any, Dict, List, NamedTuple
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+class LazyModule(ModuleType):
+    """
+    Модуль, который импортируется при первом обращении к атрибуту.
+
+    Тяжёлые зависимости (yt_dlp, pika) не нужны для запуска бота и команд —
+    их импорт откладывается до первой загрузки или публикации. В отличие от
+    importlib.util.LazyLoader загрузка потокобезопасна: к yt_dlp первыми
+    могут обратиться сразу несколько задач из asyncio.to_thread.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with self.__dict__["_lazy_lock"]:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_lazy_module"] is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Модуль name, если он уже импортирован, иначе ленивая обёртка над ним"""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportTime]:
+    """Разбирает вывод python -X importtime (stderr)"""
+    entries = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append(
+                ImportTime(module, int(self_us), int(cumulative_us), len(indent) // 2)
+            )
+    return entries
+
+
+def import_report(entries: List[ImportTime], top: int = 15) -> Dict[str, Any]:
+    """
+    Сводка для сравнения между релизами: общее время импорта, время по
+    пакетам верхнего уровня и самые дорогие модули.
+    """
+    packages: Dict[str, int] = {}
+    for entry in entries:
+        package = entry.module.split(".", 1)[0]
+        packages[package] = packages.get(package, 0) + entry.self_us
+    slowest = sorted(entries, key=lambda e: e.self_us, reverse=True)[:top]
+    return {
+        "total_ms": round(sum(e.self_us for e in entries) / 1000, 1),
+        "modules": len(entries),
+        "packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]
+        },
+        "slowest_ms": {e.module: round(e.self_us / 1000, 1) for e in slowest},
+    }
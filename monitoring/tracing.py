@@ -0,0 +1,269 @@
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    Один участок обработки запроса. Корневой спан создаётся на update,
+    дочерние — на маршрутизацию, извлечение, скачивание, кодирование и отправку.
+    Используется как контекстный менеджер: на входе становится текущим.
+    """
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        parent: Optional["Span"] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.sampled = parent.sampled if parent else tracer.should_sample()
+        # Все спаны одной трассы копятся в общем списке корневого спана
+        self._finished: List["Span"] = parent._finished if parent else []
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    @property
+    def is_root(self) -> bool:
+        return self.parent_id is None
+
+    @property
+    def duration(self) -> float:
+        return max(self.end_ns - self.start_ns, 0) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        if self.sampled:
+            self._finished.append(self)
+            if self.is_root:
+                self.tracer.export(self._finished)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration": round(self.duration, 6),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class FileSpanExporter:
+    """Пишет завершённые трассы в файл в формате JSON Lines (одна трасса — строка)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        line = json.dumps(
+            {
+                "trace_id": spans[0].trace_id,
+                "spans": [s.to_dict() for s in spans],
+            },
+            ensure_ascii=False,
+            default=str,
+        )
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPHttpExporter:
+    """
+    Отправляет трассы в OTLP/HTTP (JSON) коллектор, например
+    http://collector:4318/v1/traces. Отправка идёт из фонового потока,
+    чтобы не блокировать обработку запросов.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "shortlybot"):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._queue: "queue.Queue[List[Span]]" = queue.Queue(maxsize=1000)
+        self._thread = threading.Thread(
+            target=self._worker, name="trace-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, spans: List[Span]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            logger.debug("Trace export queue is full, dropping trace")
+
+    def build_payload(self, spans: List[Span]) -> Dict[str, Any]:
+        otlp_spans = []
+        for s in spans:
+            span = {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [
+                    {"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()
+                ],
+                "status": {"code": 2, "message": s.error} if s.error else {},
+            }
+            if s.parent_id:
+                span["parentSpanId"] = s.parent_id
+            otlp_spans.append(span)
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {"scope": {"name": "shortlybot"}, "spans": otlp_spans}
+                    ],
+                }
+            ]
+        }
+
+    def _post(self, spans: List[Span]) -> None:
+        body = json.dumps(self.build_payload(spans), default=str).encode("utf-8")
+        req = urllib.request.Request(  # nosec B310 - адрес коллектора из конфигурации
+            self.endpoint,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(req, timeout=5):  # nosec B310
+            pass
+
+    def _worker(self) -> None:
+        while True:
+            spans = self._queue.get()
+            try:
+                self._post(spans)
+            except Exception as e:
+                logger.debug(f"Failed to export trace: {e}")
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate: Optional[float] = None):
+        if sample_rate is None:
+            sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.exporter = exporter if exporter is not None else self._exporter_from_env()
+
+    def _exporter_from_env(self):
+        endpoint = os.getenv("TRACE_OTLP_ENDPOINT")
+        if endpoint:
+            return OTLPHttpExporter(
+                endpoint, os.getenv("TRACE_SERVICE_NAME", "shortlybot")
+            )
+        path = os.getenv("TRACE_EXPORT_FILE")
+        if path:
+            return FileSpanExporter(path)
+        return None
+
+    def should_sample(self) -> bool:
+        if self.exporter is None or self.sample_rate <= 0:
+            return False
+        # Сэмплирование не криптографическое — достаточно random
+        return self.sample_rate >= 1 or random.random() < self.sample_rate  # nosec B311
+
+    def start_span(self, name: str, **attributes: Any) -> Span:
+        return Span(self, name, parent=_current_span.get(), attributes=attributes)
+
+    def export(self, spans: List[Span]) -> None:
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export(list(spans))
+        except Exception as e:
+            logger.debug(f"Failed to export trace: {e}")
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def current_correlation_id() -> Optional[str]:
+    """Идентификатор корреляции = trace_id текущей трассы"""
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+def traced(name: str):
+    """Декоратор для async-обработчиков: оборачивает вызов в корневой спан."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            attributes = {}
+            update_id = getattr(args[0], "update_id", None) if args else None
+            if isinstance(update_id, int):
+                attributes["update_id"] = update_id
+            with tracer.start_span(name, **attributes):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Добавляет correlation_id в записи логов (или «-», если трассы нет)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = current_correlation_id() or "-"
+        return True
+
+
+tracer = Tracer()
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+
+from monitoring.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOOP_LAG_SECONDS = registry.gauge(
+    "shortly_event_loop_lag_seconds",
+    "Last measured event loop scheduling delay",
+)
+LOOP_LAG_QUANTILES = registry.gauge(
+    "shortly_event_loop_lag_quantile_seconds",
+    "Event loop scheduling delay percentiles over the recent window",
+    ("quantile",),
+)
+LOOP_BLOCKED = registry.counter(
+    "shortly_event_loop_blocked_total",
+    "Event loop stalls above the threshold by blocking function",
+    ("function",),
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _is_project_frame(filename: str) -> bool:
+    path = os.path.abspath(filename)
+    return path.startswith(PROJECT_ROOT) and "site-packages" not in path
+
+
+def describe_blocker(frames: List[traceback.FrameSummary]) -> str:
+    """
+    По стеку потока event loop определяет, кто его блокирует:
+    самый глубокий кадр (что именно выполняется) и ближайший к нему кадр
+    из кода проекта (кто это вызвал).
+    """
+    if not frames:
+        return "unknown"
+    innermost = frames[-1]
+    where = f"{os.path.basename(innermost.filename)}:{innermost.name}"
+    for frame in reversed(frames):
+        if _is_project_frame(frame.filename):
+            caller = f"{os.path.relpath(frame.filename, PROJECT_ROOT)}:{frame.name}"
+            if frame is innermost:
+                return caller
+            return f"{where} ← {caller}"
+    return where
+
+
+class LoopWatchdog:
+    """
+    Сторож event loop: корутина в цикле отмечает «сердцебиение» и меряет
+    задержку планирования, а фоновый поток проверяет, что сердцебиение
+    не пропало. Если цикл завис дольше порога — снимаем стек потока цикла
+    и логируем, какая функция его блокирует.
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        threshold: Optional[float] = None,
+        window: int = 600,
+    ):
+        self.interval = (
+            interval
+            if interval is not None
+            else float(os.getenv("LOOP_WATCHDOG_INTERVAL_S", "0.5"))
+        )
+        self.threshold = (
+            threshold
+            if threshold is not None
+            else float(os.getenv("LOOP_LAG_THRESHOLD_S", "1.0"))
+        )
+        self._samples: deque = deque(maxlen=window)
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stall_reported = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def beat(self, lag: float) -> None:
+        self._last_beat = time.monotonic()
+        self._stall_reported = False
+        self._samples.append(lag)
+        LOOP_LAG_SECONDS.set(lag)
+
+    def percentiles(self) -> Dict[float, float]:
+        samples = sorted(self._samples)
+        if not samples:
+            return {q: 0.0 for q in QUANTILES}
+        return {
+            q: samples[min(int(q * len(samples)), len(samples) - 1)] for q in QUANTILES
+        }
+
+    def export_percentiles(self) -> None:
+        for q, value in self.percentiles().items():
+            LOOP_LAG_QUANTILES.set(value, quantile=str(q))
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        beats = 0
+        while not self._stop.is_set():
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.beat(max(loop.time() - started - self.interval, 0.0))
+            beats += 1
+            if beats % 10 == 0:
+                self.export_percentiles()
+
+    def check(self) -> Optional[str]:
+        """Проверка из фонового потока; возвращает описание блокировщика."""
+        if self._loop_thread_id is None or self._stall_reported:
+            return None
+        stalled = time.monotonic() - self._last_beat - self.interval
+        if stalled < self.threshold:
+            return None
+
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        frames = traceback.extract_stack(frame)
+        blocker = describe_blocker(frames)
+        self._stall_reported = True
+        LOOP_BLOCKED.inc(function=blocker)
+        logger.warning(
+            f"Event loop blocked for {stalled:.2f}s by {blocker}\n"
+            + "".join(traceback.format_list(frames[-15:]))
+        )
+        return blocker
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.debug(f"Watchdog check failed: {e}")
+
+    def start(self, application=None) -> None:
+        """Запускает корутину сердцебиения и поток-наблюдатель."""
+        if application is not None:
+            application.create_task(self.run())
+        else:
+            asyncio.get_running_loop().create_task(self.run())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+loop_watchdog = LoopWatchdog()
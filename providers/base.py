@@ -1,19 +1,42 @@
+import functools
 import glob
 import logging
 import os
 import re
-import shutil
 import subprocess  # nosec B404 - используется для вызова ffmpeg, безопасно
 import tempfile
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Tuple, Union
-
-import yt_dlp
+from typing import Dict, List, Optional, Pattern, Tuple, Union
+from urllib.parse import urlsplit
+
+from monitoring.metrics import ENCODES, SCRATCH_BYTES
+from monitoring.profiler import profiled
+from monitoring.stages import increment, record, track_stage
+from monitoring.startup import lazy_import
+from monitoring.tracing import tracer
+from providers.calibration import bandwidth_bps, encode_preset, encode_speed
+from providers.cookies import cookie_store
+from providers.errors import LIVE, TOO_LARGE, TOO_LONG, DownloadError
+from providers.limits import encode_limit, rate_limiters
+from providers.ytdlp_cache import cache_dir, install_cache
+from providers.ytdlp_pool import YoutubeDLPool
 
 logger = logging.getLogger(__name__)
 
+# yt-dlp импортируется при первой загрузке, а не при старте бота
+yt_dlp = lazy_import("yt_dlp")
+
 KindId = Tuple[str, str]
 
+_POOLS_LOCK = threading.Lock()
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/126.0.0.0 Safari/537.36"
+)
+
 
 def human(n: int) -> str:
     for unit in ("B", "KB", "MB", "GB"):
@@ -23,6 +46,54 @@ def human(n: int) -> str:
     return f"{n:.1f} TB"
 
 
+@functools.lru_cache(maxsize=None)
+def extractor_class(ie_key: str):
+    return yt_dlp.extractor.get_info_extractor(ie_key)
+
+
+@functools.lru_cache(maxsize=None)
+def allowed_extractors(ie_keys: Tuple[str, ...]) -> List[str]:
+    # allowed_extractors в yt-dlp — регулярки по IE_NAME в нижнем регистре
+    return [re.escape(extractor_class(key).IE_NAME.lower()) for key in ie_keys]
+
+
+def estimate_filesize(info: Dict) -> Optional[int]:
+    """
+    Оценка размера скачиваемого файла по метаданным yt-dlp: для склеиваемых
+    форматов (видео + аудио) суммируем части, при отсутствии размера
+    считаем по битрейту и длительности.
+    """
+    duration = info.get("duration") or 0
+    total = 0
+    for fmt in info.get("requested_formats") or [info]:
+        size = fmt.get("filesize") or fmt.get("filesize_approx")
+        if not size and fmt.get("tbr") and duration:
+            size = fmt["tbr"] * 1000 / 8 * duration
+        if not size:
+            return None
+        total += size
+    return int(total)
+
+
+def estimate_cost(
+    info: Dict, target_bytes: int, bandwidth_bps: float, encode_speed: float
+) -> float:
+    """
+    Оценка стоимости задачи в секундах работы воркера: скачивание по
+    оценённому размеру и, если файл не влезет в лимит, двухпроходное
+    сжатие (encode_speed — секунд кодирования на секунду видео).
+    """
+    duration = float(info.get("duration") or 0.0)
+    size = estimate_filesize(info)
+    if size is None:
+        # Без размера считаем по типичному битрейту ~2.5 Мбит/с
+        size = duration * 2_500_000 / 8
+    cost = 1.0 + size / max(bandwidth_bps / 8, 1.0)
+    if size > target_bytes:
+        cost += duration * encode_speed
+    return cost
+
+
 def compress_to_target(
     inp: str,
     outp: str,
@@ -30,11 +101,14 @@ def compress_to_target(
     target_bytes: int,
     max_height: int = 1080,
     audio_kbps: int = 128,
+    preset: Optional[str] = None,
 ) -> None:
     """
     Сжимает видео до целевого размера (≈ target_bytes) двухпроходным H.264.
     Ставит ограничение по высоте (max_height), сохраняя пропорции.
+    Пресет x264 по умолчанию — откалиброванный для узла (encode_preset).
     """
+    preset = preset or encode_preset()
     if duration_s <= 0:
         raise RuntimeError("Unknown or zero duration; cannot compute target bitrate")
 
@@ -73,7 +147,7 @@ def compress_to_target(
         "-bufsize",
         f"{max(v_kbps*2, 500)}k",
         "-preset",
-        "medium",
+        preset,
         "-tune",
         "fastdecode",
         "-pass",
@@ -105,7 +179,7 @@ def compress_to_target(
         "-bufsize",
         f"{max(v_kbps*2, 500)}k",
         "-preset",
-        "medium",
+        preset,
         "-tune",
         "fastdecode",
         "-pass",
@@ -121,6 +195,18 @@ def compress_to_target(
         outp,
     ]
 
+    record(
+        "encode_profile",
+        {
+            "codec": "libx264",
+            "preset": preset,
+            "passes": 2,
+            "video_kbps": v_kbps,
+            "audio_kbps": a_kbps,
+            "max_height": max_height,
+        },
+    )
+
     logger.info(
         f"Re-encoding target ≈ {human(target_bytes)} "
         f"(total ~{total_bps/1000:.0f} kbps; video ~{v_kbps} kbps, audio {a_kbps} kbps)"
@@ -128,8 +214,10 @@ def compress_to_target(
 
     try:
         # Входные данные безопасны: это внутренние пути файлов, не пользовательский ввод
-        subprocess.run(cmd1, check=True)  # nosec B603
-        subprocess.run(cmd2, check=True)  # nosec B603
+        with tracer.start_span("ffmpeg", pass_number=1, video_kbps=v_kbps):
+            subprocess.run(cmd1, check=True)  # nosec B603
+        with tracer.start_span("ffmpeg", pass_number=2, video_kbps=v_kbps):
+            subprocess.run(cmd2, check=True)  # nosec B603
     finally:
         # Удаляем пасс-логи
         for ext in (".log", ".mbtree"):
@@ -142,27 +230,292 @@ def compress_to_target(
                     logger.debug(f"Could not remove temp file {p}: {e}")
 
 
+class YtdlpLogger:
+    """
+    Логгер для yt-dlp: глушит вывод (как quiet/no_warnings) и считает
+    внутренние повторы yt-dlp («Retrying (n/m)…») в разбивке запроса.
+    """
+
+    def debug(self, msg: str) -> None:
+        logger.debug(f"yt-dlp: {msg}")
+
+    def info(self, msg: str) -> None:
+        logger.debug(f"yt-dlp: {msg}")
+
+    def warning(self, msg: str) -> None:
+        if "Retrying" in msg:
+            increment("retries")
+        logger.debug(f"yt-dlp warning: {msg}")
+
+    def error(self, msg: str) -> None:
+        logger.debug(f"yt-dlp error: {msg}")
+
+
+@functools.lru_cache(maxsize=None)
+def compile_patterns(
+    patterns: Tuple[Tuple[str, str], ...],
+) -> Tuple[Tuple[str, Pattern[str]], ...]:
+    return tuple((kind, re.compile(p, re.IGNORECASE)) for kind, p in patterns)
+
+
+def normalize_host(host: str) -> str:
+    """Нижний регистр, без порта, userinfo и завершающей точки"""
+    host = (host or "").rsplit("@", 1)[-1].lower()
+    if host.startswith("["):
+        return host
+    return host.split(":", 1)[0].rstrip(".")
+
+
+def url_host(url: str) -> Optional[str]:
+    """Нормализованный хост ссылки; None — хоста нет или URL битый"""
+    url = url.strip()
+    # Telegram распознаёт ссылки и без схемы: vm.tiktok.com/ABC
+    if "://" not in url:
+        url = "//" + url
+    try:
+        return normalize_host(urlsplit(url).netloc) or None
+    except ValueError:
+        return None
+
+
+def platform_name(provider) -> str:
+    """Имя платформы провайдера для метрик, логов и ключей контента"""
+    platform = getattr(provider, "platform", "") or ""
+    return platform or provider.__class__.__name__.replace("Provider", "").lower()
+
+
+def unselected(info: Dict) -> Dict:
+    """
+    Метаданные без полей выбранного при извлечении формата: yt-dlp дописывает
+    их поверх info, и без очистки повторный выбор скачал бы прежний формат
+    """
+    selected = {key for fmt in info.get("formats") or () for key in fmt}
+    selected.update(("requested_formats", "requested_downloads"))
+    return {key: value for key, value in info.items() if key not in selected}
+
+
+def clean_url(url: str) -> str:
+    return url.split("?", 1)[0].split("#", 1)[0]
+
+
 class BaseProvider(ABC):
     PATTERNS: List[Tuple[str, str]] = []
+    # Суффиксы доменов платформы (для маршрутизации по хосту)
+    HOSTS: Tuple[str, ...] = ()
+    # Виды ссылок-редиректов, которые разворачиваются до канонического URL
+    SHORT_KINDS: Tuple[str, ...] = ()
+    # Равнозначные виды ссылок на один объект: kind → канонический kind
+    CANONICAL_KINDS: Dict[str, str] = {}
+    # Ограничения контента; None — общие MAX_DURATION_S / MAX_DOWNLOAD_MB
+    MAX_DURATION_S: Optional[float] = None
+    MAX_DOWNLOAD_MB: Optional[float] = None
+    ALLOW_LIVE: bool = False
+    # Темп извлечений: запросов в минуту и всплеск; None — общие RATE_PER_MIN /
+    # RATE_BURST, переопределяются через RATE_PER_MIN_<PLATFORM>
+    RATE_PER_MIN: Optional[float] = None
+    RATE_BURST: Optional[int] = None
+    # Экстракторы yt-dlp платформы: извлечение идёт сразу нужным экстрактором
+    # (ie_key) и грузятся только они, без перебора ~1800 _VALID_URL
+    YTDLP_IE_KEYS: Tuple[str, ...] = ()
+    # False — если экстрактор может передать ссылку на чужую платформу
+    YTDLP_RESTRICT_EXTRACTORS: bool = True
     platform: str = ""
 
-    def extract_id(self, url: str) -> Optional[KindId]:
-        clean = url.split("?", 1)[0].split("#", 1)[0]
-        for kind, pattern in self.PATTERNS:
-            m = re.search(pattern, clean, flags=re.IGNORECASE)
+    _COMPILED: Tuple[Tuple[str, Pattern[str]], ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Компилируем шаблоны один раз при создании класса
+        cls._COMPILED = compile_patterns(tuple(map(tuple, cls.PATTERNS)))
+
+    def _compiled_patterns(self) -> Tuple[Tuple[str, Pattern[str]], ...]:
+        # PATTERNS может быть переопределён на экземпляре — тогда берём его
+        if self.PATTERNS is type(self).PATTERNS:
+            return type(self)._COMPILED
+        return compile_patterns(tuple(map(tuple, self.PATTERNS)))
+
+    def matches_host(self, host: str) -> bool:
+        host = normalize_host(host)
+        return any(host == h or host.endswith("." + h) for h in self.HOSTS)
+
+    def match(self, url: str) -> Optional[KindId]:
+        clean = clean_url(url)
+        patterns = self._compiled_patterns()
+        for kind, pattern in patterns:
+            m = pattern.search(clean)
             if m:
                 return kind, m.group(1)
+        # Шаблоны вида watch?v= ищем в URL со строкой запроса
+        full = url.split("#", 1)[0]
+        if full != clean:
+            for kind, pattern in patterns:
+                if r"\?" in pattern.pattern:
+                    m = pattern.search(full)
+                    if m:
+                        return kind, m.group(1)
         return None
 
-    @abstractmethod
-    def is_valid_url(self, url: str) -> bool: ...
+    def content_key(self, ref: KindId) -> str:
+        """Единый ключ контента: reel/p/tv и т.п. одного объекта совпадают"""
+        kind, ident = ref
+        kind = self.CANONICAL_KINDS.get(kind, kind)
+        return f"{platform_name(self)}:{kind}:{ident}"
+
+    def extract_id(self, url: str) -> Optional[KindId]:
+        return self.match(url)
+
+    def is_valid_url(self, url: str) -> bool:
+        try:
+            if not self.matches_host(url_host(url) or ""):
+                return False
+            return self.match(url) is not None
+        except Exception:
+            return False
 
     @abstractmethod
     def _build_url(self, kind: str, ident: str) -> str: ...
 
+    def ytdlp_ie_key(self, url: str) -> Optional[str]:
+        """Экстрактор для URL из объявленных; None — обычный поиск yt-dlp"""
+        for key in self.YTDLP_IE_KEYS:
+            if extractor_class(key).suitable(url):
+                return key
+        return None
+
+    def _extractor_opts(self, ie_key: Optional[str]) -> Dict:
+        if (
+            ie_key is None
+            or not self.YTDLP_RESTRICT_EXTRACTORS
+            or os.getenv("YTDLP_RESTRICT_EXTRACTORS", "1") == "0"
+        ):
+            return {}
+        return {"allowed_extractors": allowed_extractors(self.YTDLP_IE_KEYS)}
+
+    def _ydl_pool(self, ie_key: Optional[str]) -> YoutubeDLPool:
+        """Пул YoutubeDL провайдера: отдельный для урезанного набора экстракторов"""
+        extractor_opts = self._extractor_opts(ie_key)
+        key = bool(extractor_opts)
+        with _POOLS_LOCK:
+            pools = self.__dict__.setdefault("_ydl_pools", {})
+            if key not in pools:
+
+                def factory() -> "yt_dlp.YoutubeDL":
+                    # Каталог загрузки задаётся на каждую задачу в пуле
+                    opts = self._yt_opts(tempfile.gettempdir())
+                    opts.update(extractor_opts)
+                    ydl = yt_dlp.YoutubeDL(opts)
+                    # Общий cookie jar вместо копии cookie-файла на экземпляр
+                    ydl.__dict__["cookiejar"] = cookie_store.jar
+                    install_cache(ydl)
+                    return ydl
+
+                pools[key] = YoutubeDLPool(factory, name=self.platform)
+            return pools[key]
+
+    def _policy_limit(self, name: str, default: float) -> float:
+        # MAX_DURATION_S_YOUTUBE → атрибут класса → MAX_DURATION_S → default
+        value = os.getenv(f"{name}_{(self.platform or '').upper()}")
+        if value:
+            return float(value)
+        if getattr(self, name, None) is not None:
+            return float(getattr(self, name))
+        return float(os.getenv(name, default))
+
+    def check_policy(self, info: Dict) -> None:
+        """
+        Проверка метаданных сразу после извлечения: эфиры, слишком длинные
+        и слишком большие видео отклоняются до скачивания первого байта.
+        """
+        if not self.ALLOW_LIVE and (
+            info.get("is_live") or info.get("live_status") in ("is_live", "is_upcoming")
+        ):
+            raise DownloadError(LIVE, "Live streams are not supported")
+
+        duration = float(info.get("duration") or 0.0)
+        max_duration = self._policy_limit("MAX_DURATION_S", 300)
+        if max_duration > 0 and duration > max_duration:
+            raise DownloadError(
+                TOO_LONG, f"Duration {duration:.0f}s exceeds {max_duration:.0f}s"
+            )
+
+        estimated = estimate_filesize(info)
+        record("estimated_bytes", estimated)
+        max_bytes = self._policy_limit("MAX_DOWNLOAD_MB", 500) * 1024 * 1024
+        if max_bytes > 0 and estimated and estimated > max_bytes:
+            raise DownloadError(
+                TOO_LARGE,
+                f"Estimated size {human(estimated)} exceeds {human(max_bytes)}",
+            )
+
+    def estimate_cost(self, info: Dict) -> float:
+        """Стоимость загрузки по метаданным — для порядка в очереди"""
+        return estimate_cost(
+            info,
+            target_bytes=int(os.getenv("MAX_SIZE_MB", "50")) * 1024 * 1024,
+            bandwidth_bps=bandwidth_bps(),
+            encode_speed=encode_speed(),
+        )
+
+    def _extract(self, ydl, url: str, ie_key: Optional[str]) -> Dict:
+        """Извлечение метаданных и проверка политики до скачивания"""
+        platform = platform_name(self)
+        with track_stage("extract", platform):
+            info = ydl.extract_info(url, download=False, ie_key=ie_key)
+        if not info:
+            raise RuntimeError("Failed to get video information")
+        self.check_policy(info)
+        logger.info(
+            f"Title: {info.get('title')!r}, duration: {info.get('duration') or 0.0}"
+        )
+        record("format_id", info.get("format_id"))
+        return info
+
+    def proxy(self) -> Optional[str]:
+        """YTDLP_PROXY_<PLATFORM> или общий YTDLP_PROXY"""
+        platform = (self.platform or "").upper()
+        return os.getenv(f"YTDLP_PROXY_{platform}") or os.getenv("YTDLP_PROXY")
+
+    def _pace(self) -> None:
+        """
+        Токен на запрос к платформе перед извлечением: всплески растягиваются
+        по времени (ожидание, а не отказ), чтобы не попасть под антибот.
+        """
+        waited = rate_limiters.acquire(
+            platform_name(self),
+            self.proxy() or "direct",
+            self._policy_limit("RATE_PER_MIN", 60),
+            int(self._policy_limit("RATE_BURST", 10)),
+        )
+        if waited:
+            logger.info(f"Rate limited {platform_name(self)}: waited {waited:.1f}s")
+            record("rate_limit_wait", round(waited, 3))
+
+    @staticmethod
+    def _split_ref(ref: Union[str, KindId]) -> KindId:
+        return ref if isinstance(ref, tuple) else ("post", ref)
+
+    @profiled
+    def probe(self, ref: Union[str, KindId]) -> Dict:
+        """
+        Только извлечение: метаданные (длительность, форматы, размер) нужны
+        планировщику, чтобы оценить задачу до того, как занять воркер загрузки.
+        Результат передаётся в download_video(ref, info=...).
+        """
+        kind, ident = self._split_ref(ref)
+        cookie_store.refresh()
+        try:
+            url = self._build_url(kind, ident)
+            ie_key = self.ytdlp_ie_key(url)
+            self._pace()
+            with self._ydl_pool(ie_key).acquire(tempfile.gettempdir()) as ydl:
+                return self._extract(ydl, url, ie_key)
+        finally:
+            cookie_store.save()
+
     def _yt_opts(self, temp_dir: str) -> Dict:
         opts = {
-            "outtmpl": os.path.join(temp_dir, "%(title)s.%(ext)s"),
+            "outtmpl": "%(title)s.%(ext)s",
+            "paths": {"home": temp_dir},
             "format": "bv*[ext=mp4][vcodec=h264]+ba[ext=m4a]/b[ext=mp4]/bv*+ba/b",
             "merge_output_format": "mp4",
             "postprocessors": [
@@ -173,6 +526,9 @@ class BaseProvider(ABC):
             },
             "quiet": True,
             "no_warnings": True,
+            # Постоянный кэш player JS / функций подписи YouTube
+            "cachedir": cache_dir(),
+            "logger": YtdlpLogger(),
             "extract_flat": False,
             "writethumbnail": False,
             "writeinfojson": False,
@@ -183,28 +539,14 @@ class BaseProvider(ABC):
             "concurrent_fragment_downloads": 1,
             "socket_timeout": 60,
             "windowsfilenames": True,
-            "http_headers": {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/126.0.0.0 Safari/537.36"
-                ),
-            },
+            "http_headers": {"User-Agent": USER_AGENT},
             "compat_opts": ["no-keep-subs", "no-attach-info-json"],
             "prefer_free_formats": False,
         }
 
-        cookie_src = os.getenv("YTDLP_COOKIES_FILE_RUNTIME") or os.getenv(
-            "YTDLP_COOKIES_FILE"
-        )
-        if cookie_src and os.path.exists(cookie_src):
-            try:
-                cookie_dst = os.path.join(temp_dir, "yt_cookies.txt")
-                shutil.copyfile(cookie_src, cookie_dst)
-                os.chmod(cookie_dst, 0o600)
-                opts["cookiefile"] = cookie_dst
-            except Exception as e:
-                logger.warning(f"Cannot prepare cookiefile: {e}")
+        proxy = self.proxy()
+        if proxy:
+            opts["proxy"] = proxy
 
         max_h = int(os.getenv("MAX_HEIGHT", "1080"))
         opts["format_sort"] = [
@@ -217,41 +559,48 @@ class BaseProvider(ABC):
         ]
         return opts
 
+    @profiled
     def download_video(
-        self, ref: Union[str, KindId]
+        self, ref: Union[str, KindId], info: Optional[Dict] = None
     ) -> Tuple[Optional[bytes], Optional[str]]:
-        if isinstance(ref, tuple):
-            kind, ident = ref
-        else:
-            kind, ident = "post", ref
-
-        platform_name = (
-            self.platform or self.__class__.__name__.replace("Downloader", "").lower()
-        )
-        logger.info(f"🔍 Starting {platform_name} {kind} download for ID: {ident}")
+        """Скачивание (и сжатие); info — результат probe, если он уже был"""
+        kind, ident = self._split_ref(ref)
+        platform = platform_name(self)
+        logger.info(f"🔍 Starting {platform} {kind} download for ID: {ident}")
 
+        scratch_bytes = 0
+        cookie_store.refresh()
         with tempfile.TemporaryDirectory() as temp_dir:
             try:
-                ydl_opts = self._yt_opts(temp_dir)
                 url = self._build_url(kind, ident)
-                logger.info(f"Downloading via yt-dlp: {url}")
-
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    if not info:
-                        raise RuntimeError("Failed to get video information")
+                ie_key = self.ytdlp_ie_key(url)
+                logger.info(f"Downloading via yt-dlp ({ie_key or 'auto'}): {url}")
+                if info is None:
+                    self._pace()
+
+                with self._ydl_pool(ie_key).acquire(temp_dir) as ydl:
+                    if info is None:
+                        info = self._extract(ydl, url, ie_key)
                     duration = float(info.get("duration") or 0.0)
-                    logger.info(f"Title: {info.get('title')!r}, duration: {duration}")
-
-                    try:
-                        ydl.download([url])
-                    except Exception as format_error:
-                        logger.warning(
-                            f"Format error: {format_error} → fallback to 'best'"
-                        )
-                        ydl_opts["format"] = "best"
-                        with yt_dlp.YoutubeDL(ydl_opts) as ydl2:
-                            ydl2.download([url])
+
+                    with track_stage("download", platform):
+                        try:
+                            # Скачиваем по уже извлечённой информации,
+                            # без повторного извлечения
+                            ydl.process_ie_result(info, download=True)
+                        except Exception as format_error:
+                            logger.warning(
+                                f"Format error: {format_error} → fallback to 'best'"
+                            )
+                            # Селектор формата вернётся при возврате в пул;
+                            # те же метаданные — без повторного извлечения,
+                            # темпа и проверки политики
+                            ydl.format_selector = ydl.build_format_selector("best")
+                            increment("retries")
+                            result = ydl.process_ie_result(
+                                unselected(info), download=True
+                            )
+                            record("format_id", (result or {}).get("format_id"))
 
                 files = []
                 for ext in ("mp4", "webm", "mkv", "mov"):
@@ -261,6 +610,9 @@ class BaseProvider(ABC):
 
                 video_file = max(files, key=lambda p: os.path.getsize(p))
                 size = os.path.getsize(video_file)
+                scratch_bytes += size
+                SCRATCH_BYTES.inc(size)
+                record("downloaded_bytes", size)
                 logger.info(
                     f"📁 Selected file: {os.path.basename(video_file)} ({human(size)})"
                 )
@@ -273,17 +625,27 @@ class BaseProvider(ABC):
                 if size > target_bytes:
                     logger.info(f"File exceeds {max_size_mb} MB → compressing…")
                     outp = os.path.join(temp_dir, "compressed.mp4")
-                    compress_to_target(
-                        inp=video_file,
-                        outp=outp,
-                        duration_s=duration,
-                        target_bytes=target_bytes,
-                        max_height=max_height,
-                        audio_kbps=int(os.getenv("AUDIO_KBPS", "128")),
-                    )
+                    with encode_limit.slot():
+                        with track_stage("encode", platform) as encode:
+                            compress_to_target(
+                                inp=video_file,
+                                outp=outp,
+                                duration_s=duration,
+                                target_bytes=target_bytes,
+                                max_height=max_height,
+                                audio_kbps=int(os.getenv("AUDIO_KBPS", "128")),
+                            )
+                        # Секунды кодирования на секунду видео
+                        encode_limit.update(encode.elapsed / max(duration, 1.0))
+                    ENCODES.inc(platform=platform)
+                    encoded_size = os.path.getsize(outp)
+                    scratch_bytes += encoded_size
+                    SCRATCH_BYTES.inc(encoded_size)
+                    record("encoded_bytes", encoded_size)
                     final_file = outp
                 else:
                     final_file = video_file
+                record("compressed", final_file != video_file)
 
                 with open(final_file, "rb") as f:
                     data = f.read()
@@ -313,3 +675,6 @@ class BaseProvider(ABC):
             except Exception as e:
                 logger.error(f"yt-dlp error: {e}")
                 raise
+            finally:
+                SCRATCH_BYTES.dec(scratch_bytes)
+                cookie_store.save()
@@ -0,0 +1,290 @@
+"""
+Калибровка узла: скорость сжатия для каждого пресета x264 и пропускная
+способность канала. Результат пишется в CALIBRATION_FILE и используется
+при выборе пресета (compress_to_target), числа параллельных сжатий
+(encode_limit) и оценке стоимости загрузок (BaseProvider.estimate_cost).
+
+    python -m providers.calibration   # перекалибровать и сохранить
+"""
+
+import json
+import logging
+import os
+import platform
+import subprocess  # nosec B404 - вызов ffmpeg с фиксированными аргументами
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, NamedTuple, Optional
+
+from providers.limits import encode_limit
+
+logger = logging.getLogger(__name__)
+
+# От быстрого к качественному; compress_to_target исторически шёл на medium
+PRESETS = ("veryfast", "faster", "fast", "medium")
+DEFAULT_PRESET = "medium"
+CLIP_SECONDS = 3
+CLIP_SIZE = "1280x720"
+# Целевой размер сжатия клипа: ~1.5 Мбит/с, как у типичного ролика после сжатия
+CLIP_TARGET_BYTES = 1024 * 1024
+
+
+class Calibration(NamedTuple):
+    # Секунды кодирования на секунду видео по пресетам
+    encode_speed: Dict[str, float]
+    preset: str
+    encode_workers: int
+    bandwidth_bps: Optional[float]
+    cpus: int
+    machine: str
+    measured_at: float
+
+    def matches_host(self) -> bool:
+        """Файл мог приехать с другого узла (общий том, образ)"""
+        return self.cpus == (os.cpu_count() or 1) and self.machine == platform.machine()
+
+
+_current: Optional[Calibration] = None
+_lock = threading.Lock()
+
+
+def current() -> Optional[Calibration]:
+    return _current
+
+
+def calibration_file() -> str:
+    return os.getenv("CALIBRATION_FILE", "calibration.json")
+
+
+def encode_preset() -> str:
+    """ENCODE_PRESET, если задан явно, иначе откалиброванный пресет"""
+    preset = os.getenv("ENCODE_PRESET")
+    if preset:
+        return preset
+    return _current.preset if _current else DEFAULT_PRESET
+
+
+def encode_speed() -> float:
+    """Секунды кодирования на секунду видео для выбранного пресета"""
+    if os.getenv("COST_ENCODE_SPEED"):
+        return float(os.getenv("COST_ENCODE_SPEED", "1.0"))
+    if _current and encode_preset() in _current.encode_speed:
+        return _current.encode_speed[encode_preset()]
+    return 1.0
+
+
+def bandwidth_bps() -> float:
+    if os.getenv("COST_BANDWIDTH_MBPS"):
+        return float(os.getenv("COST_BANDWIDTH_MBPS", "20")) * 1_000_000
+    if _current and _current.bandwidth_bps:
+        return _current.bandwidth_bps
+    return 20_000_000.0
+
+
+def make_clip(path: str, seconds: float = CLIP_SECONDS) -> None:
+    """Синтетический клип testsrc со звуком — вход для замеров сжатия"""
+    subprocess.run(  # nosec B603 B607
+        [
+            "ffmpeg",
+            "-y",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            f"testsrc=size={CLIP_SIZE}:rate=30:duration={seconds}",
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=frequency=440:duration={seconds}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "ultrafast",
+            "-c:a",
+            "aac",
+            "-shortest",
+            path,
+        ],
+        check=True,
+        capture_output=True,
+    )
+
+
+def _encode(clip: str, outp: str, preset: str) -> None:
+    # Импорт здесь: providers.base сам зависит от этого модуля
+    from providers.base import compress_to_target
+
+    compress_to_target(
+        inp=clip,
+        outp=outp,
+        duration_s=CLIP_SECONDS,
+        target_bytes=CLIP_TARGET_BYTES,
+        preset=preset,
+    )
+
+
+def measure_encode(clip: str, workdir: str, preset: str, parallel: int = 1) -> float:
+    """
+    Сжимает клип parallel раз одновременно тем же двухпроходным кодом, что и
+    в работе; возвращает секунды на секунду видео одного сжатия.
+    """
+    outputs = [os.path.join(workdir, f"{preset}-{i}.mp4") for i in range(parallel)]
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        for future in [pool.submit(_encode, clip, out, preset) for out in outputs]:
+            future.result()
+    return (time.monotonic() - started) / CLIP_SECONDS
+
+
+def choose_preset(speeds: Dict[str, float], max_speed: float) -> str:
+    """Самый качественный пресет, укладывающийся в max_speed, иначе самый быстрый"""
+    fitting = [p for p in PRESETS if p in speeds and speeds[p] <= max_speed]
+    if fitting:
+        return fitting[-1]
+    return min(speeds, key=speeds.get)
+
+
+def choose_workers(
+    clip: str, workdir: str, preset: str, single: float, max_workers: int
+) -> int:
+    """
+    Удваивает число одновременных сжатий, пока суммарная пропускная
+    способность растёт хотя бы на 10%.
+    """
+    best, best_throughput = 1, 1 / single
+    workers = 2
+    while workers <= max_workers:
+        throughput = workers / measure_encode(clip, workdir, preset, workers)
+        if throughput < best_throughput * 1.1:
+            break
+        best, best_throughput = workers, throughput
+        workers *= 2
+    return best
+
+
+def measure_bandwidth(url: str, timeout: float = 30.0) -> float:
+    """Скачивает файл-эталон целиком; возвращает бит/с"""
+    started = time.monotonic()
+    size = 0
+    # URL берётся из конфигурации, не от пользователя
+    with urllib.request.urlopen(url, timeout=timeout) as response:  # nosec B310
+        while True:
+            chunk = response.read(256 * 1024)
+            if not chunk:
+                break
+            size += len(chunk)
+    elapsed = max(time.monotonic() - started, 1e-6)
+    return size * 8 / elapsed
+
+
+def calibrate(bandwidth_url: Optional[str] = None) -> Calibration:
+    """
+    Полный замер. Без ffmpeg остаётся пресет по умолчанию и текущий лимит
+    сжатий; без CALIBRATION_URL пропускная способность не меряется.
+    """
+    if bandwidth_url is None:
+        bandwidth_url = os.getenv("CALIBRATION_URL", "")
+    max_speed = float(os.getenv("CALIBRATION_MAX_ENCODE_SPEED", "0.5"))
+    cpus = os.cpu_count() or 1
+
+    speeds: Dict[str, float] = {}
+    preset, workers = DEFAULT_PRESET, encode_limit.limit
+    with tempfile.TemporaryDirectory() as workdir:
+        clip = os.path.join(workdir, "testsrc.mp4")
+        try:
+            make_clip(clip)
+            for name in PRESETS:
+                speeds[name] = round(measure_encode(clip, workdir, name), 3)
+            preset = choose_preset(speeds, max_speed)
+            workers = choose_workers(
+                clip, workdir, preset, speeds[preset], encode_limit.max_limit
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Encode calibration skipped: {e}")
+            speeds, preset, workers = {}, DEFAULT_PRESET, encode_limit.limit
+
+    bandwidth = None
+    if bandwidth_url:
+        try:
+            bandwidth = round(measure_bandwidth(bandwidth_url))
+        except Exception as e:
+            logger.warning(f"Bandwidth calibration failed: {e}")
+
+    result = Calibration(
+        encode_speed=speeds,
+        preset=preset,
+        encode_workers=workers,
+        bandwidth_bps=bandwidth,
+        cpus=cpus,
+        machine=platform.machine(),
+        measured_at=time.time(),
+    )
+    logger.info(
+        f"Calibration: preset {preset} ({speeds.get(preset)} s/s), "
+        f"{workers} parallel encodes, bandwidth {bandwidth} bps"
+    )
+    return result
+
+
+def save(calibration: Calibration, path: Optional[str] = None) -> None:
+    path = path or calibration_file()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(calibration._asdict(), f, indent=2)
+    os.replace(tmp, path)
+
+
+def load(path: Optional[str] = None) -> Optional[Calibration]:
+    """Сохранённый результат для этого узла или None"""
+    path = path or calibration_file()
+    try:
+        with open(path, encoding="utf-8") as f:
+            calibration = Calibration(**json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError) as e:
+        logger.warning(f"Ignoring calibration file {path}: {e}")
+        return None
+    if not calibration.matches_host():
+        logger.info(f"Calibration file {path} is from another host, ignoring")
+        return None
+    return calibration
+
+
+def apply(calibration: Calibration) -> None:
+    global _current
+    with _lock:
+        _current = calibration
+    if calibration.encode_speed:
+        encode_limit.set_limit(calibration.encode_workers)
+
+
+def ensure_calibrated(force: bool = False) -> Optional[Calibration]:
+    """
+    CALIBRATE=auto (по умолчанию) — взять сохранённый результат, а если его
+    нет, откалибровать и сохранить; 1 — всегда перекалибровать; 0 — только
+    сохранённый результат.
+    """
+    mode = os.getenv("CALIBRATE", "auto")
+    calibration = None if force or mode == "1" else load()
+    if calibration is None and (force or mode != "0"):
+        calibration = calibrate()
+        # Без ffmpeg замерять нечего — попробуем снова при следующем старте
+        if calibration.encode_speed:
+            try:
+                save(calibration)
+            except OSError as e:
+                logger.warning(f"Could not save calibration: {e}")
+    if calibration is not None:
+        apply(calibration)
+    return calibration
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(ensure_calibrated(force=True)._asdict(), indent=2))
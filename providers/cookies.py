@@ -0,0 +1,146 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from monitoring.startup import lazy_import
+
+logger = logging.getLogger(__name__)
+
+yt_dlp = lazy_import("yt_dlp")
+
+
+class CookieStore:
+    """
+    Общий на процесс cookie jar для всех экземпляров YoutubeDL.
+
+    Исходный файл (YTDLP_COOKIES_FILE, обычно read-only секрет) читается один
+    раз и перечитывается только при изменении mtime. Cookie, обновлённые
+    платформами во время работы, периодически сохраняются в
+    YTDLP_COOKIES_FILE_RUNTIME и подхватываются после рестарта, если этот
+    файл свежее исходного.
+    """
+
+    def __init__(
+        self,
+        source: Optional[str] = None,
+        runtime: Optional[str] = None,
+        save_interval: Optional[float] = None,
+    ):
+        self.source = source if source is not None else os.getenv("YTDLP_COOKIES_FILE")
+        self.runtime = (
+            runtime if runtime is not None else os.getenv("YTDLP_COOKIES_FILE_RUNTIME")
+        )
+        self.save_interval = (
+            save_interval
+            if save_interval is not None
+            else float(os.getenv("YTDLP_COOKIES_SAVE_INTERVAL_S", "60"))
+        )
+        self._jar = None
+        self._jar_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._source_mtime: Optional[float] = None
+        self._saved_fingerprint: Optional[int] = None
+        self._last_save: Optional[float] = None
+
+    @property
+    def jar(self) -> "yt_dlp.cookies.YoutubeDLCookieJar":
+        # Объект jar не меняется: при перезагрузке подменяется содержимое,
+        # поэтому экземпляры YoutubeDL из пулов всегда видят актуальные cookie.
+        # Создаётся при первом обращении, чтобы не импортировать yt-dlp на старте
+        if self._jar is None:
+            with self._jar_lock:
+                if self._jar is None:
+                    self._jar = yt_dlp.cookies.YoutubeDLCookieJar()
+        return self._jar
+
+    @staticmethod
+    def _mtime(path: Optional[str]) -> Optional[float]:
+        if not path:
+            return None
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _fingerprint(self) -> int:
+        with self.jar._cookies_lock:
+            return hash(
+                tuple(
+                    sorted(
+                        (c.domain, c.path, c.name, c.value or "", c.expires or 0)
+                        for c in self.jar
+                    )
+                )
+            )
+
+    def refresh(self) -> bool:
+        """Загружает cookie при первом вызове и после изменения исходного файла"""
+        with self._lock:
+            mtime = self._mtime(self.source)
+            if self._loaded and mtime == self._source_mtime:
+                return False
+
+            path = self.source if mtime is not None else None
+            if not self._loaded:
+                # После рестарта продолжаем с сохранённой сессией, если она новее
+                runtime_mtime = self._mtime(self.runtime)
+                if runtime_mtime is not None and (
+                    mtime is None or runtime_mtime >= mtime
+                ):
+                    path = self.runtime
+            self._loaded = True
+            self._source_mtime = mtime
+            if path is None:
+                return False
+
+            try:
+                fresh = yt_dlp.cookies.YoutubeDLCookieJar(path)
+                fresh.load()
+            except Exception as e:
+                logger.warning(f"Cannot load cookies from {path}: {e}")
+                return False
+            with self.jar._cookies_lock:
+                self.jar._cookies = fresh._cookies
+            self._saved_fingerprint = self._fingerprint()
+            logger.info(f"Loaded {len(self.jar)} cookies from {path}")
+            return True
+
+    def save(self, force: bool = False) -> bool:
+        """Сохраняет изменившиеся cookie в runtime-файл (не чаще save_interval)"""
+        if not self.runtime:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._last_save is not None
+                and now - self._last_save < self.save_interval
+            ):
+                return False
+            self._last_save = now
+            fingerprint = self._fingerprint()
+            if fingerprint == self._saved_fingerprint:
+                return False
+            tmp_path = self.runtime + ".tmp"
+            try:
+                directory = os.path.dirname(self.runtime)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # Файл создаём сразу с правами 0600 — в нём сессии аккаунтов
+                os.close(
+                    os.open(tmp_path, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600)
+                )
+                with self.jar._cookies_lock:
+                    self.jar.save(tmp_path)
+                os.replace(tmp_path, self.runtime)
+            except Exception as e:
+                logger.warning(f"Cannot save cookies to {self.runtime}: {e}")
+                return False
+            self._saved_fingerprint = fingerprint
+            return True
+
+
+cookie_store = CookieStore()
@@ -0,0 +1,110 @@
+import errno
+from typing import Optional
+
+from monitoring.startup import lazy_import
+
+yt_dlp = lazy_import("yt_dlp")
+
+# Постоянные ошибки: повтор запроса не поможет, пока не истечёт TTL
+REMOVED = "removed"
+PRIVATE = "private"
+GEO_BLOCKED = "geo_blocked"
+LOGIN_REQUIRED = "login_required"
+
+# Платформа временно отключена предохранителем (см. handlers.circuit_breaker)
+UNAVAILABLE = "platform_unavailable"
+
+# Отказы по политике (проверка сразу после извлечения, до скачивания)
+TOO_LONG = "too_long"
+TOO_LARGE = "too_large"
+LIVE = "live"
+
+# Нехватка ресурсов узла (память, диск, дескрипторы) — признак перегрузки,
+# а не сбоя платформы
+_RESOURCE_ERRNOS = {errno.ENOMEM, errno.ENOSPC, errno.EMFILE, errno.ENFILE}
+
+# Порядок важен: «Video unavailable. This video is private» — это private
+_MARKERS = (
+    (
+        GEO_BLOCKED,
+        (
+            "available in your country",
+            "blocked it in your country",
+            "geo restriction",
+            "geo-restricted",
+        ),
+    ),
+    (
+        PRIVATE,
+        (
+            "private video",
+            "video is private",
+            "account is private",
+            "this post is private",
+        ),
+    ),
+    (
+        LOGIN_REQUIRED,
+        (
+            "login required",
+            "log in for access",
+            "sign in to confirm",
+            "requires authentication",
+            "use --cookies",
+        ),
+    ),
+    (
+        REMOVED,
+        (
+            "video unavailable",
+            "video is unavailable",
+            "has been removed",
+            "has been deleted",
+            "no longer available",
+            "does not exist",
+            "http error 404",
+            "http error 410",
+        ),
+    ),
+)
+
+
+class DownloadError(Exception):
+    """Классифицированная ошибка скачивания (см. reason)"""
+
+    def __init__(self, reason: str, message: str = ""):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """Причина постоянной ошибки yt-dlp или None для временных/неизвестных"""
+    if isinstance(error, DownloadError):
+        return error.reason
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, yt_dlp.utils.GeoRestrictedError):
+            return GEO_BLOCKED
+        text = str(error).lower()
+        for reason, markers in _MARKERS:
+            if any(marker in text for marker in markers):
+                return reason
+        # yt-dlp заворачивает исходную ошибку экстрактора в exc_info
+        exc_info = getattr(error, "exc_info", None) or (None, None)
+        error = error.__cause__ or exc_info[1]
+    return None
+
+
+def is_resource_error(error: BaseException) -> bool:
+    """Не хватило памяти, места на диске или дескрипторов (с учётом цепочки)"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, MemoryError):
+            return True
+        if isinstance(error, OSError) and error.errno in _RESOURCE_ERRNOS:
+            return True
+        exc_info = getattr(error, "exc_info", None) or (None, None)
+        error = error.__cause__ or error.__context__ or exc_info[1]
+    return False
@@ -1,11 +1,16 @@
-import re
-from urllib.parse import urlparse
-
 from providers.base import BaseProvider
+from providers.registry import hosts_for
 
 
 class InstagramProvider(BaseProvider):
     platform = "instagram"
+    HOSTS = hosts_for("instagram")
+    YTDLP_IE_KEYS = ("Instagram", "InstagramStory")
+    # Instagram раньше всех отвечает на всплески «login required»
+    RATE_PER_MIN = 20
+    RATE_BURST = 3
+    # Шорткод у поста, reel и IGTV общий
+    CANONICAL_KINDS = {"reel": "post", "reels": "post", "tv": "post"}
     PATTERNS = [
         ("post", r"instagram\.com/p/([^/]+)"),
         ("reels", r"instagram\.com/reels/([^/]+)"),
@@ -14,19 +19,6 @@ class InstagramProvider(BaseProvider):
         ("story", r"instagram\.com/stories/[^/]+/([^/]+)"),
     ]
 
-    def is_valid_url(self, url: str) -> bool:
-        try:
-            parsed = urlparse(url)
-            host = (parsed.netloc or "").lower()
-            if not host.endswith("instagram.com"):
-                return False
-            clean = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-            return any(
-                re.search(pat, clean, flags=re.IGNORECASE) for _, pat in self.PATTERNS
-            )
-        except Exception:
-            return False
-
     def _build_url(self, kind: str, ident: str) -> str:
         if kind == "post":
             return f"https://www.instagram.com/p/{ident}/"
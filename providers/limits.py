@@ -0,0 +1,267 @@
+import logging
+import os
+import statistics
+import subprocess  # nosec B404 - только тип исключения таймаута
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from monitoring.metrics import CONCURRENCY_LIMIT, RATE_LIMIT_WAIT_SECONDS
+from providers.errors import is_resource_error
+
+logger = logging.getLogger(__name__)
+
+
+def is_overload(error: BaseException) -> bool:
+    """Ошибка говорит о нехватке мощности, а не о сбое самой задачи"""
+    timeouts = (TimeoutError, subprocess.TimeoutExpired)
+    return isinstance(error, timeouts) or is_resource_error(error)
+
+
+class AdaptiveLimit:
+    """
+    Лимит параллельности, подстраиваемый по наблюдаемой задержке (AIMD).
+
+    Вызывающий сообщает нормированную задержку каждой операции (секунды на
+    мегабайт, секунды кодирования на секунду видео) или ошибку перегрузки;
+    key разделяет задержки, которые нельзя сравнивать между собой (разные
+    платформы). Раз в window отчётов каждая задержка делится на базовую
+    своего key, и медиана этих отношений сравнивается с tolerance. Базовая —
+    медиана окна, если она ниже прежней, иначе прежняя, подтянутая к медиане
+    на долю decay: старый рекорд забывается за несколько окон. Если
+    замедление выше tolerance или доля ошибок выше max_error_rate — лимит
+    умножается на backoff, иначе, если лимит был выбран целиком, растёт на
+    единицу. Лимит держится в [min_limit, max_limit] и публикуется в метрике
+    по имени пула; ADAPTIVE_CONCURRENCY=0 замораживает начальное значение.
+
+    slot() — блокирующий вход для рабочих потоков; там, где очередь своя
+    (FairScheduler), лимит просто читается после update().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        window: int = 10,
+        tolerance: float = 2.0,
+        backoff: float = 0.75,
+        max_error_rate: float = 0.2,
+        decay: float = 0.2,
+        enabled: Optional[bool] = None,
+    ):
+        self.name = name
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit or initial, self.min_limit)
+        self.window = max(window, 1)
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.max_error_rate = max_error_rate
+        self.decay = decay
+        self.enabled = (
+            enabled
+            if enabled is not None
+            else os.getenv("ADAPTIVE_CONCURRENCY", "1") == "1"
+        )
+        self.baselines: Dict[str, float] = {}
+        self._limit = min(max(initial, self.min_limit), self.max_limit)
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._waiting = 0
+        self._samples: List[Tuple[str, float]] = []
+        self._errors = 0
+        self._saturated = False
+        CONCURRENCY_LIMIT.set(self._limit, pool=name)
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def set_limit(self, limit: int) -> None:
+        """Задаёт лимит извне (например, по калибровке) в пределах границ"""
+        with self._cond:
+            self._limit = min(max(limit, self.min_limit), self.max_limit)
+            CONCURRENCY_LIMIT.set(self._limit, pool=self.name)
+            self._cond.notify_all()
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    def update(
+        self,
+        latency: Optional[float],
+        ok: bool = True,
+        saturated: Optional[bool] = None,
+        key: str = "",
+    ) -> int:
+        """
+        Учитывает одну операцию. saturated — был ли лимит выбран целиком;
+        по умолчанию считается по собственным слотам. key — с чьей базовой
+        задержкой сравнивать (платформа).
+        """
+        if not self.enabled:
+            return self._limit
+        with self._cond:
+            if not ok:
+                self._errors += 1
+            elif latency is not None:
+                self._samples.append((key, latency))
+            else:
+                return self._limit
+            if saturated is None:
+                saturated = self._inflight >= self._limit or self._waiting > 0
+            self._saturated = self._saturated or saturated
+            if len(self._samples) + self._errors >= self.window:
+                self._adjust()
+            return self._limit
+
+    def _adjust(self) -> None:
+        error_rate = self._errors / (len(self._samples) + self._errors)
+        by_key: Dict[str, List[float]] = {}
+        for key, latency in self._samples:
+            by_key.setdefault(key, []).append(latency)
+        ratios: List[float] = []
+        for key, latencies in by_key.items():
+            # Окно сравнивается с базовой до его учёта
+            baseline = self._rebase(key, statistics.median(latencies))
+            ratios.extend(latency / baseline for latency in latencies)
+        slowdown = statistics.median(ratios) if ratios else None
+        congested = slowdown is not None and slowdown > self.tolerance
+
+        limit = self._limit
+        if error_rate > self.max_error_rate or congested:
+            limit = max(int(limit * self.backoff), self.min_limit)
+        elif self._saturated:
+            limit = min(limit + 1, self.max_limit)
+        self._samples, self._errors, self._saturated = [], 0, False
+
+        if limit != self._limit:
+            logger.info(
+                f"Concurrency limit {self.name}: {self._limit} → {limit} "
+                f"(slowdown {slowdown}, errors {error_rate:.0%})"
+            )
+            self._limit = limit
+            CONCURRENCY_LIMIT.set(limit, pool=self.name)
+            self._cond.notify_all()
+
+    def _rebase(self, key: str, latency: float) -> float:
+        """Обновляет базовую key и возвращает прежнюю (новую — для первого окна)"""
+        previous = self.baselines.get(key)
+        if previous is None or latency < previous:
+            baseline = latency
+        else:
+            # Смена сети или железа не должна надолго прижать лимит к низу
+            baseline = previous + (latency - previous) * self.decay
+        # Нулевая задержка (пустая загрузка) не даёт деления на ноль
+        self.baselines[key] = max(baseline, 1e-9)
+        return self.baselines[key] if previous is None else previous
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Ждёт свободного места. Перегрузкой считаются только нехватка ресурсов
+        и таймауты; прочие исключения (битый файл, ошибка ffmpeg) проходят
+        без отметки
+        """
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._inflight >= self._limit:
+                    self._cond.wait()
+            finally:
+                self._waiting -= 1
+            self._inflight += 1
+        try:
+            yield
+        except Exception as error:
+            if is_overload(error):
+                self.update(None, ok=False)
+            raise
+        finally:
+            with self._cond:
+                self._inflight -= 1
+                self._cond.notify()
+
+
+# Параллельные сжатия ffmpeg: каждое само занимает все ядра, поэтому по
+# умолчанию их немного, а верхняя граница — число ядер
+encode_limit = AdaptiveLimit(
+    "encode",
+    initial=int(os.getenv("ENCODE_WORKERS", "2")),
+    min_limit=int(os.getenv("ENCODE_WORKERS_MIN", "1")),
+    max_limit=int(os.getenv("ENCODE_WORKERS_MAX", str(os.cpu_count() or 2))),
+)
+
+
+class TokenBucket:
+    """
+    Ведро токенов: rate_per_min запросов в минуту с всплеском до burst.
+
+    При пустом ведре токен берётся в долг, и вызывающий спит, пока долг не
+    погасится; так ожидающие обслуживаются строго по очереди, без отказов.
+    """
+
+    def __init__(self, rate_per_min: float, burst: int):
+        self._lock = threading.Lock()
+        self.configure(rate_per_min, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def configure(self, rate_per_min: float, burst: int) -> None:
+        self.rate = rate_per_min / 60.0
+        self.burst = max(burst, 1)
+
+    def reserve(self) -> float:
+        """Забирает токен; возвращает, сколько секунд ждать до его появления"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._tokens + (now - self._updated) * self.rate, float(self.burst)
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class RateLimiters:
+    """Вёдра по (платформа, исходящий адрес): у каждого прокси свой лимит"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def acquire(
+        self, platform: str, identity: str, rate_per_min: float, burst: int
+    ) -> float:
+        """Ждёт токена; rate_per_min <= 0 — без ограничения. Возвращает ожидание"""
+        if rate_per_min <= 0:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get((platform, identity))
+            if bucket is None:
+                bucket = self._buckets[(platform, identity)] = TokenBucket(
+                    rate_per_min, burst
+                )
+            else:
+                bucket.configure(rate_per_min, burst)
+        waited = bucket.acquire()
+        RATE_LIMIT_WAIT_SECONDS.observe(waited, platform=platform)
+        return waited
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+rate_limiters = RateLimiters()
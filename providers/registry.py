@@ -0,0 +1,62 @@
+import importlib
+from typing import TYPE_CHECKING, FrozenSet, List, NamedTuple, Tuple, Type
+
+if TYPE_CHECKING:
+    from providers.base import BaseProvider
+
+
+class ProviderSpec(NamedTuple):
+    """
+    Описание провайдера без импорта его модуля: платформа и домены нужны
+    для фильтра сообщений и статистики, сам класс — только для загрузки.
+    """
+
+    platform: str
+    hosts: Tuple[str, ...]
+    path: str  # "модуль:Класс"
+
+    def load(self) -> Type["BaseProvider"]:
+        module, name = self.path.split(":")
+        return getattr(importlib.import_module(module), name)
+
+
+# Порядок важен: провайдеры без HOSTS перебираются в этом порядке
+PROVIDERS: Tuple[ProviderSpec, ...] = (
+    ProviderSpec(
+        "instagram", ("instagram.com",), "providers.instagram:InstagramProvider"
+    ),
+    ProviderSpec("tiktok", ("tiktok.com",), "providers.tiktok:TikTokProvider"),
+    ProviderSpec(
+        "youtube", ("youtube.com", "youtu.be"), "providers.youtube:YouTubeProvider"
+    ),
+    ProviderSpec(
+        "likee", ("likee.video", "likee.com"), "providers.likee:LikeeProvider"
+    ),
+    ProviderSpec(
+        "facebook", ("facebook.com", "fb.watch"), "providers.facebook:FacebookProvider"
+    ),
+    ProviderSpec("rutube", ("rutube.ru",), "providers.rutube:RuTubeProvider"),
+    ProviderSpec(
+        "reddit", ("reddit.com", "redd.it"), "providers.reddit:RedditProvider"
+    ),
+)
+
+PLATFORMS: FrozenSet[str] = frozenset(spec.platform for spec in PROVIDERS)
+
+# Все поддерживаемые суффиксы доменов — для быстрого предфильтра сообщений
+SUPPORTED_HOSTS: FrozenSet[str] = frozenset(
+    host for spec in PROVIDERS for host in spec.hosts
+)
+
+
+def hosts_for(platform: str) -> Tuple[str, ...]:
+    """Домены платформы из реестра — единственное место, где они заданы"""
+    for spec in PROVIDERS:
+        if spec.platform == platform:
+            return spec.hosts
+    return ()
+
+
+def provider_classes() -> List[Type["BaseProvider"]]:
+    """Классы провайдеров в порядке PROVIDERS; импортирует их модули"""
+    return [spec.load() for spec in PROVIDERS]
@@ -0,0 +1,110 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import httpx
+
+from monitoring.metrics import CACHE_LOOKUPS
+from providers.base import USER_AGENT
+
+logger = logging.getLogger(__name__)
+
+
+class ShortLinkResolver:
+    """
+    Разворачивает короткие ссылки (vm.tiktok.com, fb.watch, …) до канонического
+    URL через общий keep-alive HTTP-клиент и кэширует соответствие
+    «короткая → каноническая» на SHORT_LINK_TTL_S.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        timeout: Optional[float] = None,
+        max_entries: int = 10000,
+        client: Optional[httpx.Client] = None,
+    ):
+        self.ttl = (
+            ttl if ttl is not None else float(os.getenv("SHORT_LINK_TTL_S", "86400"))
+        )
+        self.timeout = (
+            timeout
+            if timeout is not None
+            else float(os.getenv("SHORT_LINK_TIMEOUT_S", "10"))
+        )
+        self.max_entries = max_entries
+        self._client = client
+        self._cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_client(self) -> httpx.Client:
+        # Клиент создаём лениво и переиспользуем: соединения остаются в пуле
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(
+                    follow_redirects=True,
+                    max_redirects=5,
+                    timeout=self.timeout,
+                    headers={"User-Agent": USER_AGENT},
+                    limits=httpx.Limits(
+                        max_connections=20,
+                        max_keepalive_connections=10,
+                        keepalive_expiry=60,
+                    ),
+                )
+            return self._client
+
+    def cached(self, url: str) -> Optional[str]:
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is None:
+                return None
+            target, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._cache[url]
+                return None
+            self._cache.move_to_end(url)
+            return target
+
+    def _store(self, url: str, target: str) -> None:
+        with self._lock:
+            self._cache[url] = (target, time.monotonic() + self.ttl)
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def resolve(self, url: str) -> Optional[str]:
+        """Конечный URL после редиректов или None, если развернуть не удалось"""
+        target = self.cached(url)
+        if target is not None:
+            CACHE_LOOKUPS.inc(cache="short_links", result="hit")
+            return target
+        CACHE_LOOKUPS.inc(cache="short_links", result="miss")
+
+        try:
+            # Тело страницы не читаем — нужен только адрес после редиректов
+            with self._get_client().stream("GET", url) as response:
+                target = str(response.url)
+        except httpx.HTTPError as e:
+            logger.warning(f"Failed to resolve short link {url}: {e}")
+            return None
+
+        self._store(url, target)
+        logger.info(f"Resolved short link {url} → {target}")
+        return target
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+short_links = ShortLinkResolver()
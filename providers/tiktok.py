@@ -1,11 +1,14 @@
-import re
-from urllib.parse import urlparse
-
 from providers.base import BaseProvider
+from providers.registry import hosts_for
 
 
 class TikTokProvider(BaseProvider):
     platform = "tiktok"
+    HOSTS = hosts_for("tiktok")
+    YTDLP_IE_KEYS = ("TikTok", "TikTokVM")
+    RATE_PER_MIN = 30
+    RATE_BURST = 5
+    SHORT_KINDS = ("short",)
     PATTERNS = [
         ("video", r"tiktok\.com/@[^/]+/video/(\d+)"),
         ("short", r"tiktok\.com/t/([^/?#]+)"),
@@ -13,19 +16,6 @@ class TikTokProvider(BaseProvider):
         ("short", r"vt\.tiktok\.com/([^/?#]+)"),
     ]
 
-    def is_valid_url(self, url: str) -> bool:
-        try:
-            parsed = urlparse(url)
-            host = (parsed.netloc or "").lower()
-            if "tiktok.com" not in host:
-                return False
-            clean = url.split("?", 1)[0].split("#", 1)[0]
-            return any(
-                re.search(p, clean, flags=re.IGNORECASE) for _, p in self.PATTERNS
-            )
-        except Exception:
-            return False
-
     def _build_url(self, kind: str, ident: str) -> str:
         if kind == "video" and ident.isdigit():
             # username неизвестен — yt-dlp понимает такой формат
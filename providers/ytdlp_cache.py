@@ -0,0 +1,82 @@
+import logging
+import os
+import tempfile
+import time
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+from monitoring.metrics import CACHE_LOOKUPS
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+# Короткое стабильное видео: его извлечение скачивает и разбирает текущий
+# player JS YouTube и кладёт функции подписи в кэш
+DEFAULT_WARMUP_URL = "https://www.youtube.com/watch?v=jNQXAC9IVRw"
+
+
+def cache_dir() -> Union[str, bool]:
+    """
+    Каталог кэша yt-dlp (YTDLP_CACHE_DIR, по умолчанию ytdlp_cache); пустое
+    значение отключает кэш. Каталог стоит вынести на постоянный том —
+    иначе после каждого рестарта player JS разбирается заново. Создаёт его
+    сам yt-dlp при первой записи.
+    """
+    path = os.getenv("YTDLP_CACHE_DIR", "ytdlp_cache")
+    return os.path.abspath(path) if path else False
+
+
+class CountingCache:
+    """
+    Обёртка над кэшем yt-dlp со счётчиками попаданий по секциям
+    (youtube-sigfuncs, …); остальные методы передаются исходному кэшу.
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cache, name)
+
+    def load(self, section, key, dtype="json", default=None, *, min_ver=None):
+        result = self._cache.load(section, key, dtype, default, min_ver=min_ver)
+        if self._cache.enabled:
+            CACHE_LOOKUPS.inc(
+                cache=f"ytdlp:{section}",
+                result="miss" if result is default else "hit",
+            )
+        return result
+
+
+def install_cache(ydl: "yt_dlp.YoutubeDL") -> None:
+    ydl.cache = CountingCache(ydl.cache)
+
+
+def warm_cache(provider, url: Optional[str] = None) -> Optional[float]:
+    """
+    Прогревает кэш извлечением без скачивания через пул провайдера —
+    заодно в пуле остаётся готовый экземпляр YoutubeDL. Возвращает время
+    прогрева или None при ошибке.
+    """
+    url = (
+        url
+        if url is not None
+        else os.getenv("YTDLP_CACHE_WARMUP_URL", DEFAULT_WARMUP_URL)
+    )
+    if not url:
+        return None
+    # Тот же темп, что и у пользовательских извлечений
+    provider._pace()
+    started = time.monotonic()
+    ie_key = provider.ytdlp_ie_key(url)
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with provider._ydl_pool(ie_key).acquire(temp_dir) as ydl:
+                ydl.extract_info(url, download=False, ie_key=ie_key)
+    except Exception as e:
+        logger.warning(f"yt-dlp cache warm-up failed for {url}: {e}")
+        return None
+    elapsed = time.monotonic() - started
+    logger.info(f"yt-dlp cache warmed with {url} in {elapsed:.1f}s")
+    return elapsed
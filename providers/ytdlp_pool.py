@@ -0,0 +1,107 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Optional, Tuple
+
+from monitoring.metrics import CACHE_LOOKUPS
+from providers.errors import DownloadError
+
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    import yt_dlp
+
+# Счётчики YoutubeDL, которые копятся от задачи к задаче
+_JOB_STATE = (
+    ("_download_retcode", lambda: 0),
+    ("_num_downloads", lambda: 0),
+    ("_num_videos", lambda: 0),
+    ("_playlist_level", lambda: 0),
+    ("_playlist_urls", set),
+    ("_printed_messages", set),
+)
+
+
+class YoutubeDLPool:
+    """
+    Пул «тёплых» экземпляров YoutubeDL одного провайдера: между задачами
+    сохраняются загруженные экстракторы, cookie jar и HTTP-соединения
+    (keep-alive к CDN платформы). Каждая задача получает свой каталог
+    загрузки через params["paths"], после задачи счётчики сбрасываются.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], "yt_dlp.YoutubeDL"],
+        size: Optional[int] = None,
+        name: str = "",
+    ):
+        self.factory = factory
+        self.size = size if size is not None else int(os.getenv("YTDLP_POOL_SIZE", "2"))
+        self.name = name
+        # Свободные экземпляры и их исходный format_selector
+        self._idle: List[Tuple["yt_dlp.YoutubeDL", Any]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._idle)
+
+    def _take(self) -> Tuple["yt_dlp.YoutubeDL", Any]:
+        with self._lock:
+            if self._idle:
+                CACHE_LOOKUPS.inc(cache="ytdlp_pool", result="hit")
+                # LIFO: самый недавно использованный — с живыми соединениями
+                return self._idle.pop()
+        CACHE_LOOKUPS.inc(cache="ytdlp_pool", result="miss")
+        ydl = self.factory()
+        return ydl, ydl.format_selector
+
+    def _release(self, ydl: "yt_dlp.YoutubeDL", selector: Any) -> None:
+        reset_job(ydl, selector)
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((ydl, selector))
+                return
+        _close(ydl)
+
+    @contextmanager
+    def acquire(self, home: str) -> Iterator["yt_dlp.YoutubeDL"]:
+        """Экземпляр для одной задачи; файлы пишутся в каталог home"""
+        ydl, selector = self._take()
+        ydl.params["paths"] = {"home": home}
+        try:
+            yield ydl
+        except DownloadError:
+            # Отказ по политике после извлечения — экземпляр исправен
+            self._release(ydl, selector)
+            raise
+        except Exception as e:
+            # После сбоя посреди загрузки состояние экземпляра не гарантировано
+            logger.debug(f"Discarding {self.name} YoutubeDL after error: {e}")
+            _close(ydl)
+            raise
+        else:
+            self._release(ydl, selector)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for ydl, _ in idle:
+            _close(ydl)
+
+
+def reset_job(ydl: "yt_dlp.YoutubeDL", selector: Any) -> None:
+    for attr, default in _JOB_STATE:
+        if hasattr(ydl, attr):
+            setattr(ydl, attr, default())
+    # Формат мог быть заменён fallback-ом на 'best'
+    ydl.format_selector = selector
+    ydl.params.pop("paths", None)
+
+
+def _close(ydl: "yt_dlp.YoutubeDL") -> None:
+    try:
+        ydl.close()
+    except Exception as e:
+        logger.debug(f"Failed to close YoutubeDL: {e}")
@@ -0,0 +1,133 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from handlers.admission import AdmissionController
+from handlers.scheduler import GROUP, PRIVATE, FairScheduler
+from monitoring.metrics import SHED_REQUESTS
+
+
+def make_controller(**kwargs):
+    probe = FairScheduler(workers=1, user_limit=10, chat_limit=10)
+    downloads = FairScheduler(workers=1, user_limit=10, chat_limit=10)
+    kwargs.setdefault("max_wait", 100)
+    kwargs.setdefault("group_max_wait", 30)
+    kwargs.setdefault("probe_cost", 2)
+    return AdmissionController(probe, downloads, **kwargs)
+
+
+async def occupy(scheduler, costs):
+    """Занимает воркер и ставит в очередь задачи с заданной стоимостью"""
+    release = asyncio.Event()
+
+    async def job(user_id, cost):
+        async with scheduler.slot(user_id, user_id, True, cost=cost):
+            await release.wait()
+
+    tasks = []
+    for i, cost in enumerate(costs):
+        tasks.append(asyncio.create_task(job(i + 1, cost)))
+        await asyncio.sleep(0)
+    return release, tasks
+
+
+class TestAdmissionController:
+    @pytest.mark.asyncio
+    async def test_idle_admits_without_position(self):
+        controller = make_controller()
+        decision = controller.admit(private=True)
+        assert decision.admitted
+        assert decision.wait_s == 0
+        assert decision.position == 0
+
+    @pytest.mark.asyncio
+    async def test_groups_shed_before_private(self):
+        controller = make_controller()
+        # Выполняется задача стоимостью 20, в очереди — 40
+        release, tasks = await occupy(controller.scheduler, [20, 40])
+        try:
+            assert controller.estimated_wait() == 50
+            assert not controller.admit(private=False).admitted
+            private = controller.admit(private=True)
+            assert private.admitted
+            assert private.position == 2
+        finally:
+            release.set()
+            await asyncio.gather(*tasks)
+
+    @pytest.mark.asyncio
+    async def test_probe_queue_counted(self):
+        controller = make_controller()
+        release, tasks = await occupy(controller.probe_scheduler, [1, 1, 1])
+        try:
+            # (2 в очереди + половина выполняющейся) * 2 с на извлечение
+            assert controller.estimated_wait() == 5
+            assert controller.admit(private=True).position == 3
+        finally:
+            release.set()
+            await asyncio.gather(*tasks)
+
+    @pytest.mark.asyncio
+    async def test_private_rejected_over_limit(self):
+        controller = make_controller(max_wait=10)
+        release, tasks = await occupy(controller.scheduler, [20, 40])
+        try:
+            decision = controller.admit(private=True)
+            assert not decision.admitted
+            assert decision.wait_s == 50
+        finally:
+            release.set()
+            await asyncio.gather(*tasks)
+
+    @pytest.mark.asyncio
+    async def test_zero_disables_limit(self):
+        controller = make_controller(group_max_wait=0)
+        release, tasks = await occupy(controller.scheduler, [1000, 1000])
+        try:
+            assert controller.admit(private=False).admitted
+        finally:
+            release.set()
+            await asyncio.gather(*tasks)
+
+
+class TestShedAccounting:
+    def test_counts_metric_per_kind(self):
+        controller = make_controller()
+        before = SHED_REQUESTS.value(kind=GROUP)
+        controller.shed(private=False, links=3)
+        assert SHED_REQUESTS.value(kind=GROUP) == before + 3
+
+    def test_reports_batched_counts(self):
+        controller = make_controller(report_interval=60)
+        with patch("handlers.admission.time.monotonic") as monotonic:
+            monotonic.return_value = controller._last_report + 1
+            controller.shed(private=False, links=2, wait_s=120)
+            controller.shed(private=True, wait_s=300)
+            assert controller.flush() is None
+            monotonic.return_value = controller._last_report + 61
+            counts, wait = controller.flush()
+        assert counts == {GROUP: 2, PRIVATE: 1}
+        assert wait == 300
+        assert controller.flush(force=True) is None
+
+    def test_flush_on_shutdown(self):
+        controller = make_controller(report_interval=60)
+        controller.shed(private=False)
+        assert controller.flush(force=True) == ({GROUP: 1}, 0.0)
+
+    @pytest.mark.asyncio
+    async def test_periodic_report_without_new_sheds(self):
+        # Счётчики уходят по таймеру, даже если больше ничего не отбрасывается
+        controller = make_controller(report_interval=0.01)
+        controller.shed(private=True, links=2, wait_s=500)
+        reports = []
+        task = asyncio.create_task(
+            controller.run_reports(lambda counts, wait: reports.append((counts, wait)))
+        )
+        try:
+            while not reports:
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+        assert reports == [({PRIVATE: 2}, 500)]
@@ -4,8 +4,31 @@ import tempfile
 from unittest.mock import Mock, patch
 
 import pytest
-
-from providers.base import BaseProvider
+import yt_dlp
+
+from monitoring.stages import collect_stages
+from providers.base import (
+    BaseProvider,
+    YtdlpLogger,
+    estimate_cost,
+    estimate_filesize,
+    extractor_class,
+    unselected,
+)
+from providers.cookies import cookie_store
+from providers.errors import LIVE, TOO_LARGE, TOO_LONG, DownloadError
+from providers.limits import RateLimiters
+from providers.reddit import RedditProvider
+from providers.registry import provider_classes
+from providers.tiktok import TikTokProvider
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    """Каждый тест начинает с полными вёдрами токенов"""
+    limiters = RateLimiters()
+    with patch("providers.base.rate_limiters", limiters):
+        yield limiters
 
 
 class ConcreteProvider(BaseProvider):
@@ -60,6 +83,36 @@ class TestBaseProvider:
 
         assert result == ("video", "123")
 
+    def test_patterns_compiled_once_per_class(self):
+        class HostProvider(BaseProvider):
+            HOSTS = ("test.com",)
+            PATTERNS = [("video", r"test\.com/video/(\d+)")]
+
+            def _build_url(self, kind: str, ident: str) -> str:
+                return ""
+
+        compiled = HostProvider._COMPILED
+        assert compiled[0][0] == "video"
+        assert compiled[0][1].flags & re.IGNORECASE
+        assert HostProvider()._compiled_patterns() is compiled
+
+    def test_instance_patterns_override(self, provider):
+        # ConcreteProvider задаёт PATTERNS в __init__ — они и используются
+        assert provider._compiled_patterns()[1][0] == "clip"
+
+    def test_matches_host(self):
+        class HostProvider(BaseProvider):
+            HOSTS = ("test.com",)
+
+            def _build_url(self, kind: str, ident: str) -> str:
+                return ""
+
+        p = HostProvider()
+        assert p.matches_host("test.com")
+        assert p.matches_host("WWW.Test.COM:443")
+        assert not p.matches_host("nottest.com")
+        assert not p.matches_host("")
+
     def test_yt_opts(self, provider):
         with tempfile.TemporaryDirectory() as temp_dir:
             opts = provider._yt_opts(temp_dir)
@@ -108,8 +161,7 @@ class TestBaseProvider:
     def test_download_video_success(
         self, mock_getsize, mock_glob, mock_ydl_class, provider
     ):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
         mock_info = {
             "title": "Test Video",
@@ -131,12 +183,48 @@ class TestBaseProvider:
         assert caption == expected_caption
 
         mock_ydl.extract_info.assert_called_once()
-        mock_ydl.download.assert_called_once()
+        mock_ydl.process_ie_result.assert_called_once_with(mock_info, download=True)
+        mock_ydl.download.assert_not_called()
+
+    @patch("providers.base.yt_dlp.YoutubeDL")
+    @patch("providers.base.glob.glob")
+    @patch("providers.base.os.path.getsize")
+    def test_download_video_records_stages(
+        self, mock_getsize, mock_glob, mock_ydl_class, provider
+    ):
+        mock_ydl = mock_ydl_class.return_value
+        mock_ydl.extract_info.return_value = {
+            "title": "Test Video",
+            "duration": 30,
+            "format_id": "18",
+        }
+
+        mock_glob.return_value = [os.path.join(tempfile.gettempdir(), "test_video.mp4")]
+        mock_getsize.return_value = 1024000
+
+        with collect_stages() as stages:
+            with patch("builtins.open", mock_open_with_content(b"video_data")):
+                provider.download_video(("video", "123"))
+
+        data = stages.as_dict()
+        assert set(data["stages"]) == {"extract", "download"}
+        assert data["downloaded_bytes"] == 1024000
+        assert data["compressed"] is False
+        assert data["format_id"] == "18"
+
+    def test_ytdlp_logger_counts_retries(self):
+        ytdlp_logger = YtdlpLogger()
+
+        with collect_stages() as stages:
+            ytdlp_logger.warning("HTTP Error 429. Retrying (1/5)...")
+            ytdlp_logger.warning("HTTP Error 429. Retrying (2/5)...")
+            ytdlp_logger.warning("Some other warning")
+
+        assert stages.get("retries") == 2
 
     @patch("providers.base.yt_dlp.YoutubeDL")
     def test_download_video_no_info(self, mock_ydl_class, provider):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
         mock_ydl.extract_info.return_value = None
 
         with pytest.raises(RuntimeError, match="Failed to get video information"):
@@ -145,8 +233,7 @@ class TestBaseProvider:
     @patch("providers.base.yt_dlp.YoutubeDL")
     @patch("providers.base.glob.glob")
     def test_download_video_no_files(self, mock_glob, mock_ydl_class, provider):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
         mock_info = {"title": "Test Video"}
         mock_ydl.extract_info.return_value = mock_info
@@ -161,8 +248,7 @@ class TestBaseProvider:
     def test_download_video_with_string_ref(
         self, mock_getsize, mock_glob, mock_ydl_class, provider
     ):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
         mock_info = {"title": "Test Video"}
         mock_ydl.extract_info.return_value = mock_info
@@ -182,24 +268,82 @@ class TestBaseProvider:
     def test_download_video_format_error_fallback(
         self, mock_getsize, mock_glob, mock_ydl_class, provider
     ):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
-        mock_info = {"title": "Test Video"}
+        mock_info = {
+            "title": "Test Video",
+            "formats": [{"format_id": "v", "url": "v.mp4"}, {"format_id": "c"}],
+            "requested_formats": [{"format_id": "v", "url": "v.mp4"}],
+            "format_id": "v",
+            "url": "v.mp4",
+        }
         mock_ydl.extract_info.return_value = mock_info
 
-        mock_ydl.download.side_effect = [Exception("Format error"), None]
+        mock_ydl.process_ie_result.side_effect = [
+            Exception("Format error"),
+            {"format_id": "c"},
+        ]
 
         mock_glob.return_value = [os.path.join(tempfile.gettempdir(), "test_video.mp4")]
         mock_getsize.return_value = 1024000
 
-        with patch("builtins.open", mock_open_with_content(b"video_data")):
+        with patch(
+            "builtins.open", mock_open_with_content(b"video_data")
+        ), collect_stages() as stages:
             video_data, caption = provider.download_video(("video", "123"))
 
         assert video_data == b"video_data"
         assert caption == "Test Video"
 
-        assert mock_ydl.download.call_count == 2
+        # Повтор с форматом best — по тем же метаданным, без нового извлечения,
+        # но без полей формата, выбранного в первый раз
+        mock_ydl.build_format_selector.assert_called_once_with("best")
+        assert mock_ydl.process_ie_result.call_count == 2
+        mock_ydl.process_ie_result.assert_called_with(
+            {"title": "Test Video", "formats": mock_info["formats"]}, download=True
+        )
+        mock_ydl.extract_info.assert_called_once()
+        mock_ydl.download.assert_not_called()
+        assert stages.details["format_id"] == "c"
+        assert stages.details["retries"] == 1
+
+    def test_unselected_info_selects_different_format(self):
+        formats = [
+            {"format_id": "v", "url": "https://e.com/v.mp4", "ext": "mp4"},
+            {"format_id": "a", "url": "https://e.com/a.m4a", "ext": "m4a"},
+            {"format_id": "c", "url": "https://e.com/c.mp4", "ext": "mp4"},
+        ]
+        formats[0].update(vcodec="avc1", acodec="none", height=720)
+        formats[1].update(vcodec="none", acodec="mp4a")
+        formats[2].update(vcodec="avc1", acodec="mp4a", height=360)
+        ydl = yt_dlp.YoutubeDL({"quiet": True, "format": "bv+ba"})
+        # Так выглядит результат probe: поля выбранной пары поверх метаданных
+        info = ydl.process_ie_result(
+            {
+                "id": "1",
+                "title": "t",
+                "extractor": "test",
+                "extractor_key": "Test",
+                "webpage_url": "https://e.com/1",
+                "formats": formats,
+            },
+            download=False,
+        )
+        assert info["format_id"] == "v+a"
+
+        downloaded = []
+
+        def dl(name, info_dict, **kwargs):
+            downloaded.append(info_dict["url"])
+            return True, True
+
+        ydl.format_selector = ydl.build_format_selector("best")
+        with patch.object(ydl, "dl", side_effect=dl), patch.object(
+            ydl, "post_process", side_effect=lambda filename, info, *a, **k: info
+        ):
+            ydl.process_ie_result(unselected(info), download=True)
+
+        assert downloaded == ["https://e.com/c.mp4"]
 
     @patch("providers.base.yt_dlp.YoutubeDL")
     @patch("providers.base.glob.glob")
@@ -207,8 +351,7 @@ class TestBaseProvider:
     def test_download_video_with_uploader_only(
         self, mock_getsize, mock_glob, mock_ydl_class, provider
     ):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
         mock_info = {
             "title": "Test Video",
@@ -233,8 +376,7 @@ class TestBaseProvider:
     def test_download_video_with_channel_info(
         self, mock_getsize, mock_glob, mock_ydl_class, provider
     ):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
         mock_info = {
             "title": "Test Video",
@@ -260,8 +402,7 @@ class TestBaseProvider:
     def test_download_video_no_attribution(
         self, mock_getsize, mock_glob, mock_ydl_class, provider
     ):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
         mock_info = {
             "title": "Test Video",
@@ -284,8 +425,7 @@ class TestBaseProvider:
     def test_download_video_same_title_description(
         self, mock_getsize, mock_glob, mock_ydl_class, provider
     ):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
         mock_info = {
             "title": "Test Video",
@@ -311,8 +451,7 @@ class TestBaseProvider:
     def test_download_video_description_only(
         self, mock_getsize, mock_glob, mock_ydl_class, provider
     ):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
         mock_info = {
             "description": "Only description available",
@@ -335,8 +474,7 @@ class TestBaseProvider:
     def test_download_video_channel_without_id(
         self, mock_getsize, mock_glob, mock_ydl_class, provider
     ):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
         mock_info = {
             "title": "Channel Video",
@@ -360,8 +498,7 @@ class TestBaseProvider:
     def test_download_video_caption_truncates(
         self, mock_getsize, mock_glob, mock_ydl_class, provider
     ):
-        mock_ydl = Mock()
-        mock_ydl_class.return_value.__enter__.return_value = mock_ydl
+        mock_ydl = mock_ydl_class.return_value
 
         long_title = "T" * 512
         long_description = "D" * 800
@@ -386,9 +523,276 @@ class TestBaseProvider:
         assert len(caption) == 1024
 
 
+class TestPreflightPolicy:
+
+    @pytest.fixture
+    def provider(self):
+        return ConcreteProvider()
+
+    @pytest.fixture(autouse=True)
+    def clean_env(self, monkeypatch):
+        for name in ("MAX_DURATION_S", "MAX_DOWNLOAD_MB", "MAX_DURATION_S_TEST"):
+            monkeypatch.delenv(name, raising=False)
+
+    def test_short_video_passes(self, provider):
+        provider.check_policy({"duration": 45, "filesize": 5 * 1024 * 1024})
+
+    def test_too_long(self, provider):
+        with pytest.raises(DownloadError) as error:
+            provider.check_policy({"duration": 7200})
+        assert error.value.reason == TOO_LONG
+
+    def test_live_stream(self, provider):
+        with pytest.raises(DownloadError) as error:
+            provider.check_policy({"live_status": "is_live"})
+        assert error.value.reason == LIVE
+
+    def test_live_allowed_by_provider(self, provider):
+        provider.ALLOW_LIVE = True
+        provider.check_policy({"is_live": True})
+
+    def test_too_large_by_bitrate(self, provider):
+        info = {
+            "duration": 290,
+            "requested_formats": [{"tbr": 20000}, {"filesize": 4 * 1024 * 1024}],
+        }
+        with pytest.raises(DownloadError) as error:
+            provider.check_policy(info)
+        assert error.value.reason == TOO_LARGE
+
+    def test_unknown_size_passes(self, provider):
+        provider.check_policy({"duration": 60})
+
+    def test_class_limit(self, provider):
+        provider.MAX_DURATION_S = 60
+        with pytest.raises(DownloadError):
+            provider.check_policy({"duration": 61})
+
+    def test_platform_env_overrides_class_limit(self, provider, monkeypatch):
+        provider.MAX_DURATION_S = 60
+        monkeypatch.setenv("MAX_DURATION_S_TEST", "600")
+        provider.check_policy({"duration": 500})
+
+    def test_zero_disables_limit(self, provider, monkeypatch):
+        monkeypatch.setenv("MAX_DURATION_S", "0")
+        provider.check_policy({"duration": 10**6})
+
+    def test_records_estimate(self, provider):
+        with collect_stages() as stages:
+            provider.check_policy({"duration": 10, "filesize_approx": 1234})
+        assert stages.get("estimated_bytes") == 1234
+
+    @patch("providers.base.yt_dlp.YoutubeDL")
+    def test_rejected_before_download(self, mock_ydl_class, provider):
+        mock_ydl = mock_ydl_class.return_value
+        mock_ydl.extract_info.return_value = {"title": "Long", "duration": 7200}
+
+        with pytest.raises(DownloadError):
+            provider.download_video(("video", "123"))
+
+        mock_ydl.process_ie_result.assert_not_called()
+
+
+class TestExtractorDispatch:
+
+    @pytest.fixture
+    def provider(self):
+        return TikTokProvider()
+
+    def test_picks_declared_extractor(self, provider):
+        assert provider.ytdlp_ie_key("https://www.tiktok.com/@_/video/1") == "TikTok"
+        assert provider.ytdlp_ie_key("https://www.tiktok.com/t/ZMabc") == "TikTokVM"
+
+    def test_unknown_url_falls_back_to_scan(self, provider):
+        assert provider.ytdlp_ie_key("https://example.com/video") is None
+        assert provider._extractor_opts(None) == {}
+
+    def test_restricts_loaded_extractors(self, provider):
+        opts = provider._extractor_opts("TikTok")
+        assert opts == {"allowed_extractors": ["tiktok", r"vm\.tiktok"]}
+
+    def test_restriction_can_be_disabled(self, provider, monkeypatch):
+        monkeypatch.setenv("YTDLP_RESTRICT_EXTRACTORS", "0")
+        assert provider._extractor_opts("TikTok") == {}
+
+    def test_provider_without_restriction(self):
+        assert RedditProvider()._extractor_opts("Reddit") == {}
+
+    @pytest.mark.parametrize(
+        "provider_class", [c for c in provider_classes() if c.YTDLP_IE_KEYS]
+    )
+    def test_declared_keys_exist(self, provider_class):
+        for key in provider_class.YTDLP_IE_KEYS:
+            assert extractor_class(key).ie_key() == key
+
+    @patch("providers.base.yt_dlp.YoutubeDL")
+    def test_extract_uses_ie_key(self, mock_ydl_class, provider):
+        mock_ydl = mock_ydl_class.return_value
+        mock_ydl.extract_info.return_value = None
+
+        with pytest.raises(RuntimeError):
+            provider.download_video(("video", "123"))
+
+        opts = mock_ydl_class.call_args.args[0]
+        assert opts["allowed_extractors"] == ["tiktok", r"vm\.tiktok"]
+        assert mock_ydl.extract_info.call_args.kwargs["ie_key"] == "TikTok"
+
+    @patch("providers.base.yt_dlp.YoutubeDL")
+    @patch("providers.base.glob.glob")
+    @patch("providers.base.os.path.getsize")
+    def test_consecutive_downloads_reuse_youtubedl(
+        self, mock_getsize, mock_glob, mock_ydl_class, provider
+    ):
+        mock_ydl = mock_ydl_class.return_value
+        mock_ydl.extract_info.return_value = {"title": "Video", "duration": 10}
+        mock_glob.return_value = [os.path.join(tempfile.gettempdir(), "video.mp4")]
+        mock_getsize.return_value = 1024
+
+        with patch("builtins.open", mock_open_with_content(b"video_data")):
+            provider.download_video(("video", "1"))
+            provider.download_video(("video", "2"))
+
+        assert mock_ydl_class.call_count == 1
+        assert mock_ydl.process_ie_result.call_count == 2
+        # Все экземпляры работают с общим cookie jar
+        assert mock_ydl.__dict__["cookiejar"] is cookie_store.jar
+        assert "cookiefile" not in mock_ydl_class.call_args.args[0]
+
+
+class TestProbe:
+
+    @pytest.fixture
+    def provider(self):
+        return TikTokProvider()
+
+    @patch("providers.base.yt_dlp.YoutubeDL")
+    def test_probe_extracts_without_download(self, mock_ydl_class, provider):
+        mock_ydl = mock_ydl_class.return_value
+        mock_ydl.extract_info.return_value = {"title": "Clip", "duration": 10}
+
+        info = provider.probe(("video", "1"))
+
+        assert info["duration"] == 10
+        assert mock_ydl.extract_info.call_args.kwargs["download"] is False
+        mock_ydl.process_ie_result.assert_not_called()
+
+    def test_probe_is_profiled(self, provider):
+        # Извлечение — заметная часть работы потока, она должна попадать в /profile
+        assert hasattr(type(provider).probe, "__wrapped__")
+
+    @patch("providers.base.yt_dlp.YoutubeDL")
+    def test_probe_applies_policy(self, mock_ydl_class, provider):
+        mock_ydl_class.return_value.extract_info.return_value = {"duration": 7200}
+        with pytest.raises(DownloadError):
+            provider.probe(("video", "1"))
+
+    @patch("providers.base.yt_dlp.YoutubeDL")
+    @patch("providers.base.glob.glob")
+    @patch("providers.base.os.path.getsize")
+    def test_download_reuses_probed_info(
+        self, mock_getsize, mock_glob, mock_ydl_class, provider
+    ):
+        mock_ydl = mock_ydl_class.return_value
+        mock_glob.return_value = [os.path.join(tempfile.gettempdir(), "video.mp4")]
+        mock_getsize.return_value = 1024
+        info = {"title": "Clip", "duration": 10}
+
+        with patch("builtins.open", mock_open_with_content(b"video_data")):
+            data, caption = provider.download_video(("video", "1"), info=info)
+
+        assert data == b"video_data"
+        assert caption == "Clip"
+        mock_ydl.extract_info.assert_not_called()
+        mock_ydl.process_ie_result.assert_called_once_with(info, download=True)
+
+
+class TestEstimateCost:
+    LIMIT = 50 * 1024 * 1024
+
+    def cost(self, info):
+        return estimate_cost(
+            info, target_bytes=self.LIMIT, bandwidth_bps=8_000_000, encode_speed=1.0
+        )
+
+    def test_download_time_from_size(self):
+        # 1 МБ/с → 10 МБ за 10 с плюс секунда накладных расходов
+        assert self.cost({"duration": 30, "filesize": 10_000_000}) == 11.0
+
+    def test_encode_added_over_limit(self):
+        size = self.LIMIT + 1
+        assert self.cost({"duration": 240, "filesize": size}) == pytest.approx(
+            1 + size / 1_000_000 + 240
+        )
+
+    def test_unknown_size_uses_duration(self):
+        short = self.cost({"duration": 10})
+        long = self.cost({"duration": 240})
+        assert short < long
+
+    def test_provider_reads_env(self, monkeypatch):
+        monkeypatch.setenv("COST_BANDWIDTH_MBPS", "8")
+        info = {"duration": 30, "filesize": 10_000_000}
+        assert TikTokProvider().estimate_cost(info) == 11.0
+
+
+class TestEstimateFilesize:
+    def test_merged_formats(self):
+        info = {"requested_formats": [{"filesize": 100}, {"filesize_approx": 50}]}
+        assert estimate_filesize(info) == 150
+
+    def test_from_bitrate(self):
+        assert estimate_filesize({"duration": 8, "tbr": 1}) == 1000
+
+    def test_unknown(self):
+        assert estimate_filesize({"requested_formats": [{"filesize": 1}, {}]}) is None
+
+
 def mock_open_with_content(content):
     mock_file = Mock()
     mock_file.read.return_value = content
     mock_file.__enter__ = Mock(return_value=mock_file)
     mock_file.__exit__ = Mock(return_value=None)
     return Mock(return_value=mock_file)
+
+
+class TestRateLimiting:
+
+    @pytest.fixture
+    def provider(self):
+        return TikTokProvider()
+
+    def test_class_rates_with_env_override(self, provider, monkeypatch):
+        monkeypatch.setenv("RATE_PER_MIN", "600")
+        assert provider._policy_limit("RATE_PER_MIN", 60) == 30
+        monkeypatch.setenv("RATE_PER_MIN_TIKTOK", "120")
+        assert provider._policy_limit("RATE_PER_MIN", 60) == 120
+
+    @patch("providers.base.yt_dlp.YoutubeDL")
+    def test_probe_waits_for_token(self, mock_ydl_class, provider, fresh_rate_limits):
+        mock_ydl_class.return_value.extract_info.return_value = {"duration": 10}
+        with patch.object(
+            fresh_rate_limits, "acquire", return_value=1.5
+        ) as acquire, collect_stages() as stages:
+            provider.probe(("video", "1"))
+
+        acquire.assert_called_once_with("tiktok", "direct", 30, 5)
+        assert stages.get("rate_limit_wait") == 1.5
+
+    @patch("providers.base.yt_dlp.YoutubeDL")
+    def test_proxy_is_egress_identity(
+        self, mock_ydl_class, provider, fresh_rate_limits, monkeypatch
+    ):
+        monkeypatch.setenv("YTDLP_PROXY_TIKTOK", "socks5://10.0.0.2:1080")
+        mock_ydl_class.return_value.extract_info.return_value = {"duration": 10}
+        with patch.object(fresh_rate_limits, "acquire", return_value=0.0) as acquire:
+            provider.probe(("video", "1"))
+        assert acquire.call_args.args[1] == "socks5://10.0.0.2:1080"
+        assert provider._yt_opts("/tmp")["proxy"] == "socks5://10.0.0.2:1080"
+
+    def test_probed_download_is_not_paced_again(self, provider, fresh_rate_limits):
+        with patch.object(fresh_rate_limits, "acquire") as acquire, patch.object(
+            provider, "_ydl_pool", side_effect=RuntimeError("stop")
+        ):
+            with pytest.raises(RuntimeError):
+                provider.download_video(("video", "1"), info={"duration": 1})
+        acquire.assert_not_called()
@@ -0,0 +1,151 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from telegram import Chat, InputMediaVideo, Message, MessageEntity
+
+from handlers.batch import (
+    MEDIA_GROUP_LIMIT,
+    Link,
+    LinkResult,
+    as_input_media,
+    extract_links,
+    media_group_chunks,
+    resolve_links,
+    trim_caption,
+)
+from handlers.downloader import Downloader
+from monitoring.stages import RequestStages
+
+
+def make_message(*urls, text=None):
+    text = text if text is not None else " ".join(urls)
+    entities, offset = [], 0
+    for url in urls:
+        offset = text.index(url, offset)
+        entities.append(MessageEntity(MessageEntity.URL, offset, len(url)))
+        offset += len(url)
+    return Message(
+        message_id=1,
+        date=datetime.now(timezone.utc),
+        chat=Chat(id=1, type=Chat.PRIVATE),
+        text=text,
+        entities=entities,
+    )
+
+
+def pairs(links):
+    return [(link.url, link.platform) for link in links]
+
+
+class TestExtractLinks:
+    @pytest.fixture
+    def downloader(self):
+        return Downloader()
+
+    def test_multiple_platforms(self, downloader):
+        message = make_message(
+            "https://www.tiktok.com/@user/video/1234567890",
+            "https://www.instagram.com/reel/ABC123/",
+        )
+        assert pairs(extract_links(message, downloader)) == [
+            ("https://www.tiktok.com/@user/video/1234567890", "tiktok"),
+            ("https://www.instagram.com/reel/ABC123/", "instagram"),
+        ]
+
+    def test_deduplicates_same_video(self, downloader):
+        message = make_message(
+            "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+            "https://m.youtube.com/shorts/dQw4w9WgXcQ?feature=share",
+        )
+        links = extract_links(message, downloader)
+        assert pairs(links) == [
+            ("https://www.youtube.com/shorts/dQw4w9WgXcQ", "youtube")
+        ]
+
+    def test_deduplicates_equivalent_instagram_forms(self, downloader):
+        message = make_message(
+            "https://www.instagram.com/reel/ABC123/",
+            "https://www.instagram.com/p/ABC123/",
+        )
+        assert len(extract_links(message, downloader)) == 1
+
+    def test_skips_unsupported(self, downloader):
+        message = make_message(
+            "https://example.com/video", "https://www.instagram.com/p/XYZ/"
+        )
+        assert pairs(extract_links(message, downloader)) == [
+            ("https://www.instagram.com/p/XYZ/", "instagram")
+        ]
+
+    def test_limit(self, downloader):
+        urls = [f"https://www.instagram.com/p/ID{i}/" for i in range(5)]
+        assert len(extract_links(make_message(*urls), downloader, limit=3)) == 3
+
+    def test_falls_back_to_text(self, downloader):
+        message = make_message(text="просто текст")
+        assert extract_links(message, downloader) == [Link("просто текст", "unknown")]
+
+    def test_deduplicates_short_link_after_resolving(self, downloader):
+        message = make_message(
+            "https://vm.tiktok.com/ZMabc/",
+            "https://www.tiktok.com/@user/video/7301234567890",
+        )
+        with patch("handlers.downloader.short_links") as resolver:
+            resolver.resolve.return_value = (
+                "https://www.tiktok.com/@user/video/7301234567890"
+            )
+            links = resolve_links(extract_links(message, downloader), downloader)
+        assert pairs(links) == [("https://vm.tiktok.com/ZMabc/", "tiktok")]
+        provider, ref = links[0].routed
+        assert provider.platform == "tiktok"
+        assert ref == ("video", "7301234567890")
+
+    def test_extract_does_not_resolve(self, downloader):
+        message = make_message("https://vm.tiktok.com/ZMabc/")
+        with patch("handlers.downloader.short_links") as resolver:
+            links = extract_links(message, downloader)
+        resolver.resolve.assert_not_called()
+        assert links[0].routed[1] == ("short", "ZMabc")
+
+    def test_resolve_keeps_unrouted_text(self, downloader):
+        links = [Link("просто текст", "unknown")]
+        assert resolve_links(links, downloader) == links
+
+    def test_routed_link_is_not_routed_again(self, downloader):
+        message = make_message("https://www.instagram.com/reel/ABC123/")
+        link = extract_links(message, downloader)[0]
+        provider, ref = link.routed
+        with patch.object(downloader, "route") as route, patch.object(
+            provider, "probe", return_value={"duration": 5}
+        ) as probe:
+            job = downloader.probe(link.url, link.routed)
+        route.assert_not_called()
+        probe.assert_called_once_with(ref)
+        assert job.content_key == provider.content_key(ref)
+
+
+class TestMediaGroup:
+    def make_result(self, platform="tiktok", caption="caption"):
+        result = LinkResult("url", platform, RequestStages())
+        result.video_data = b"video"
+        result.caption = caption
+        return result
+
+    @pytest.mark.asyncio
+    async def test_chunks_respect_telegram_limit(self):
+        results = [self.make_result() for _ in range(MEDIA_GROUP_LIMIT + 3)]
+        chunks = media_group_chunks(results)
+        assert [len(chunk) for chunk in chunks] == [MEDIA_GROUP_LIMIT, 3]
+
+    @pytest.mark.asyncio
+    async def test_input_media(self):
+        media = as_input_media(self.make_result(caption="x" * 2000))
+        assert isinstance(media, InputMediaVideo)
+        assert len(media.caption) == 1024
+        assert media.media.filename == "tiktok_video.mp4"
+
+    def test_trim_caption(self):
+        assert trim_caption(None) is None
+        assert trim_caption("short") == "short"
+        assert trim_caption("x" * 1025).endswith("...")
@@ -0,0 +1,180 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from providers import calibration
+from providers.limits import encode_limit
+
+
+@pytest.fixture(autouse=True)
+def reset_calibration(monkeypatch):
+    for name in ("ENCODE_PRESET", "COST_ENCODE_SPEED", "COST_BANDWIDTH_MBPS"):
+        monkeypatch.delenv(name, raising=False)
+    limit = encode_limit.limit
+    yield
+    calibration._current = None
+    encode_limit.set_limit(limit)
+
+
+@pytest.fixture
+def fixture_server():
+    """Локальный файл-эталон для замера пропускной способности"""
+    body = b"x" * (512 * 1024)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/fixture.bin"
+    server.shutdown()
+    server.server_close()
+
+
+def make_result(**kwargs):
+    data = {
+        "encode_speed": {"veryfast": 0.2, "medium": 0.6},
+        "preset": "veryfast",
+        "encode_workers": 2,
+        "bandwidth_bps": 50_000_000,
+        "cpus": calibration.os.cpu_count() or 1,
+        "machine": calibration.platform.machine(),
+        "measured_at": 0.0,
+    }
+    data.update(kwargs)
+    return calibration.Calibration(**data)
+
+
+class TestChoices:
+    def test_slowest_preset_within_budget(self):
+        speeds = {"veryfast": 0.1, "faster": 0.2, "fast": 0.4, "medium": 0.7}
+        assert calibration.choose_preset(speeds, max_speed=0.5) == "fast"
+
+    def test_fastest_preset_when_none_fits(self):
+        speeds = {"veryfast": 1.5, "faster": 2.0, "fast": 3.0, "medium": 4.0}
+        assert calibration.choose_preset(speeds, max_speed=0.5) == "veryfast"
+
+    def test_workers_stop_when_throughput_flattens(self):
+        # 1 сжатие — 1 с/с, 2 — по 1.1 с/с (почти вдвое больше), 4 — по 4 с/с
+        speeds = {2: 1.1, 4: 4.0}
+        with patch.object(
+            calibration,
+            "measure_encode",
+            side_effect=lambda clip, workdir, preset, parallel: speeds[parallel],
+        ):
+            assert calibration.choose_workers("clip", "dir", "fast", 1.0, 8) == 2
+
+
+class TestCalibrate:
+    def test_without_ffmpeg_keeps_defaults(self):
+        with patch.object(calibration, "make_clip", side_effect=FileNotFoundError):
+            result = calibration.calibrate(bandwidth_url="")
+        assert result.encode_speed == {}
+        assert result.preset == calibration.DEFAULT_PRESET
+        assert result.encode_workers == encode_limit.limit
+        assert result.bandwidth_bps is None
+
+    def test_measures_every_preset_and_bandwidth(self, monkeypatch, fixture_server):
+        monkeypatch.setenv("CALIBRATION_MAX_ENCODE_SPEED", "0.5")
+        speeds = {"veryfast": 0.1, "faster": 0.2, "fast": 0.4, "medium": 0.8}
+        with patch.object(calibration, "make_clip"), patch.object(
+            calibration,
+            "measure_encode",
+            side_effect=lambda clip, workdir, preset, parallel=1: speeds[preset],
+        ), patch.object(calibration, "choose_workers", return_value=3):
+            result = calibration.calibrate(bandwidth_url=fixture_server)
+        assert result.encode_speed == speeds
+        assert result.preset == "fast"
+        assert result.encode_workers == 3
+        assert result.bandwidth_bps > 0
+
+    def test_bandwidth_counts_whole_body(self, fixture_server):
+        with patch.object(calibration.time, "monotonic", side_effect=[0.0, 1.0]):
+            assert calibration.measure_bandwidth(fixture_server) == 512 * 1024 * 8
+
+
+class TestPersistence:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "calibration.json")
+        calibration.save(make_result(), path)
+        assert calibration.load(path) == make_result()
+
+    def test_other_host_ignored(self, tmp_path):
+        path = str(tmp_path / "calibration.json")
+        calibration.save(make_result(cpus=-1), path)
+        assert calibration.load(path) is None
+
+    def test_corrupt_file_ignored(self, tmp_path):
+        path = tmp_path / "calibration.json"
+        path.write_text("{not json")
+        assert calibration.load(str(path)) is None
+
+    def test_auto_reuses_saved_result(self, monkeypatch, tmp_path):
+        path = str(tmp_path / "calibration.json")
+        calibration.save(make_result(), path)
+        monkeypatch.setenv("CALIBRATION_FILE", path)
+        monkeypatch.setenv("CALIBRATE", "auto")
+        with patch.object(calibration, "calibrate") as calibrate:
+            assert calibration.ensure_calibrated() == make_result()
+        calibrate.assert_not_called()
+
+    def test_failed_calibration_not_saved(self, monkeypatch, tmp_path):
+        path = tmp_path / "calibration.json"
+        monkeypatch.setenv("CALIBRATION_FILE", str(path))
+        monkeypatch.setenv("CALIBRATE", "auto")
+        with patch.object(
+            calibration, "calibrate", return_value=make_result(encode_speed={})
+        ):
+            calibration.ensure_calibrated()
+        assert not path.exists()
+
+    def test_disabled_without_file(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("CALIBRATION_FILE", str(tmp_path / "missing.json"))
+        monkeypatch.setenv("CALIBRATE", "0")
+        with patch.object(calibration, "calibrate") as calibrate:
+            assert calibration.ensure_calibrated() is None
+        calibrate.assert_not_called()
+
+
+class TestApply:
+    def test_defaults_without_calibration(self):
+        assert calibration.encode_preset() == "medium"
+        assert calibration.encode_speed() == 1.0
+        assert calibration.bandwidth_bps() == 20_000_000
+
+    def test_calibrated_values_used(self):
+        calibration.apply(make_result())
+        assert calibration.encode_preset() == "veryfast"
+        assert calibration.encode_speed() == 0.2
+        assert calibration.bandwidth_bps() == 50_000_000
+        assert encode_limit.limit == min(2, encode_limit.max_limit)
+
+    def test_env_overrides_calibration(self, monkeypatch):
+        calibration.apply(make_result())
+        monkeypatch.setenv("ENCODE_PRESET", "medium")
+        monkeypatch.setenv("COST_BANDWIDTH_MBPS", "8")
+        assert calibration.encode_preset() == "medium"
+        assert calibration.encode_speed() == 0.6
+        assert calibration.bandwidth_bps() == 8_000_000
+
+    def test_compress_uses_calibrated_preset(self, tmp_path):
+        from providers.base import compress_to_target
+
+        calibration.apply(make_result())
+        with patch("providers.base.subprocess.run") as run:
+            compress_to_target(
+                str(tmp_path / "in.mp4"), str(tmp_path / "out.mp4"), 10, 5_000_000
+            )
+        for call in run.call_args_list:
+            args = call.args[0]
+            assert args[args.index("-preset") + 1] == "veryfast"
@@ -0,0 +1,114 @@
+from unittest.mock import Mock, patch
+
+from handlers.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakers,
+)
+from monitoring.metrics import CIRCUIT_STATE
+
+
+def make_breaker(**kwargs):
+    kwargs.setdefault("failures", 3)
+    kwargs.setdefault("window", 60)
+    kwargs.setdefault("cooldown", 30)
+    return CircuitBreaker(kwargs.pop("platform", "test"), **kwargs)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_burst(self):
+        breaker = make_breaker()
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert CIRCUIT_STATE.value(platform="test") == 2
+
+    def test_success_resets_failures(self):
+        breaker = make_breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_old_failures_expire(self):
+        breaker = make_breaker(window=10)
+        with patch("handlers.circuit_breaker.time.monotonic") as monotonic:
+            monotonic.return_value = 0.0
+            breaker.record_failure()
+            breaker.record_failure()
+            monotonic.return_value = 20.0
+            breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_half_open_admits_limited_probes(self):
+        breaker = make_breaker(failures=1, probes=1)
+        with patch("handlers.circuit_breaker.time.monotonic") as monotonic:
+            monotonic.return_value = 0.0
+            breaker.record_failure()
+            monotonic.return_value = 31.0
+            assert breaker.state == HALF_OPEN
+            assert breaker.allow()
+            assert not breaker.allow()
+
+    def test_probe_success_closes(self):
+        breaker = make_breaker(failures=1)
+        with patch("handlers.circuit_breaker.time.monotonic") as monotonic:
+            monotonic.return_value = 0.0
+            breaker.record_failure()
+            monotonic.return_value = 31.0
+            assert breaker.allow()
+            breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_probe_failure_reopens(self):
+        breaker = make_breaker(failures=3)
+        with patch("handlers.circuit_breaker.time.monotonic") as monotonic:
+            monotonic.return_value = 0.0
+            for _ in range(3):
+                breaker.record_failure()
+            monotonic.return_value = 31.0
+            assert breaker.allow()
+            breaker.record_failure()
+            assert breaker.state == OPEN
+            assert not breaker.allow()
+
+    def test_listeners_get_transitions(self):
+        listener = Mock()
+        breaker = make_breaker(failures=1, listeners=[listener])
+        with patch("handlers.circuit_breaker.time.monotonic") as monotonic:
+            monotonic.return_value = 0.0
+            breaker.record_failure()
+            monotonic.return_value = 31.0
+            breaker.allow()
+            breaker.record_success()
+        transitions = [call.args[1:3] for call in listener.call_args_list]
+        assert transitions == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+        assert listener.call_args_list[0].args[0] == "test"
+
+    def test_failing_listener_does_not_break(self):
+        breaker = make_breaker(failures=1, listeners=[Mock(side_effect=ValueError)])
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+
+class TestCircuitBreakers:
+    def test_per_platform(self, monkeypatch):
+        monkeypatch.setenv("CIRCUIT_FAILURES", "1")
+        breakers = CircuitBreakers()
+        breakers.record_failure("instagram")
+        assert not breakers.allow("instagram")
+        assert breakers.allow("tiktok")
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setenv("CIRCUIT_FAILURES", "0")
+        breakers = CircuitBreakers()
+        for _ in range(10):
+            breakers.record_failure("instagram")
+        assert breakers.allow("instagram")
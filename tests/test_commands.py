@@ -1,10 +1,12 @@
-from unittest.mock import AsyncMock, Mock
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 from telegram import Message, Update, User
 from telegram.ext import ContextTypes
 
 from commands.help import help_command
+from commands.profile import profile_command
 from commands.start import start_command
 
 
@@ -122,3 +124,85 @@ class TestHelpCommand:
         assert "Limitations" in call_args
         assert "5 minutes" in call_args
         assert "50 MB" in call_args
+
+
+class TestProfileCommand:
+    @pytest.fixture
+    def mock_update(self):
+        update = Mock(spec=Update)
+        update.effective_user = Mock(spec=User)
+        update.effective_user.id = 42
+        update.effective_user.username = "admin"
+        update.effective_user.language_code = "en"
+
+        update.message = Mock(spec=Message)
+        update.message.reply_text = AsyncMock()
+
+        return update
+
+    @pytest.fixture
+    def mock_context(self):
+        context = Mock(spec=ContextTypes.DEFAULT_TYPE)
+        context.args = ["5"]
+        context.tasks = []
+
+        def create_task(coro, **kwargs):
+            task = asyncio.ensure_future(coro)
+            context.tasks.append(task)
+            return task
+
+        context.application = Mock()
+        context.application.create_task = Mock(side_effect=create_task)
+        return context
+
+    @pytest.mark.asyncio
+    async def test_non_admin_is_ignored(self, mock_update, mock_context, monkeypatch):
+        monkeypatch.setenv("ADMIN_USER_IDS", "1,2")
+
+        with patch("commands.profile.profiler") as mock_profiler:
+            await profile_command(mock_update, mock_context)
+
+        mock_update.message.reply_text.assert_not_called()
+        mock_profiler.run_for.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_admin_gets_report(self, mock_update, mock_context, monkeypatch):
+        monkeypatch.setenv("ADMIN_USER_IDS", "1, 42")
+
+        with patch("commands.profile.profiler") as mock_profiler:
+            mock_profiler.active = False
+            mock_profiler.run_for = AsyncMock(return_value="Top functions\nfoo")
+            await profile_command(mock_update, mock_context)
+            # Обработчик вернулся до конца сессии, отчёт приходит из задачи
+            assert mock_update.message.reply_text.call_count == 1
+            await asyncio.gather(*mock_context.tasks)
+
+        mock_profiler.run_for.assert_awaited_once_with(5)
+        assert mock_update.message.reply_text.call_count == 2
+        final = mock_update.message.reply_text.call_args[0][0]
+        assert "Profiling report" in final
+        assert "Top functions" in final
+
+    @pytest.mark.asyncio
+    async def test_admin_busy(self, mock_update, mock_context, monkeypatch):
+        monkeypatch.setenv("ADMIN_USER_IDS", "42")
+
+        with patch("commands.profile.profiler") as mock_profiler:
+            mock_profiler.active = True
+            await profile_command(mock_update, mock_context)
+
+        mock_update.message.reply_text.assert_called_once()
+        assert "already running" in mock_update.message.reply_text.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_seconds_are_clamped(self, mock_update, mock_context, monkeypatch):
+        monkeypatch.setenv("ADMIN_USER_IDS", "42")
+        mock_context.args = ["100000"]
+
+        with patch("commands.profile.profiler") as mock_profiler:
+            mock_profiler.active = False
+            mock_profiler.run_for = AsyncMock(return_value="report")
+            await profile_command(mock_update, mock_context)
+            await asyncio.gather(*mock_context.tasks)
+
+        mock_profiler.run_for.assert_awaited_once_with(300)
@@ -0,0 +1,121 @@
+import os
+import stat
+import time
+from http.cookiejar import Cookie
+
+import pytest
+
+from providers.cookies import CookieStore
+
+HEADER = "# Netscape HTTP Cookie File\n"
+
+
+def write_cookies(path, value, mtime=None):
+    expires = int(time.time()) + 3600
+    path.write_text(HEADER + f".youtube.com\tTRUE\t/\tTRUE\t{expires}\tSID\t{value}\n")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def cookie_value(store, name="SID"):
+    return next(c.value for c in store.jar if c.name == name)
+
+
+def make_cookie(name, value):
+    return Cookie(
+        0,
+        name,
+        value,
+        None,
+        False,
+        ".youtube.com",
+        True,
+        True,
+        "/",
+        True,
+        True,
+        int(time.time()) + 3600,
+        False,
+        None,
+        None,
+        {},
+    )
+
+
+class TestCookieStore:
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        path = tmp_path / "cookies.txt"
+        write_cookies(path, "first", mtime=1_000_000)
+        return path
+
+    def test_loads_once(self, source, tmp_path):
+        store = CookieStore(str(source), runtime="")
+        assert store.refresh()
+        assert not store.refresh()
+        assert cookie_value(store) == "first"
+
+    def test_reloads_when_source_changes(self, source):
+        store = CookieStore(str(source), runtime="")
+        store.refresh()
+        jar = store.jar
+
+        write_cookies(source, "second", mtime=2_000_000)
+
+        assert store.refresh()
+        assert store.jar is jar
+        assert cookie_value(store) == "second"
+
+    def test_missing_source(self, tmp_path):
+        store = CookieStore(str(tmp_path / "missing.txt"), runtime="")
+        assert not store.refresh()
+        assert len(store.jar) == 0
+
+    def test_persists_refreshed_cookies(self, source, tmp_path):
+        runtime = tmp_path / "state" / "runtime.txt"
+        store = CookieStore(str(source), runtime=str(runtime), save_interval=0)
+        store.refresh()
+        assert not store.save()  # ничего не изменилось
+
+        store.jar.set_cookie(make_cookie("VISITOR", "abc"))
+
+        assert store.save()
+        assert "VISITOR\tabc" in runtime.read_text()
+        assert stat.S_IMODE(os.stat(runtime).st_mode) == 0o600
+        assert not store.save()
+
+    def test_save_is_rate_limited(self, source, tmp_path):
+        store = CookieStore(
+            str(source), runtime=str(tmp_path / "rt.txt"), save_interval=3600
+        )
+        store.refresh()
+        store.jar.set_cookie(make_cookie("A", "1"))
+        assert store.save()
+        store.jar.set_cookie(make_cookie("B", "2"))
+        assert not store.save()
+        assert store.save(force=True)
+
+    def test_prefers_newer_runtime_file_on_start(self, source, tmp_path):
+        runtime = tmp_path / "rt.txt"
+        write_cookies(runtime, "refreshed", mtime=1_500_000)
+
+        store = CookieStore(str(source), runtime=str(runtime))
+        store.refresh()
+
+        assert cookie_value(store) == "refreshed"
+
+    def test_ignores_stale_runtime_file(self, source, tmp_path):
+        runtime = tmp_path / "rt.txt"
+        write_cookies(runtime, "stale", mtime=500_000)
+
+        store = CookieStore(str(source), runtime=str(runtime))
+        store.refresh()
+
+        assert cookie_value(store) == "first"
+
+    def test_no_runtime_disables_saving(self, source):
+        store = CookieStore(str(source), runtime="")
+        store.refresh()
+        store.jar.set_cookie(make_cookie("A", "1"))
+        assert not store.save(force=True)
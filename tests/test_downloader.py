@@ -2,8 +2,11 @@ from unittest.mock import Mock, patch
 
 import pytest
 
-from handlers.downloader import Downloader
+from handlers.circuit_breaker import CircuitBreakers
+from handlers.downloader import Downloader, DownloadJob
+from handlers.negative_cache import NegativeCache
 from providers.base import BaseProvider
+from providers.errors import DownloadError
 
 
 class MockProvider(BaseProvider):
@@ -185,3 +188,283 @@ class TestDownloader:
         assert caption == "caption"
         # Должен использоваться fallback из имени класса (MockProvider -> mock)
         assert platform == "mock"
+
+
+class TestDownloaderRouting:
+
+    @pytest.fixture
+    def downloader(self):
+        return Downloader()
+
+    @pytest.mark.parametrize(
+        "url,platform,ref",
+        [
+            ("https://www.instagram.com/reel/XYZ789/", "instagram", ("reel", "XYZ789")),
+            ("https://m.youtube.com/shorts/ABC123", "youtube", ("watch", "ABC123")),
+            ("https://YOUTU.BE/ABC123", "youtube", ("watch", "ABC123")),
+            ("https://vm.tiktok.com/ABC123/", "tiktok", ("short", "ABC123")),
+            ("https://fb.watch/ABC123DEF/", "facebook", ("short", "ABC123DEF")),
+            ("https://redd.it/abc123", "reddit", ("post", "abc123")),
+            ("https://RuTube.ru/play/embed/123456", "rutube", ("embed", "123456")),
+        ],
+    )
+    def test_route_returns_provider_and_ref(self, downloader, url, platform, ref):
+        provider, result = downloader.route(url)
+
+        assert provider.platform == platform
+        assert result == ref
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://notinstagram.com/p/ABC123/",
+            "https://instagram.com/user/",
+            "https://example.com/video/1",
+            "hello there",
+            "",
+        ],
+    )
+    def test_route_unknown(self, downloader, url):
+        assert downloader.route(url) == (None, None)
+
+    def test_index_rebuilt_when_providers_change(self, downloader):
+        assert downloader.route("https://youtu.be/ABC123")[0] is not None
+
+        downloader.downloaders = [
+            p for p in downloader.downloaders if p.platform != "youtube"
+        ]
+
+        assert downloader.route("https://youtu.be/ABC123") == (None, None)
+
+
+class TestCanonicalRef:
+
+    @pytest.fixture
+    def downloader(self):
+        return Downloader()
+
+    def provider(self, downloader, platform):
+        return next(d for d in downloader.downloaders if d.platform == platform)
+
+    def test_regular_ref_is_not_resolved(self, downloader):
+        with patch("handlers.downloader.short_links") as resolver:
+            provider = self.provider(downloader, "tiktok")
+            ref = ("video", "123")
+            assert downloader.canonical_ref(provider, ref) == ref
+            resolver.resolve.assert_not_called()
+
+    def test_short_tiktok_resolves_to_video(self, downloader):
+        with patch("handlers.downloader.short_links") as resolver:
+            resolver.resolve.return_value = (
+                "https://www.tiktok.com/@user/video/7301234567890?_r=1"
+            )
+            provider = self.provider(downloader, "tiktok")
+
+            ref = downloader.canonical_ref(provider, ("short", "ZMabc"))
+
+            assert ref == ("video", "7301234567890")
+            resolver.resolve.assert_called_once_with("https://www.tiktok.com/t/ZMabc")
+
+    def test_short_facebook_resolves_to_watch(self, downloader):
+        with patch("handlers.downloader.short_links") as resolver:
+            resolver.resolve.return_value = "https://www.facebook.com/watch/?v=42"
+            provider = self.provider(downloader, "facebook")
+
+            assert downloader.canonical_ref(provider, ("short", "abc")) == (
+                "watch",
+                "42",
+            )
+
+    @pytest.mark.parametrize(
+        "target", [None, "https://www.tiktok.com/login", "https://vm.tiktok.com/x/"]
+    )
+    def test_unresolved_keeps_short_ref(self, downloader, target):
+        with patch("handlers.downloader.short_links") as resolver:
+            resolver.resolve.return_value = target
+            provider = self.provider(downloader, "tiktok")
+
+            assert downloader.canonical_ref(provider, ("short", "x")) == ("short", "x")
+
+    def test_download_records_canonical_content_key(self, downloader):
+        with patch("handlers.downloader.short_links") as resolver, patch(
+            "handlers.downloader.record"
+        ) as record:
+            resolver.resolve.return_value = "https://www.tiktok.com/@u/video/99"
+            provider = self.provider(downloader, "tiktok")
+            with patch.object(
+                provider, "download_video", return_value=(b"data", "cap")
+            ) as download:
+                downloader.download_video("https://vm.tiktok.com/ZMabc/")
+
+            download.assert_called_once_with(("video", "99"))
+            record.assert_called_with("content_key", "tiktok:video:99")
+
+
+class TestNegativeCaching:
+
+    @pytest.fixture
+    def cache(self):
+        cache = NegativeCache()
+        with patch("handlers.downloader.negative_cache", cache):
+            yield cache
+
+    @pytest.fixture
+    def downloader(self):
+        return Downloader()
+
+    def test_permanent_failure_is_remembered(self, downloader, cache):
+        provider = downloader.downloaders[1]  # TikTok
+        url = "https://www.tiktok.com/@user/video/123"
+        with patch.object(
+            provider,
+            "download_video",
+            side_effect=Exception("This video has been removed"),
+        ) as download:
+            with pytest.raises(DownloadError) as first:
+                downloader.download_video(url)
+            with pytest.raises(DownloadError) as second:
+                downloader.download_video(url)
+
+        assert first.value.reason == second.value.reason == "removed"
+        assert download.call_count == 1
+        assert cache.get("tiktok:video:123") == "removed"
+
+    def test_equivalent_links_share_entry(self, downloader, cache):
+        cache.add("instagram:post:ABC", "private")
+        provider = downloader.downloaders[0]
+        with patch.object(provider, "download_video") as download:
+            with pytest.raises(DownloadError):
+                downloader.download_video("https://www.instagram.com/reel/ABC/")
+        download.assert_not_called()
+
+    def test_probe_failure_is_remembered(self, downloader, cache):
+        provider = downloader.downloaders[1]
+        with patch.object(
+            provider, "probe", side_effect=Exception("This video is private")
+        ):
+            with pytest.raises(DownloadError):
+                downloader.probe("https://www.tiktok.com/@u/video/5")
+        assert cache.get("tiktok:video:5") == "private"
+
+    def test_transient_failure_is_not_cached(self, downloader, cache):
+        provider = downloader.downloaders[1]
+        with patch.object(
+            provider, "download_video", side_effect=Exception("Read timed out")
+        ):
+            result = downloader.download_video("https://www.tiktok.com/@u/video/1")
+
+        assert result == (None, None, None)
+        assert len(cache) == 0
+
+
+class TestProbeAndFetch:
+
+    @pytest.fixture
+    def downloader(self):
+        return Downloader()
+
+    def test_probe_returns_job_with_cost(self, downloader):
+        provider = downloader.downloaders[1]
+        info = {"duration": 10, "filesize": 1_000_000}
+        with patch.object(provider, "probe", return_value=info) as probe:
+            job = downloader.probe("https://www.tiktok.com/@u/video/42")
+
+        probe.assert_called_once_with(("video", "42"))
+        assert job.provider is provider
+        assert job.content_key == "tiktok:video:42"
+        assert job.info is info
+        assert job.cost == provider.estimate_cost(info)
+        assert job.platform == "tiktok"
+
+    def test_probe_unsupported_url(self, downloader):
+        assert downloader.probe("https://example.com/video") is None
+
+    def test_fetch_uses_probed_info(self, downloader):
+        provider = downloader.downloaders[1]
+        job = DownloadJob(provider, ("video", "42"), "tiktok:video:42", {}, 1.0)
+        with patch.object(
+            provider, "download_video", return_value=(b"data", "caption")
+        ) as download:
+            result = downloader.fetch(job)
+
+        download.assert_called_once_with(("video", "42"), info={})
+        assert result == (b"data", "caption", "tiktok")
+
+    def test_fetch_transient_failure(self, downloader):
+        provider = downloader.downloaders[1]
+        job = DownloadJob(provider, ("video", "42"), "tiktok:video:42", {}, 1.0)
+        with patch.object(provider, "download_video", side_effect=Exception("boom")):
+            assert downloader.fetch(job) == (None, None, "tiktok")
+
+
+class TestCircuitBreaking:
+
+    @pytest.fixture
+    def breakers(self, monkeypatch):
+        monkeypatch.setenv("CIRCUIT_FAILURES", "2")
+        breakers = CircuitBreakers()
+        with patch("handlers.downloader.circuit_breakers", breakers), patch(
+            "handlers.downloader.negative_cache", NegativeCache()
+        ):
+            yield breakers
+
+    @pytest.fixture
+    def downloader(self):
+        return Downloader()
+
+    def test_open_circuit_fails_fast(self, downloader, breakers):
+        provider = downloader.downloaders[0]  # Instagram
+        with patch.object(
+            provider, "probe", side_effect=Exception("HTTP Error 429")
+        ) as probe:
+            for i in range(2):
+                assert downloader.probe(f"https://www.instagram.com/p/a{i}/") is None
+            with pytest.raises(DownloadError) as error:
+                downloader.probe("https://www.instagram.com/p/b/")
+
+        assert error.value.reason == "platform_unavailable"
+        assert probe.call_count == 2
+        # Другие платформы не затронуты
+        assert breakers.allow("tiktok")
+
+    def test_login_required_counts_as_failure(self, downloader, breakers):
+        provider = downloader.downloaders[0]
+        with patch.object(
+            provider, "probe", side_effect=Exception("Login required to view")
+        ):
+            for i in range(2):
+                with pytest.raises(DownloadError):
+                    downloader.probe(f"https://www.instagram.com/p/c{i}/")
+        assert not breakers.allow("instagram")
+
+    def test_content_errors_do_not_open(self, downloader, breakers):
+        provider = downloader.downloaders[0]
+        with patch.object(
+            provider, "probe", side_effect=Exception("This video is private")
+        ):
+            for i in range(3):
+                with pytest.raises(DownloadError) as error:
+                    downloader.probe(f"https://www.instagram.com/p/d{i}/")
+                assert error.value.reason == "private"
+        assert breakers.allow("instagram")
+
+    def test_fetch_failures_count(self, downloader, breakers):
+        provider = downloader.downloaders[0]
+        job = DownloadJob(provider, ("post", "1"), "instagram:post:1", {}, 1.0)
+        with patch.object(
+            provider, "download_video", side_effect=Exception("Read timed out")
+        ):
+            for _ in range(2):
+                downloader.fetch(job)
+        assert not breakers.allow("instagram")
+
+    def test_resource_errors_are_raised_not_blamed_on_platform(
+        self, downloader, breakers
+    ):
+        provider = downloader.downloaders[0]
+        job = DownloadJob(provider, ("post", "1"), "instagram:post:1", {}, 1.0)
+        with patch.object(provider, "download_video", side_effect=MemoryError):
+            for _ in range(2):
+                with pytest.raises(MemoryError):
+                    downloader.fetch(job)
+        assert breakers.allow("instagram")
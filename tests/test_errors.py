@@ -0,0 +1,117 @@
+import errno
+
+import pytest
+import yt_dlp
+from yt_dlp.utils import ExtractorError, GeoRestrictedError
+
+from providers.errors import (
+    GEO_BLOCKED,
+    LOGIN_REQUIRED,
+    PRIVATE,
+    REMOVED,
+    DownloadError,
+    classify_error,
+    is_resource_error,
+)
+
+
+class TestClassifyError:
+    @pytest.mark.parametrize(
+        "message,reason",
+        [
+            ("ERROR: [youtube] abc: Video unavailable", REMOVED),
+            ("ERROR: [TikTok] 123: This video has been removed", REMOVED),
+            ("HTTP Error 404: Not Found", REMOVED),
+            ("ERROR: [youtube] abc: Video unavailable. This video is private", PRIVATE),
+            (
+                "ERROR: [youtube] abc: Private video. Sign in if you've been granted access",
+                PRIVATE,
+            ),
+            ("This account is private", PRIVATE),
+            (
+                "ERROR: [youtube] abc: The uploader has not made this video "
+                "available in your country",
+                GEO_BLOCKED,
+            ),
+            (
+                "ERROR: [Instagram] C1: Requested content is not available, "
+                "rate-limit reached or login required",
+                LOGIN_REQUIRED,
+            ),
+            ("Sign in to confirm your age", LOGIN_REQUIRED),
+        ],
+    )
+    def test_known_messages(self, message, reason):
+        assert classify_error(Exception(message)) == reason
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "Read timed out",
+            "HTTP Error 503: Service Unavailable",
+            "Connection reset by peer",
+            "Video file not found after download",
+        ],
+    )
+    def test_transient_errors_are_not_classified(self, message):
+        assert classify_error(Exception(message)) is None
+
+    def test_geo_restricted_exception_type(self):
+        assert classify_error(GeoRestrictedError("blocked")) == GEO_BLOCKED
+
+    def test_wrapped_extractor_error(self):
+        cause = ExtractorError("This video has been removed", expected=True)
+        try:
+            raise cause
+        except ExtractorError:
+            import sys
+
+            error = yt_dlp.utils.DownloadError("ERROR: failed", sys.exc_info())
+        assert classify_error(error) == REMOVED
+
+    def test_chained_cause(self):
+        try:
+            try:
+                raise RuntimeError("This account is private")
+            except RuntimeError as e:
+                raise RuntimeError("yt-dlp failed") from e
+        except RuntimeError as error:
+            assert classify_error(error) == PRIVATE
+
+    def test_download_error_keeps_reason(self):
+        assert classify_error(DownloadError(REMOVED)) == REMOVED
+        assert str(DownloadError(PRIVATE, "details")) == "details"
+
+
+class TestIsResourceError:
+    @pytest.mark.parametrize(
+        "error",
+        [
+            MemoryError(),
+            OSError(errno.ENOSPC, "No space left on device"),
+            OSError(errno.EMFILE, "Too many open files"),
+        ],
+    )
+    def test_resource_errors(self, error):
+        assert is_resource_error(error)
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            RuntimeError("Video file not found after download"),
+            ConnectionResetError(errno.ECONNRESET, "Connection reset by peer"),
+            TimeoutError(),
+            DownloadError(REMOVED),
+        ],
+    )
+    def test_other_errors(self, error):
+        assert not is_resource_error(error)
+
+    def test_wrapped_by_yt_dlp(self):
+        try:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        except OSError:
+            import sys
+
+            error = yt_dlp.utils.DownloadError("ERROR: write failed", sys.exc_info())
+        assert is_resource_error(error)
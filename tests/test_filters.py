@@ -0,0 +1,117 @@
+from datetime import datetime, timezone
+
+import pytest
+from telegram import Chat, Message, MessageEntity, Update
+
+from handlers.downloader import Downloader
+from handlers.filters import SUPPORTED_LINK, is_supported_host, iter_message_urls
+from providers.base import url_host
+from providers.registry import SUPPORTED_HOSTS
+
+
+def make_message(text, entities=(), chat_type=Chat.GROUP):
+    return Message(
+        message_id=1,
+        date=datetime.now(timezone.utc),
+        chat=Chat(id=-100, type=chat_type),
+        text=text,
+        entities=list(entities),
+    )
+
+
+def url_entity(text, url):
+    return MessageEntity(MessageEntity.URL, text.index(url), len(url))
+
+
+class TestUrlHost:
+    def test_with_scheme(self):
+        assert url_host("https://www.YouTube.com/shorts/abc") == "www.youtube.com"
+
+    def test_without_scheme(self):
+        assert url_host("vm.tiktok.com/ZMabc/") == "vm.tiktok.com"
+
+    def test_invalid(self):
+        assert url_host("http://[::1") is None
+
+
+class TestIsSupportedHost:
+    def test_subdomain_matches_suffix(self):
+        assert is_supported_host("vm.tiktok.com", SUPPORTED_HOSTS)
+
+    def test_unknown_host(self):
+        assert not is_supported_host("example.com", SUPPORTED_HOSTS)
+
+    def test_lookalike_host(self):
+        assert not is_supported_host("notyoutube.com", SUPPORTED_HOSTS)
+
+    def test_empty(self):
+        assert not is_supported_host(None, SUPPORTED_HOSTS)
+
+
+class TestSupportedLinkFilter:
+    def check(self, message):
+        return bool(SUPPORTED_LINK.check_update(Update(1, message=message)))
+
+    def test_plain_chatter_rejected(self):
+        assert not self.check(make_message("всем привет, как дела?"))
+
+    def test_unsupported_link_rejected(self):
+        text = "смотри https://example.com/video"
+        assert not self.check(
+            make_message(text, [url_entity(text, "https://example.com/video")])
+        )
+
+    def test_supported_url_entity(self):
+        text = "смотри https://www.instagram.com/reel/ABC123/ ого"
+        url = "https://www.instagram.com/reel/ABC123/"
+        assert self.check(make_message(text, [url_entity(text, url)]))
+
+    def test_url_entity_without_scheme(self):
+        text = "vm.tiktok.com/ZMabc/"
+        assert self.check(make_message(text, [url_entity(text, text)]))
+
+    @pytest.mark.parametrize(
+        "url", ["vm.tiktok.com/ZMabc/", "www.instagram.com/reel/ABC123/"]
+    )
+    def test_router_accepts_what_filter_passes(self, url):
+        # Ссылка, пропущенная фильтром в группе, не должна теряться в роутере
+        assert self.check(make_message(url, [url_entity(url, url)]))
+        provider, ref = Downloader().route(url)
+        assert provider is not None
+        assert ref is not None
+
+    def test_text_link_entity(self):
+        text = "вот видео"
+        entity = MessageEntity(
+            MessageEntity.TEXT_LINK, 0, 3, url="https://youtu.be/dQw4w9WgXcQ"
+        )
+        assert self.check(make_message(text, [entity]))
+
+    def test_url_in_text_without_entity_is_ignored(self):
+        # Фильтр доверяет разбору Telegram и не сканирует текст сам
+        assert not self.check(make_message("https://youtu.be/dQw4w9WgXcQ"))
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://www.facebook.com/reel/123",
+            "https://fb.watch/abc/",
+            "https://rutube.ru/video/abc/",
+            "https://redd.it/abc",
+            "https://likee.video/@user/video/1",
+        ],
+    )
+    def test_all_platforms(self, url):
+        assert self.check(make_message(url, [url_entity(url, url)]))
+
+
+class TestIterMessageUrls:
+    def test_collects_both_entity_kinds(self):
+        text = "a https://youtu.be/x b"
+        entities = [
+            url_entity(text, "https://youtu.be/x"),
+            MessageEntity(MessageEntity.TEXT_LINK, 0, 1, url="https://redd.it/y"),
+            MessageEntity(MessageEntity.BOLD, 0, 1),
+        ]
+        urls = list(iter_message_urls(make_message(text, entities)))
+        assert urls == ["https://youtu.be/x", "https://redd.it/y"]
@@ -0,0 +1,184 @@
+import errno
+import subprocess
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from monitoring.metrics import CONCURRENCY_LIMIT
+from providers.limits import AdaptiveLimit, RateLimiters, TokenBucket
+
+
+def make_limit(**kwargs):
+    kwargs.setdefault("initial", 4)
+    kwargs.setdefault("min_limit", 1)
+    kwargs.setdefault("max_limit", 8)
+    kwargs.setdefault("window", 4)
+    kwargs.setdefault("enabled", True)
+    return AdaptiveLimit(kwargs.pop("name", "test"), **kwargs)
+
+
+def feed(limit, latency, count=4, **kwargs):
+    for _ in range(count):
+        limit.update(latency, **kwargs)
+    return limit.limit
+
+
+class TestAdaptiveLimit:
+    def test_grows_additively_when_saturated(self):
+        limit = make_limit()
+        assert feed(limit, 1.0, saturated=True) == 5
+        assert feed(limit, 1.1, saturated=True) == 6
+        assert CONCURRENCY_LIMIT.value(pool="test") == 6
+
+    def test_does_not_grow_when_idle(self):
+        limit = make_limit()
+        assert feed(limit, 1.0, saturated=False) == 4
+
+    def test_backs_off_on_latency(self):
+        limit = make_limit()
+        feed(limit, 1.0, saturated=True)
+        assert feed(limit, 3.0, saturated=True) == 3
+
+    def test_backs_off_on_errors(self):
+        limit = make_limit()
+        feed(limit, 1.0, count=2, saturated=True)
+        assert feed(limit, None, count=2, ok=False, saturated=True) == 3
+
+    def test_bounds(self):
+        limit = make_limit(initial=2, max_limit=3)
+        for _ in range(5):
+            feed(limit, 1.0, saturated=True)
+        assert limit.limit == 3
+        for _ in range(5):
+            feed(limit, None, ok=False)
+        assert limit.limit == 1
+
+    def test_baseline_drifts_up(self):
+        limit = make_limit()
+        feed(limit, 1.0, saturated=False)
+        feed(limit, 1.5, saturated=False)
+        assert 1.0 < limit.baselines[""] < 1.5
+
+    def test_baseline_forgets_old_best(self):
+        # Канал стал медленнее навсегда: после отступления лимит снова растёт
+        limit = make_limit(initial=4)
+        feed(limit, 1.0, saturated=True)
+        assert feed(limit, 3.0, saturated=True) < 5
+        for _ in range(5):
+            feed(limit, 3.0, saturated=True)
+        assert limit.baselines[""] > 2.0
+        before = limit.limit
+        assert feed(limit, 3.0, saturated=True) == before + 1
+
+    def test_platforms_have_own_baselines(self):
+        # Окно медленной платформы после окна быстрой — не признак перегрузки
+        limit = make_limit()
+        assert feed(limit, 0.1, saturated=True, key="instagram") == 5
+        assert feed(limit, 2.0, saturated=True, key="youtube") == 6
+        assert feed(limit, 6.0, saturated=True, key="youtube") == 4
+        assert limit.baselines["instagram"] == pytest.approx(0.1)
+
+    def test_disabled_keeps_initial(self):
+        limit = make_limit(enabled=False)
+        assert feed(limit, None, count=10, ok=False) == 4
+        assert limit.baselines == {}
+
+
+class TestSlot:
+    def test_blocks_over_limit(self):
+        limit = make_limit(initial=2)
+        running, peak = 0, 0
+        lock = threading.Lock()
+
+        def work():
+            nonlocal running, peak
+            with limit.slot():
+                with lock:
+                    running += 1
+                    peak = max(peak, running)
+                time.sleep(0.01)
+                with lock:
+                    running -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak == 2
+        assert limit.inflight == 0
+
+    def test_saturation_from_own_slots(self):
+        limit = make_limit(initial=1, window=1)
+        with limit.slot():
+            limit.update(1.0)
+        assert limit.limit == 2
+
+    def test_task_failure_is_not_overload(self):
+        limit = make_limit(initial=4, window=1)
+        with pytest.raises(RuntimeError):
+            with limit.slot():
+                raise RuntimeError("ffmpeg failed")
+        assert limit.limit == 4
+        assert limit.inflight == 0
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            MemoryError(),
+            OSError(errno.ENOSPC, "No space left on device"),
+            subprocess.TimeoutExpired("ffmpeg", 60),
+        ],
+    )
+    def test_overload_counts_as_error(self, error):
+        limit = make_limit(initial=4, window=1)
+        with pytest.raises(type(error)):
+            with limit.slot():
+                raise error
+        assert limit.limit == 3
+        assert limit.inflight == 0
+
+
+class TestTokenBucket:
+    def test_burst_then_paced(self):
+        with patch("providers.limits.time.monotonic", return_value=0.0):
+            bucket = TokenBucket(rate_per_min=60, burst=2)
+            assert bucket.reserve() == 0
+            assert bucket.reserve() == 0
+            # Дальше — в долг, по секунде на токен, в порядке очереди
+            assert bucket.reserve() == pytest.approx(1.0)
+            assert bucket.reserve() == pytest.approx(2.0)
+
+    def test_refills_over_time(self):
+        with patch("providers.limits.time.monotonic") as monotonic:
+            monotonic.return_value = 0.0
+            bucket = TokenBucket(rate_per_min=60, burst=1)
+            bucket.reserve()
+            monotonic.return_value = 10.0
+            assert bucket.reserve() == 0
+
+    def test_acquire_sleeps(self):
+        bucket = TokenBucket(rate_per_min=60, burst=1)
+        with patch("providers.limits.time.sleep") as sleep:
+            bucket.acquire()
+            waited = bucket.acquire()
+        sleep.assert_called_once()
+        assert 0 < waited <= 1.0
+
+
+class TestRateLimiters:
+    def test_bucket_per_platform_and_identity(self):
+        limiters = RateLimiters()
+        with patch("providers.limits.time.sleep") as sleep:
+            limiters.acquire("instagram", "direct", 60, 1)
+            limiters.acquire("instagram", "proxy-a", 60, 1)
+            limiters.acquire("tiktok", "direct", 60, 1)
+            sleep.assert_not_called()
+            assert limiters.acquire("instagram", "direct", 60, 1) > 0
+
+    def test_zero_rate_disables(self):
+        limiters = RateLimiters()
+        for _ in range(5):
+            assert limiters.acquire("instagram", "direct", 0, 1) == 0
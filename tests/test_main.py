@@ -0,0 +1,369 @@
+import asyncio
+import importlib
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from telegram import Chat, Message, MessageEntity, Update, User
+from telegram.ext import ExtBot
+
+from handlers.admission import AdmissionController, Decision
+from handlers.batch import extract_links
+from handlers.downloader import DownloadJob
+from handlers.scheduler import PRIVATE, FairScheduler
+from localization.utils import t
+from monitoring.metrics import READY
+from monitoring.stages import current_stages, record
+from providers.limits import AdaptiveLimit
+
+
+@pytest.fixture
+def main(monkeypatch):
+    monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "123:test")
+    module = importlib.import_module("main")
+    # Один воркер на каждую фазу и кредит на одну задачу за ход — порядок
+    # запуска задач однозначен
+    limits = dict(workers=1, user_limit=10, chat_limit=10, weights={PRIVATE: 1})
+    probe_scheduler = FairScheduler(**limits)
+    scheduler = FairScheduler(**limits)
+    monkeypatch.setattr(module, "probe_scheduler", probe_scheduler)
+    monkeypatch.setattr(module, "scheduler", scheduler)
+    monkeypatch.setattr(
+        module, "admission", AdmissionController(probe_scheduler, scheduler)
+    )
+    monkeypatch.setattr(
+        module, "download_limit", AdaptiveLimit("test", initial=1, enabled=False)
+    )
+    monkeypatch.setattr(module, "stats_collector", MagicMock())
+    return module
+
+
+@asynccontextmanager
+async def running(main):
+    """Приложение с тем же разбором очереди апдейтов, что и при polling"""
+    bot_user = User(id=123, first_name="bot", is_bot=True, username="test_bot")
+    # getMe при инициализации отвечает без сети
+    with patch.object(ExtBot, "_post", AsyncMock(return_value=bot_user.to_dict())):
+        application = main.build_application()
+        await application.initialize()
+        await application.start()
+        try:
+            yield application
+        finally:
+            await application.stop()
+            await application.shutdown()
+
+
+@pytest.fixture
+def replies():
+    """Ответы бота по чатам; сеть Telegram не нужна"""
+    sent = {}
+
+    async def reply_text(message, text, **kwargs):
+        chat = sent.setdefault(message.chat.id, [])
+        chat.append(text)
+        # Правки служебного сообщения попадают в ту же ленту ответов
+        edit_text = AsyncMock(side_effect=lambda text, **kwargs: chat.append(text))
+        return MagicMock(edit_text=edit_text, delete=AsyncMock())
+
+    async def reply_video(message, **kwargs):
+        sent.setdefault(message.chat.id, []).append("video")
+
+    async def reply_media_group(message, media, **kwargs):
+        sent.setdefault(message.chat.id, []).extend("video" for _ in media)
+
+    with patch.object(Message, "reply_text", reply_text), patch.object(
+        Message, "reply_video", reply_video
+    ), patch.object(Message, "reply_media_group", reply_media_group), patch.object(
+        Message, "delete", AsyncMock()
+    ):
+        yield sent
+
+
+def make_update(update_id, user_id, *urls):
+    text = " ".join(urls)
+    entities, offset = [], 0
+    for url in urls:
+        offset = text.index(url, offset)
+        entities.append(MessageEntity(MessageEntity.URL, offset, len(url)))
+        offset += len(url)
+    user = User(id=user_id, first_name=f"user{user_id}", is_bot=False)
+    message = Message(
+        message_id=update_id,
+        date=datetime.now(timezone.utc),
+        chat=Chat(id=user_id, type=Chat.PRIVATE),
+        from_user=user,
+        text=text,
+        entities=entities,
+    )
+    return Update(update_id=update_id, message=message)
+
+
+async def wait_for_updates(application):
+    """Ждёт, пока апдейты разобраны и обработчики завершились"""
+    while not application.update_queue.empty():
+        await asyncio.sleep(0.01)
+    while application.update_processor.current_concurrent_updates:
+        await asyncio.sleep(0.01)
+
+
+class TestConcurrentUpdates:
+    def test_updates_are_processed_concurrently(self, main):
+        application = main.build_application()
+        assert application.update_processor.max_concurrent_updates > 1
+
+    @pytest.mark.asyncio
+    async def test_users_interleave_in_scheduler(self, main, replies):
+        started = []
+
+        def probe(url, routed=None):
+            started.append(url)
+            # Первая ссылка держит воркер, пока оба сообщения не встанут в очередь
+            deadline = time.monotonic() + 2
+            while len(started) == 1 and main.probe_scheduler.queued() < 3:
+                if time.monotonic() > deadline:
+                    break
+                time.sleep(0.01)
+            provider, ref = routed
+            return DownloadJob(provider, ref, provider.content_key(ref), {}, 1.0)
+
+        def fetch(job):
+            return b"video", None, job.platform
+
+        async with running(main) as application:
+            with patch.object(
+                main.downloader, "probe", side_effect=probe
+            ), patch.object(main.downloader, "fetch", side_effect=fetch):
+                await application.update_queue.put(
+                    make_update(
+                        1,
+                        1,
+                        "https://www.instagram.com/p/A1/",
+                        "https://www.instagram.com/p/A2/",
+                        "https://www.instagram.com/p/A3/",
+                    )
+                )
+                await application.update_queue.put(
+                    make_update(2, 2, "https://www.instagram.com/p/B1/")
+                )
+                await wait_for_updates(application)
+
+        # Второй пользователь не ждёт, пока обработается всё сообщение первого:
+        # очередь чередует их ссылки
+        assert len(started) == 4
+        assert started.index("https://www.instagram.com/p/B1/") < started.index(
+            "https://www.instagram.com/p/A3/"
+        )
+        assert replies[1].count("video") == 3
+        assert replies[2].count("video") == 1
+
+
+class TestAdmission:
+    async def second_user_reply(self, main, replies):
+        """
+        Первый пользователь занимает воркер извлечения; возвращает, что бот
+        ответил второму, пока тот ждёт
+        """
+        answered = threading.Event()
+
+        def probe(url, routed=None):
+            if url.endswith("/A1/"):
+                answered.wait(2)
+            provider, ref = routed
+            return DownloadJob(provider, ref, provider.content_key(ref), {}, 1.0)
+
+        def fetch(job):
+            return b"video", None, job.platform
+
+        async with running(main) as application:
+            with patch.object(
+                main.downloader, "probe", side_effect=probe
+            ), patch.object(main.downloader, "fetch", side_effect=fetch):
+                await application.update_queue.put(
+                    make_update(1, 1, "https://www.instagram.com/p/A1/")
+                )
+                while main.probe_scheduler.running < 1:
+                    await asyncio.sleep(0.01)
+                await application.update_queue.put(
+                    make_update(2, 2, "https://www.instagram.com/p/B1/")
+                )
+                while 2 not in replies:
+                    await asyncio.sleep(0.01)
+                answered.set()
+                await wait_for_updates(application)
+        return replies[2][0]
+
+    @pytest.mark.asyncio
+    async def test_second_update_told_queue_position(self, main, replies):
+        user = make_update(2, 2).message.from_user
+        # Впереди — выполняющееся извлечение первого пользователя
+        expected = t("queue_position", user=user, position=1, minutes=1)
+        assert await self.second_user_reply(main, replies) == expected
+
+    @pytest.mark.asyncio
+    async def test_second_update_shed_and_reported(self, main, replies, monkeypatch):
+        monkeypatch.setattr(
+            main,
+            "admission",
+            AdmissionController(main.probe_scheduler, main.scheduler, max_wait=1),
+        )
+        user = make_update(2, 2).message.from_user
+        reply = await self.second_user_reply(main, replies)
+
+        assert reply == t("error_overloaded", user=user, minutes=1)
+        assert replies[2] == [reply]
+        # Счётчики не пропадают, даже если новых отказов больше не будет
+        await main.post_shutdown(None)
+        main.stats_collector.track_requests_shed.assert_called_once_with(
+            {PRIVATE: 1}, main.admission.probe_cost / 2
+        )
+
+    @pytest.mark.asyncio
+    async def test_shed_before_resolving_short_links(self, main, replies, monkeypatch):
+        decision = Decision(False, 600.0, 5)
+        monkeypatch.setattr(main.admission, "admit", MagicMock(return_value=decision))
+        update = make_update(1, 1, "https://vm.tiktok.com/ZMabc/")
+        with patch("handlers.downloader.short_links") as resolver:
+            await main.handle_message(update, None)
+
+        # Отказ не стоит ни одного запроса к платформе
+        resolver.resolve.assert_not_called()
+        user = update.message.from_user
+        assert replies[1] == [t("error_overloaded", user=user, minutes=10)]
+
+
+class TestFailures:
+    @pytest.mark.asyncio
+    async def test_failed_links_reported_next_to_sent_ones(self, main, replies):
+        def probe(url, routed=None):
+            provider, ref = routed
+            return DownloadJob(provider, ref, provider.content_key(ref), {}, 1.0)
+
+        def fetch(job):
+            if job.ref[1] == "A2":
+                return None, None, job.platform
+            return b"video", None, job.platform
+
+        update = make_update(
+            1, 1, "https://www.instagram.com/p/A1/", "https://www.instagram.com/p/A2/"
+        )
+        with patch.object(main.downloader, "probe", side_effect=probe), patch.object(
+            main.downloader, "fetch", side_effect=fetch
+        ):
+            await main.handle_message(update, None)
+
+        user = update.message.from_user
+        assert "video" in replies[1]
+        assert replies[1][-1] == (
+            "https://www.instagram.com/p/A2/\n" + t("error_video_not_found", user=user)
+        )
+
+    @pytest.mark.asyncio
+    async def test_single_link_error_without_url(self, main, replies):
+        update = make_update(1, 1, "https://www.instagram.com/p/A1/")
+        with patch.object(main.downloader, "probe", side_effect=asyncio.TimeoutError):
+            await main.handle_message(update, None)
+
+        user = update.message.from_user
+        assert replies[1][-1] == t("error_processing_timeout", user=user)
+
+
+class TestFetchLink:
+    @pytest.mark.asyncio
+    async def test_probe_and_fetch_share_one_deadline(self, main, monkeypatch):
+        monkeypatch.setattr(main, "DOWNLOAD_TIMEOUT", 0.3)
+        link = extract_links(
+            make_update(1, 1, "https://www.instagram.com/p/A1/").message,
+            main.downloader,
+        )[0]
+        provider, ref = link.routed
+
+        def probe(url, routed=None):
+            time.sleep(0.2)
+            return DownloadJob(provider, ref, provider.content_key(ref), {}, 1.0)
+
+        def fetch(job):
+            # Сама по себе укладывается в таймаут, но не в остаток после probe
+            time.sleep(0.2)
+            return b"video", None, job.platform
+
+        with patch.object(main.downloader, "probe", side_effect=probe), patch.object(
+            main.downloader, "fetch", side_effect=fetch
+        ):
+            result = await main.fetch_link(link, 1, 1, True)
+
+        assert result.outcome == "timeout"
+        assert not result.ok
+
+    @pytest.fixture
+    def link(self, main):
+        message = make_update(1, 1, "https://www.instagram.com/p/A1/").message
+        return extract_links(message, main.downloader)[0]
+
+    async def fetch(self, main, link, fetch):
+        provider, ref = link.routed
+        job = DownloadJob(provider, ref, provider.content_key(ref), {}, 1.0)
+        with patch.object(main.downloader, "probe", return_value=job), patch.object(
+            main.downloader, "fetch", side_effect=fetch
+        ), patch.object(main.download_limit, "update") as update:
+            result = await main.fetch_link(link, 1, 1, True)
+        return result, update
+
+    @pytest.mark.asyncio
+    async def test_provider_failure_is_not_overload(self, main, link):
+        result, update = await self.fetch(
+            main, link, lambda job: (None, None, job.platform)
+        )
+        assert result.outcome == "not_found"
+        update.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_timeout_is_overload(self, main, link, monkeypatch):
+        monkeypatch.setattr(main, "DOWNLOAD_TIMEOUT", 0.05)
+        result, update = await self.fetch(main, link, lambda job: time.sleep(0.2))
+        assert result.outcome == "timeout"
+        update.assert_called_once_with(None, ok=False, saturated=True)
+
+    @pytest.mark.asyncio
+    async def test_out_of_memory_is_overload(self, main, link):
+        def fetch(job):
+            raise MemoryError
+
+        result, update = await self.fetch(main, link, fetch)
+        assert result.outcome == "error"
+        update.assert_called_once_with(None, ok=False, saturated=True)
+
+    @pytest.mark.asyncio
+    async def test_latency_reported_per_platform(self, main, link):
+        def fetch(job):
+            current_stages().add_stage("download", 0.0, 4.0)
+            record("downloaded_bytes", 2 * 2**20)
+            return b"video", None, job.platform
+
+        result, update = await self.fetch(main, link, fetch)
+        assert result.ok
+        update.assert_called_once_with(2.0, saturated=True, key="instagram")
+
+
+class TestStartup:
+    @pytest.mark.asyncio
+    async def test_calibrated_before_ready(self, main, monkeypatch):
+        READY.set(0)
+        ready_during_calibration = []
+        monkeypatch.setattr(
+            main,
+            "ensure_calibrated",
+            lambda: ready_during_calibration.append(READY.value()),
+        )
+        monkeypatch.setattr(main, "loop_watchdog", MagicMock())
+        application = MagicMock()
+        # Фоновые задачи здесь не нужны
+        application.create_task.side_effect = lambda coro, **kwargs: coro.close()
+
+        await main.post_init(application)
+
+        assert ready_during_calibration == [0]
+        assert READY.value() == 1
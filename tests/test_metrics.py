@@ -0,0 +1,92 @@
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from monitoring.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    _MetricsHandler,
+    start_metrics_server,
+)
+
+
+class TestMetrics:
+
+    @pytest.fixture
+    def registry(self):
+        return MetricsRegistry()
+
+    def test_counter_render(self, registry):
+        counter = registry.counter("test_total", "Test counter", ("platform",))
+        counter.inc(platform="tiktok")
+        counter.inc(2, platform="tiktok")
+
+        text = registry.render()
+
+        assert "# TYPE test_total counter" in text
+        assert 'test_total{platform="tiktok"} 3' in text
+
+    def test_counter_rejects_negative(self):
+        counter = Counter("neg_total", "Negative")
+
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+
+    def test_labels_must_match(self):
+        counter = Counter("labels_total", "Labels", ("platform",))
+
+        with pytest.raises(ValueError):
+            counter.inc(reason="x")
+
+    def test_gauge_inc_dec(self):
+        gauge = Gauge("inflight", "In flight")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        assert gauge.value() == 1
+        assert "inflight 1" in gauge.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        hist = Histogram("stage_seconds", "Stages", ("stage",), buckets=(1, 5))
+        hist.observe(0.5, stage="download")
+        hist.observe(3, stage="download")
+        hist.observe(10, stage="download")
+
+        text = hist.render()
+
+        assert 'stage_seconds_bucket{stage="download",le="1"} 1' in text
+        assert 'stage_seconds_bucket{stage="download",le="5"} 2' in text
+        assert 'stage_seconds_bucket{stage="download",le="+Inf"} 3' in text
+        assert 'stage_seconds_count{stage="download"} 3' in text
+        assert 'stage_seconds_sum{stage="download"} 13.5' in text
+
+    def test_duplicate_registration(self, registry):
+        registry.counter("dup_total", "Dup")
+
+        with pytest.raises(ValueError):
+            registry.counter("dup_total", "Dup")
+
+    def test_server_disabled_without_port(self, monkeypatch):
+        monkeypatch.delenv("METRICS_PORT", raising=False)
+
+        assert start_metrics_server() is None
+
+    def test_server_http_endpoint(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(
+                f"http://127.0.0.1:{port}/metrics", timeout=5
+            ) as resp:  # nosec B310 - локальный адрес в тесте
+                body = resp.read().decode()
+            assert "shortly_inflight_jobs" in body
+        finally:
+            server.shutdown()
+            server.server_close()
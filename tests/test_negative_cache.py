@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from handlers.negative_cache import DEFAULT_TTLS, NegativeCache
+from providers.errors import LOGIN_REQUIRED, PRIVATE, REMOVED
+
+
+class TestNegativeCache:
+    def test_remembers_reason(self):
+        cache = NegativeCache()
+        assert cache.add("tiktok:video:1", REMOVED)
+        assert cache.get("tiktok:video:1") == REMOVED
+
+    def test_unknown_key(self):
+        assert NegativeCache().get("tiktok:video:1") is None
+
+    def test_per_class_ttl(self):
+        cache = NegativeCache()
+        with patch("handlers.negative_cache.time.monotonic", return_value=0.0):
+            cache.add("a", LOGIN_REQUIRED)
+            cache.add("b", REMOVED)
+        later = DEFAULT_TTLS[LOGIN_REQUIRED] + 1
+        with patch("handlers.negative_cache.time.monotonic", return_value=later):
+            assert cache.get("a") is None
+            assert cache.get("b") == REMOVED
+        assert len(cache) == 1
+
+    def test_env_override(self, monkeypatch):
+        monkeypatch.setenv("NEGATIVE_CACHE_TTL_PRIVATE_S", "5")
+        assert NegativeCache().ttls[PRIVATE] == 5
+
+    def test_reason_without_ttl_is_not_cached(self):
+        cache = NegativeCache(ttls={PRIVATE: 0})
+        assert not cache.add("a", PRIVATE)
+        assert not cache.add("b", "something_else")
+        assert len(cache) == 0
+
+    def test_bounded_size(self):
+        cache = NegativeCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.add(key, REMOVED)
+        assert cache.get("a") is None
+        assert cache.get("c") == REMOVED
+
+    def test_discard(self):
+        cache = NegativeCache()
+        cache.add("a", REMOVED)
+        cache.discard("a")
+        assert cache.get("a") is None
+
+    def test_counts_lookups(self):
+        cache = NegativeCache()
+        cache.add("a", REMOVED)
+        with patch("handlers.negative_cache.CACHE_LOOKUPS") as lookups:
+            cache.get("a")
+            cache.get("b")
+        results = [c.kwargs["result"] for c in lookups.inc.call_args_list]
+        assert results == ["hit", "miss"]
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from monitoring import profiler as profiler_module
+from monitoring.profiler import ProfilerSession, profiled, summarize
+
+
+def _hot_path(n):
+    return sum(i * i for i in range(n))
+
+
+class TestProfilerSession:
+
+    @pytest.fixture
+    def session(self, tmp_path, monkeypatch):
+        session = ProfilerSession(output_dir=str(tmp_path), top=5)
+        monkeypatch.setattr(profiler_module, "profiler", session)
+        return session
+
+    def test_start_stop_writes_report(self, session, tmp_path):
+        assert session.start() is True
+        assert session.start() is False  # вторая сессия не запускается
+        _hot_path(10_000)
+        data = [bytearray(1024) for _ in range(100)]
+
+        report = session.stop()
+
+        assert data
+        assert "Top functions by cumulative time" in report
+        assert "Top allocation sites" in report
+        assert list(tmp_path.glob("profile-*.pstats"))
+        assert list(tmp_path.glob("profile-*.txt"))
+        assert session.active is False
+
+    def test_stop_without_start(self, session):
+        assert session.stop() is None
+
+    def test_profiled_worker_thread_is_in_report(self, session):
+        wrapped = profiled(_hot_path)
+        results = []
+        session.start(memory=False)
+
+        thread = threading.Thread(target=lambda: results.append(wrapped(10_000)))
+        thread.start()
+        thread.join()
+
+        report = session.stop()
+        assert results == [_hot_path(10_000)]
+        assert "_hot_path" in report
+
+    def test_profiled_when_another_profiler_is_active(self, session, monkeypatch):
+        class BusyProfile(profiler_module.cProfile.Profile):
+            def enable(self, *args, **kwargs):
+                raise ValueError("Another profiling tool is already active")
+
+        monkeypatch.setattr(profiler_module, "SESSION_COVERS_THREADS", False)
+        monkeypatch.setattr(profiler_module.cProfile, "Profile", BusyProfile)
+        wrapped = profiled(_hot_path)
+        session._active = True
+        results = []
+
+        thread = threading.Thread(target=lambda: results.append(wrapped(10)))
+        thread.start()
+        thread.join()
+        session._active = False
+
+        assert results == [285]
+        assert session._thread_profiles == []
+
+    def test_profiled_passthrough_when_inactive(self, session):
+        wrapped = profiled(_hot_path)
+
+        assert wrapped(10) == 285
+        assert session._thread_profiles == []
+
+    @pytest.mark.asyncio
+    async def test_run_for(self, session):
+        report = await session.run_for(0.01, memory=False)
+
+        assert report is not None
+        assert session.active is False
+
+    def test_summarize(self):
+        report = "line1\n\n" + "\n".join(f"row{i}" for i in range(50))
+
+        summary = summarize(report, lines=5)
+
+        assert summary.splitlines() == ["line1", "row0", "row1", "row2", "row3"]
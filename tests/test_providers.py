@@ -67,6 +67,39 @@ class TestInstagramProvider:
             assert result == expected
 
 
+class TestContentKey:
+    def test_instagram_kinds_share_key(self):
+        provider = InstagramProvider()
+        keys = {
+            provider.content_key(provider.extract_id(url))
+            for url in (
+                "https://www.instagram.com/p/ABC123/",
+                "https://www.instagram.com/reel/ABC123/",
+                "https://www.instagram.com/reels/ABC123/",
+                "https://www.instagram.com/tv/ABC123/",
+            )
+        }
+        assert keys == {"instagram:post:ABC123"}
+
+    def test_youtube_forms_share_key(self):
+        provider = YouTubeProvider()
+        keys = {
+            provider.content_key(provider.extract_id(url))
+            for url in (
+                "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+                "https://youtu.be/dQw4w9WgXcQ",
+                "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+            )
+        }
+        assert keys == {"youtube:watch:dQw4w9WgXcQ"}
+
+    def test_distinct_kinds_keep_distinct_keys(self):
+        provider = InstagramProvider()
+        assert provider.content_key(("story", "1")) != provider.content_key(
+            ("post", "1")
+        )
+
+
 class TestTikTokProvider:
 
     @pytest.fixture
@@ -120,6 +153,8 @@ class TestYouTubeProvider:
         test_cases = [
             ("https://www.youtube.com/shorts/ABC123", ("watch", "ABC123")),
             ("https://youtu.be/ABC123", ("watch", "ABC123")),
+            ("https://www.youtube.com/watch?v=ABC123&t=42", ("watch", "ABC123")),
+            ("https://youtu.be/ABC123?si=share#t=1", ("watch", "ABC123")),
         ]
 
         for url, expected in test_cases:
@@ -175,6 +210,15 @@ class TestFacebookProvider:
         for url in valid_urls:
             assert provider.is_valid_url(url), f"URL should be valid: {url}"
 
+    def test_watch_query_url(self, provider):
+        url = "https://www.facebook.com/watch/?v=123456789"
+        assert provider.extract_id(url) == ("watch", "123456789")
+
+    def test_reel_and_watch_share_content_key(self, provider):
+        assert provider.content_key(("reel", "123")) == provider.content_key(
+            ("watch", "123")
+        )
+
 
 class TestRuTubeProvider:
 
@@ -2,8 +2,10 @@ import json
 from unittest.mock import Mock, patch
 
 import pytest
+from pika.exceptions import AMQPConnectionError
 
-from analytics.rabbitmq_client import AMQPConnectionError, RabbitMQClient
+from analytics.rabbitmq_client import RabbitMQClient, _retryable_errors
+from monitoring.tracing import Tracer
 
 
 class TestRabbitMQClient:
@@ -121,6 +123,39 @@ class TestRabbitMQClient:
 
         conn.close.assert_called_once()
 
+    def test_send_provider_stats_with_stages(self, mock_pika, rabbitmq_client):
+        mp, conn, ch = mock_pika
+
+        rabbitmq_client.send_provider_stats(
+            platform="tiktok",
+            action="download_success",
+            success=True,
+            video_size=1024,
+            processing_time=5.5,
+            stages={"download": {"started_at": 1.0, "duration": 3.0}},
+            downloaded_bytes=2048,
+            encoded_bytes=None,
+            compressed=False,
+            format_id="h264_540p",
+        )
+
+        body = json.loads(ch.basic_publish.call_args.kwargs["body"])
+        assert body["stages"] == {"download": {"started_at": 1.0, "duration": 3.0}}
+        assert body["downloaded_bytes"] == 2048
+        assert body["encoded_bytes"] is None
+        assert body["compressed"] is False
+        assert body["format_id"] == "h264_540p"
+
+    def test_message_carries_correlation_id(self, mock_pika, rabbitmq_client):
+        mp, conn, ch = mock_pika
+        tracer = Tracer(exporter=None, sample_rate=0.0)
+
+        with tracer.start_span("update") as span:
+            rabbitmq_client.send_provider_stats("tiktok", "download_success", True)
+
+        body = json.loads(ch.basic_publish.call_args.kwargs["body"])
+        assert body["correlation_id"] == span.trace_id
+
     def test_send_bot_event_success(self, mock_pika, rabbitmq_client):
         mp, conn, ch = mock_pika
 
@@ -176,3 +211,8 @@ class TestRabbitMQClient:
 
     def test_close_noop(self, rabbitmq_client):
         rabbitmq_client.close()
+
+    def test_retryable_errors_loaded_once(self):
+        errors = _retryable_errors()
+        assert AMQPConnectionError in errors
+        assert _retryable_errors() is errors
@@ -0,0 +1,47 @@
+import pytest
+
+from analytics.stats_collector import StatsCollector
+from handlers.downloader import Downloader
+from providers.registry import (
+    PLATFORMS,
+    PROVIDERS,
+    SUPPORTED_HOSTS,
+    hosts_for,
+    provider_classes,
+)
+
+
+class TestProviderRegistry:
+    @pytest.mark.parametrize("spec", PROVIDERS, ids=lambda spec: spec.platform)
+    def test_spec_matches_provider_class(self, spec):
+        cls = spec.load()
+        assert cls.platform == spec.platform
+        # Домены задаются только в реестре
+        assert cls.HOSTS is spec.hosts
+
+    def test_hosts_for_unknown_platform(self):
+        assert hosts_for("unknown") == ()
+
+    def test_provider_classes_keep_order(self):
+        classes = provider_classes()
+        assert [cls.platform for cls in classes] == [s.platform for s in PROVIDERS]
+
+    def test_supported_hosts(self):
+        assert "youtu.be" in SUPPORTED_HOSTS
+        assert "fb.watch" in SUPPORTED_HOSTS
+
+    def test_known_platforms_come_from_registry(self):
+        assert StatsCollector.KNOWN_PLATFORMS == PLATFORMS
+
+
+class TestLazyDownloader:
+    def test_providers_created_on_first_use(self):
+        downloader = Downloader()
+        assert downloader._downloaders is None
+        assert downloader.get_downloader("https://youtu.be/abc").platform == "youtube"
+        assert len(downloader.downloaders) == len(PROVIDERS)
+
+    def test_downloaders_can_be_replaced(self):
+        downloader = Downloader()
+        downloader.downloaders = []
+        assert downloader.get_downloader("https://youtu.be/abc") is None
@@ -0,0 +1,89 @@
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from providers.resolver import ShortLinkResolver
+
+
+def redirecting_transport(calls):
+    def handler(request):
+        calls.append(str(request.url))
+        if request.url.host == "vm.tiktok.com":
+            return httpx.Response(
+                301,
+                headers={"Location": "https://www.tiktok.com/@user/video/123?_r=1"},
+            )
+        if request.url.host == "broken.example":
+            raise httpx.ConnectError("boom", request=request)
+        return httpx.Response(200, text="ok")
+
+    return httpx.MockTransport(handler)
+
+
+class TestShortLinkResolver:
+
+    @pytest.fixture
+    def calls(self):
+        return []
+
+    @pytest.fixture
+    def resolver(self, calls):
+        client = httpx.Client(
+            transport=redirecting_transport(calls), follow_redirects=True
+        )
+        resolver = ShortLinkResolver(ttl=60, client=client)
+        yield resolver
+        resolver.close()
+
+    def test_follows_redirects(self, resolver):
+        target = resolver.resolve("https://vm.tiktok.com/ZMabc/")
+        assert target == "https://www.tiktok.com/@user/video/123?_r=1"
+
+    def test_caches_mapping(self, resolver, calls):
+        resolver.resolve("https://vm.tiktok.com/ZMabc/")
+        resolver.resolve("https://vm.tiktok.com/ZMabc/")
+
+        assert calls.count("https://vm.tiktok.com/ZMabc/") == 1
+
+    def test_expired_entry_is_refetched(self, resolver, calls):
+        with patch("providers.resolver.time.monotonic", return_value=1000.0):
+            resolver.resolve("https://vm.tiktok.com/ZMabc/")
+        with patch("providers.resolver.time.monotonic", return_value=1061.0):
+            assert resolver.cached("https://vm.tiktok.com/ZMabc/") is None
+            resolver.resolve("https://vm.tiktok.com/ZMabc/")
+
+        assert calls.count("https://vm.tiktok.com/ZMabc/") == 2
+
+    def test_network_error_returns_none_and_is_not_cached(self, resolver):
+        assert resolver.resolve("https://broken.example/x") is None
+        assert resolver.cached("https://broken.example/x") is None
+
+    def test_evicts_least_recently_used(self, calls):
+        client = httpx.Client(transport=redirecting_transport(calls))
+        resolver = ShortLinkResolver(ttl=60, max_entries=2, client=client)
+
+        resolver.resolve("https://a.example/1")
+        resolver.resolve("https://a.example/2")
+        resolver.cached("https://a.example/1")
+        resolver.resolve("https://a.example/3")
+
+        assert resolver.cached("https://a.example/1") is not None
+        assert resolver.cached("https://a.example/2") is None
+
+    def test_counts_cache_lookups(self, resolver):
+        with patch("providers.resolver.CACHE_LOOKUPS") as lookups:
+            resolver.resolve("https://vm.tiktok.com/ZMabc/")
+            resolver.resolve("https://vm.tiktok.com/ZMabc/")
+
+        results = [c.kwargs["result"] for c in lookups.inc.call_args_list]
+        assert results == ["miss", "hit"]
+
+    def test_default_client_is_pooled(self):
+        resolver = ShortLinkResolver()
+        client = resolver._get_client()
+        try:
+            assert client is resolver._get_client()
+            assert client.follow_redirects
+        finally:
+            resolver.close()
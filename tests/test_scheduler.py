@@ -0,0 +1,214 @@
+import asyncio
+
+import pytest
+
+from handlers.scheduler import GROUP, PRIVATE, FairScheduler
+from monitoring.metrics import QUEUE_WAIT_SECONDS
+
+
+def make_scheduler(**kwargs):
+    kwargs.setdefault("workers", 1)
+    kwargs.setdefault("user_limit", 10)
+    kwargs.setdefault("chat_limit", 10)
+    kwargs.setdefault("weights", {PRIVATE: 1, GROUP: 1})
+    kwargs.setdefault("aging", 0)
+    return FairScheduler(**kwargs)
+
+
+async def run_jobs(scheduler, jobs, hold=0.005):
+    """jobs: [(name, user_id, chat_id, private[, cost])] → порядок запуска"""
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        async with scheduler.slot(0, 0, True):
+            await release.wait()
+
+    async def job(name, user_id, chat_id, private, cost=1.0):
+        async with scheduler.slot(user_id, chat_id, private, cost=cost):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    # Пока воркеры заняты, все задачи успевают встать в очередь по порядку
+    blocking = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    tasks = []
+    for spec in jobs:
+        tasks.append(asyncio.create_task(job(*spec)))
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(blocking, *tasks)
+    return order
+
+
+class TestFairScheduler:
+    @pytest.mark.asyncio
+    async def test_flows_served_round_robin(self):
+        scheduler = make_scheduler()
+        jobs = [(f"a{i}", 1, 1, True) for i in range(4)] + [
+            (f"b{i}", 2, 2, True) for i in range(2)
+        ]
+        order = await run_jobs(scheduler, jobs)
+        assert order == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+    @pytest.mark.asyncio
+    async def test_weights(self):
+        scheduler = make_scheduler(weights={PRIVATE: 2, GROUP: 1})
+        jobs = [(f"g{i}", 10 + i, -100, False) for i in range(4)] + [
+            (f"p{i}", 1, 1, True) for i in range(4)
+        ]
+        order = await run_jobs(scheduler, jobs)
+        assert order == ["g0", "p0", "p1", "g1", "p2", "p3", "g2", "g3"]
+
+    @pytest.mark.asyncio
+    async def test_worker_limit(self):
+        scheduler = make_scheduler(workers=2)
+        running, peak = 0, 0
+
+        async def job(user_id):
+            nonlocal running, peak
+            async with scheduler.slot(user_id, user_id, True):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(job(i) for i in range(6)))
+        assert peak == 2
+        assert scheduler.running == 0
+        assert scheduler._flows == {}
+
+    @pytest.mark.asyncio
+    async def test_user_limit_across_chats(self):
+        scheduler = make_scheduler(workers=10, user_limit=1)
+        running, peak = 0, 0
+
+        async def job(chat_id, private):
+            nonlocal running, peak
+            async with scheduler.slot(7, chat_id, private):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(job(7, True), job(-1, False), job(-2, False))
+        assert peak == 1
+
+    @pytest.mark.asyncio
+    async def test_capped_user_does_not_block_group(self):
+        scheduler = make_scheduler(workers=2, user_limit=1)
+        jobs = [("u1-a", 1, -5, False), ("u1-b", 1, -5, False), ("u2", 2, -5, False)]
+        order = await run_jobs(scheduler, jobs, hold=0.01)
+        assert order.index("u2") < order.index("u1-b")
+
+    @pytest.mark.asyncio
+    async def test_chat_limit(self):
+        scheduler = make_scheduler(workers=10, chat_limit=2)
+        running, peak = 0, 0
+
+        async def job(user_id):
+            nonlocal running, peak
+            async with scheduler.slot(user_id, -1, False):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(job(i) for i in range(5)))
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        scheduler = make_scheduler()
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot(1, 1, True):
+                await release.wait()
+
+        async def waiter():
+            async with scheduler.slot(2, 2, True):
+                pass
+
+        holding = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        assert scheduler.queued() == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert scheduler.queued() == 0
+
+        release.set()
+        await holding
+        assert scheduler.running == 0
+        assert scheduler._flows == {}
+
+    @pytest.mark.asyncio
+    async def test_wait_time_recorded_per_kind(self):
+        scheduler = make_scheduler()
+        before = QUEUE_WAIT_SECONDS.count(kind=GROUP)
+        async with scheduler.slot(1, -1, False) as waited:
+            assert waited >= 0
+        assert QUEUE_WAIT_SECONDS.count(kind=GROUP) == before + 1
+
+    @pytest.mark.asyncio
+    async def test_resize_starts_waiting_jobs(self):
+        scheduler = make_scheduler()
+        release = asyncio.Event()
+
+        async def job(user_id):
+            async with scheduler.slot(user_id, user_id, True):
+                await release.wait()
+
+        tasks = [asyncio.create_task(job(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        assert scheduler.running == 1
+        scheduler.resize(3)
+        assert scheduler.running == 3
+        release.set()
+        await asyncio.gather(*tasks)
+
+
+class TestShortestJobFirst:
+    @pytest.mark.asyncio
+    async def test_cheap_job_first_within_flow(self):
+        scheduler = make_scheduler()
+        jobs = [("long", 1, -1, False, 60.0), ("short", 2, -1, False, 2.0)]
+        assert await run_jobs(scheduler, jobs) == ["short", "long"]
+
+    @pytest.mark.asyncio
+    async def test_expensive_flow_yields_to_cheap_flows(self):
+        scheduler = make_scheduler(quantum=10)
+        jobs = [("encode", 1, 1, True, 60.0)] + [
+            (f"clip{i}", 2, 2, True, 3.0) for i in range(3)
+        ]
+        order = await run_jobs(scheduler, jobs)
+        assert order[-1] == "encode"
+
+    @pytest.mark.asyncio
+    async def test_aging_prevents_starvation(self):
+        scheduler = make_scheduler(aging=1000)
+        release = asyncio.Event()
+        order = []
+
+        async def blocker():
+            async with scheduler.slot(0, 0, True):
+                await release.wait()
+
+        async def job(name, cost):
+            async with scheduler.slot(1, -1, False, cost=cost):
+                order.append(name)
+
+        blocking = asyncio.create_task(blocker())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(job("long", 60.0))
+        # За 0.1 с ожидания долгая задача «дешевеет» на 100
+        await asyncio.sleep(0.1)
+        fresh = asyncio.create_task(job("short", 2.0))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(blocking, waiting, fresh)
+        assert order == ["long", "short"]
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from monitoring.slowlog import SlowRequestLog
+from monitoring.stages import collect_stages
+
+
+class TestSlowRequestLog:
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return tmp_path / "slow" / "requests.jsonl"
+
+    @pytest.fixture
+    def slow_log(self, path):
+        return SlowRequestLog(path=str(path), threshold=10.0)
+
+    def _stages(self):
+        with collect_stages() as stages:
+            stages.add_stage("extract", stages.started, 2.0)
+            stages.add_stage("encode", stages.started + 5, 30.0)
+            stages.set("content_key", "youtube:watch:abc")
+            stages.set("format_id", "137+140")
+            stages.set("retries", 2)
+            stages.set("downloaded_bytes", 80_000_000)
+            stages.set("encoded_bytes", 50_000_000)
+            stages.set("encode_profile", {"preset": "medium", "passes": 2})
+            stages.set("outcome", "success")
+        return stages
+
+    def test_fast_request_not_recorded(self, slow_log, path):
+        assert slow_log.maybe_record(3.0, "youtube", self._stages()) is False
+        assert not path.exists()
+
+    def test_slow_request_recorded(self, slow_log, path):
+        assert slow_log.maybe_record(42.0, "youtube", self._stages()) is True
+
+        entry = json.loads(path.read_text().splitlines()[0])
+        assert entry["total_time"] == 42.0
+        assert entry["platform"] == "youtube"
+        assert entry["content_key"] == "youtube:watch:abc"
+        assert entry["format_id"] == "137+140"
+        assert entry["retries"] == 2
+        assert entry["downloaded_bytes"] == 80_000_000
+        assert entry["encoded_bytes"] == 50_000_000
+        assert entry["encode_profile"]["preset"] == "medium"
+        assert entry["outcome"] == "success"
+        assert entry["stages"]["encode"]["duration"] == 30.0
+
+    def test_disabled_with_zero_threshold(self, path):
+        slow_log = SlowRequestLog(path=str(path), threshold=0)
+
+        assert slow_log.maybe_record(500.0, "tiktok", self._stages()) is False
+
+    def test_rotation(self, path):
+        slow_log = SlowRequestLog(
+            path=str(path), threshold=1.0, max_bytes=200, backup_count=2
+        )
+
+        for _ in range(5):
+            slow_log.maybe_record(5.0, "tiktok", self._stages())
+
+        assert path.exists()
+        assert path.with_name(path.name + ".1").exists()
@@ -0,0 +1,49 @@
+from monitoring.metrics import STAGE_SECONDS
+from monitoring.stages import collect_stages, current_stages, record, track_stage
+
+
+class TestRequestStages:
+
+    def test_no_current_stages_outside_request(self):
+        assert current_stages() is None
+        # Запись вне запроса не должна падать
+        record("downloaded_bytes", 10)
+
+    def test_collect_stages_records_details(self):
+        with collect_stages() as stages:
+            assert current_stages() is stages
+            record("downloaded_bytes", 2048)
+            record("compressed", False)
+
+        assert current_stages() is None
+        data = stages.as_dict()
+        assert data["downloaded_bytes"] == 2048
+        assert data["compressed"] is False
+        assert data["stages"] == {}
+
+    def test_track_stage_adds_stage_and_metric(self):
+        before = STAGE_SECONDS.count(stage="extract", platform="unit")
+
+        with collect_stages() as stages:
+            with track_stage("extract", "unit") as timer:
+                pass
+
+        assert timer.elapsed >= 0
+        assert STAGE_SECONDS.count(stage="extract", platform="unit") == before + 1
+        assert "extract" in stages.stages
+        assert stages.stages["extract"]["started_at"] >= 0
+        assert stages.duration("extract") is not None
+
+    def test_repeated_stage_accumulates(self):
+        with collect_stages() as stages:
+            stages.add_stage("download", stages.started, 1.0)
+            stages.add_stage("download", stages.started + 2, 0.5)
+
+        assert stages.duration("download") == 1.5
+        assert stages.stages["download"]["started_at"] == 0
+
+    def test_track_stage_without_request(self):
+        with track_stage("upload", "") as timer:
+            pass
+
+        assert timer.platform == "unknown"
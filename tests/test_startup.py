@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+import threading
+from unittest.mock import patch
+
+from monitoring.startup import (
+    LazyModule,
+    import_report,
+    lazy_import,
+    parse_importtime,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     _json
+import time:      2000 |       2100 |   json.decoder
+import time:       500 |       2600 | json
+import time:      3000 |       3000 | colorsys
+some unrelated stderr line
+"""
+
+
+class TestLazyModule:
+    def test_loads_on_first_attribute_access(self):
+        module = LazyModule("colorsys")
+        assert not module.loaded
+        assert module.rgb_to_hsv(0, 0, 0) == (0.0, 0.0, 0.0)
+        assert module.loaded
+
+    def test_lazy_import_returns_loaded_module(self):
+        assert lazy_import("json") is sys.modules["json"]
+
+    def test_concurrent_first_access_imports_once(self):
+        module = LazyModule("colorsys")
+        real = __import__("colorsys")
+        with patch(
+            "monitoring.startup.importlib.import_module", return_value=real
+        ) as import_module:
+            threads = [
+                threading.Thread(target=lambda: module.hls_to_rgb) for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        import_module.assert_called_once_with("colorsys")
+
+    def test_attribute_can_be_patched(self):
+        module = LazyModule("colorsys")
+        with patch.object(module, "rgb_to_hsv", return_value="patched"):
+            assert module.rgb_to_hsv(1, 1, 1) == "patched"
+        assert module.rgb_to_hsv(0, 0, 0) == (0.0, 0.0, 0.0)
+
+
+class TestImportReport:
+    def test_parse_importtime(self):
+        entries = parse_importtime(IMPORTTIME)
+        assert [e.module for e in entries] == [
+            "_json",
+            "json.decoder",
+            "json",
+            "colorsys",
+        ]
+        assert entries[1].self_us == 2000
+        assert entries[1].cumulative_us == 2100
+        assert entries[1].depth == 1
+
+    def test_report_groups_by_package(self):
+        report = import_report(parse_importtime(IMPORTTIME), top=2)
+        assert report["total_ms"] == 5.6
+        assert report["modules"] == 4
+        assert report["packages_ms"] == {"colorsys": 3.0, "json": 2.5}
+        assert list(report["slowest_ms"]) == ["colorsys", "json.decoder"]
+
+
+class TestColdStart:
+    def test_heavy_dependencies_are_not_imported_at_startup(self):
+        probe = (
+            "import sys, main; "
+            "print([m for m in ('yt_dlp.YoutubeDL', 'pika.connection', "
+            "'providers.youtube') if m in sys.modules])"
+        )
+        env = dict(os.environ, TELEGRAM_BOT_TOKEN="0:test", METRICS_PORT="0")
+        result = subprocess.run(
+            [sys.executable, "-c", probe],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        assert result.stdout.strip() == "[]"
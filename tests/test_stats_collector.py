@@ -79,6 +79,28 @@ class TestStatsCollector:
         assert provider_stats_call[1]["video_size"] == video_size
         assert provider_stats_call[1]["processing_time"] == processing_time
 
+    def test_track_download_success_with_breakdown(
+        self, stats_collector, mock_rabbitmq_client
+    ):
+        breakdown = {
+            "stages": {"extract": {"started_at": 0.0, "duration": 1.5}},
+            "downloaded_bytes": 60_000_000,
+            "encoded_bytes": 50_000_000,
+            "compressed": True,
+            "format_id": "137+140",
+        }
+
+        stats_collector.track_download_success(
+            12345, "test_user", "youtube", 50_000_000, 12.0, breakdown=breakdown
+        )
+
+        kwargs = mock_rabbitmq_client.send_provider_stats.call_args[1]
+        assert kwargs["stages"] == breakdown["stages"]
+        assert kwargs["downloaded_bytes"] == 60_000_000
+        assert kwargs["encoded_bytes"] == 50_000_000
+        assert kwargs["compressed"] is True
+        assert kwargs["format_id"] == "137+140"
+
     def test_track_download_failure(self, stats_collector, mock_rabbitmq_client):
         user_id = 12345
         username = "test_user"
@@ -0,0 +1,108 @@
+import json
+import logging
+from unittest.mock import Mock
+
+import pytest
+
+from monitoring.tracing import (
+    CorrelationIdFilter,
+    FileSpanExporter,
+    OTLPHttpExporter,
+    Tracer,
+    current_correlation_id,
+    current_span,
+)
+
+
+class TestTracer:
+
+    @pytest.fixture
+    def exporter(self):
+        return Mock()
+
+    @pytest.fixture
+    def tracer(self, exporter):
+        return Tracer(exporter=exporter, sample_rate=1.0)
+
+    def test_child_spans_share_trace(self, tracer, exporter):
+        with tracer.start_span("update") as root:
+            with tracer.start_span("download", platform="tiktok") as child:
+                assert current_span() is child
+                assert current_correlation_id() == root.trace_id
+            assert current_span() is root
+
+        assert current_span() is None
+        assert child.trace_id == root.trace_id
+        assert child.parent_id == root.span_id
+
+        exporter.export.assert_called_once()
+        spans = exporter.export.call_args[0][0]
+        assert [s.name for s in spans] == ["download", "update"]
+
+    def test_error_is_recorded(self, tracer, exporter):
+        with pytest.raises(RuntimeError):
+            with tracer.start_span("update"):
+                raise RuntimeError("boom")
+
+        spans = exporter.export.call_args[0][0]
+        assert spans[0].error == "RuntimeError: boom"
+
+    def test_unsampled_trace_not_exported(self, exporter):
+        tracer = Tracer(exporter=exporter, sample_rate=0.0)
+
+        with tracer.start_span("update") as root:
+            with tracer.start_span("download"):
+                pass
+
+        assert root.sampled is False
+        exporter.export.assert_not_called()
+
+    def test_correlation_id_without_exporter(self):
+        tracer = Tracer(exporter=None, sample_rate=1.0)
+
+        with tracer.start_span("update") as root:
+            assert current_correlation_id() == root.trace_id
+
+    def test_file_exporter(self, tracer, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        tracer.exporter = FileSpanExporter(str(path))
+
+        with tracer.start_span("update", update_id=1):
+            with tracer.start_span("extract"):
+                pass
+
+        lines = path.read_text().splitlines()
+        assert len(lines) == 1
+        trace = json.loads(lines[0])
+        assert {s["name"] for s in trace["spans"]} == {"update", "extract"}
+        root = next(s for s in trace["spans"] if s["name"] == "update")
+        assert root["attributes"] == {"update_id": 1}
+
+    def test_otlp_payload(self, tracer, exporter):
+        with tracer.start_span("update", retries=2, ok=True):
+            with tracer.start_span("encode"):
+                pass
+        spans = exporter.export.call_args[0][0]
+
+        otlp = OTLPHttpExporter.__new__(OTLPHttpExporter)
+        otlp.service_name = "test"
+        payload = otlp.build_payload(spans)
+
+        otlp_spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert len(otlp_spans) == 2
+        encode = next(s for s in otlp_spans if s["name"] == "encode")
+        update = next(s for s in otlp_spans if s["name"] == "update")
+        assert encode["parentSpanId"] == update["spanId"]
+        assert {"key": "retries", "value": {"intValue": "2"}} in update["attributes"]
+        assert {"key": "ok", "value": {"boolValue": True}} in update["attributes"]
+
+    def test_log_filter_adds_correlation_id(self, tracer):
+        record = logging.LogRecord("x", logging.INFO, __file__, 1, "msg", None, None)
+        log_filter = CorrelationIdFilter()
+
+        log_filter.filter(record)
+        assert record.correlation_id == "-"
+
+        with tracer.start_span("update") as root:
+            log_filter.filter(record)
+        assert record.correlation_id == root.trace_id
@@ -0,0 +1,109 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from handlers import warmup
+from providers.youtube import YouTubeProvider
+
+
+def _provider(hosts=("example.com",)):
+    provider = MagicMock()
+    provider.HOSTS = hosts
+    provider.YTDLP_IE_KEYS = ("Generic",)
+    return provider
+
+
+class TestWarmupEnabled:
+    def test_disabled_by_default(self, monkeypatch):
+        monkeypatch.delenv("WARMUP", raising=False)
+        assert not warmup.warmup_enabled()
+
+    def test_enabled(self, monkeypatch):
+        monkeypatch.setenv("WARMUP", "1")
+        assert warmup.warmup_enabled()
+
+
+class TestSteps:
+    def test_warm_providers_fills_pools(self):
+        provider = YouTubeProvider()
+        with patch("providers.base.yt_dlp.YoutubeDL") as mock_ydl_class:
+            assert warmup.warm_providers([provider]) == 1
+        mock_ydl_class.assert_called_once()
+        assert len(provider._ydl_pool("Youtube")) == 1
+
+    def test_resolve_hosts_counts_successes(self):
+        def getaddrinfo(host, *args, **kwargs):
+            if host == "bad.invalid":
+                raise OSError("no such host")
+            return []
+
+        with patch("handlers.warmup.socket.getaddrinfo", side_effect=getaddrinfo):
+            assert warmup.resolve_hosts(["a.com", "bad.invalid", "b.com"]) == 2
+
+    def test_preconnect_uses_pooled_instance(self):
+        provider = _provider(hosts=("a.com", "b.com"))
+        ydl = (
+            provider._ydl_pool.return_value.acquire.return_value.__enter__.return_value
+        )
+        ydl.urlopen.side_effect = [MagicMock(), RuntimeError("403")]
+        assert warmup.preconnect([provider]) == 1
+        provider._ydl_pool.assert_called_with("Generic")
+        urls = [call.args[0].url for call in ydl.urlopen.call_args_list]
+        assert urls == ["https://a.com/", "https://b.com/"]
+        assert all(call.args[0].method == "HEAD" for call in ydl.urlopen.call_args_list)
+
+    def test_preconnect_paced_per_platform(self):
+        provider = YouTubeProvider()
+        with patch("providers.base.yt_dlp.YoutubeDL"), patch(
+            "providers.base.rate_limiters"
+        ) as limiters:
+            limiters.acquire.return_value = 0.0
+            warmup.preconnect([provider])
+        # Один токен на платформу, сколько бы хостов у неё ни было
+        limiters.acquire.assert_called_once()
+        assert limiters.acquire.call_args.args[:2] == ("youtube", "direct")
+
+    def test_probe_ffmpeg_runs_lavfi_probe(self):
+        with patch("handlers.warmup.subprocess.run") as run:
+            warmup.probe_ffmpeg()
+        cmd = run.call_args.args[0]
+        assert cmd[0] == "ffmpeg"
+        assert "lavfi" in cmd
+        assert run.call_args.kwargs["check"] is True
+
+
+class TestWarmUp:
+    @pytest.mark.asyncio
+    async def test_all_steps_timed(self):
+        bot = MagicMock()
+        bot.get_me = AsyncMock()
+        with patch.multiple(
+            "handlers.warmup",
+            warm_providers=MagicMock(return_value=1),
+            resolve_hosts=MagicMock(return_value=2),
+            preconnect=MagicMock(return_value=1),
+            probe_ffmpeg=MagicMock(return_value=None),
+        ):
+            report = await warmup.warm_up(bot, [_provider()])
+            hosts = warmup.resolve_hosts.call_args.args[0]
+
+        assert list(report) == ["extractors", "dns", "connect", "ffmpeg", "telegram"]
+        assert all(elapsed is not None for elapsed in report.values())
+        assert hosts == ["api.telegram.org", "example.com"]
+        bot.get_me.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_step_does_not_stop_warm_up(self):
+        bot = MagicMock()
+        bot.get_me = AsyncMock()
+        with patch.multiple(
+            "handlers.warmup",
+            warm_providers=MagicMock(return_value=1),
+            resolve_hosts=MagicMock(return_value=1),
+            preconnect=MagicMock(return_value=1),
+            probe_ffmpeg=MagicMock(side_effect=FileNotFoundError("ffmpeg")),
+        ):
+            report = await warmup.warm_up(bot, [_provider()])
+
+        assert report["ffmpeg"] is None
+        assert report["telegram"] is not None
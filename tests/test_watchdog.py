@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+import traceback
+
+import pytest
+
+from monitoring.watchdog import LOOP_BLOCKED, LoopWatchdog, describe_blocker
+
+
+def _blocking_caller(watchdog, result):
+    # Имитируем блокировку потока цикла, пока сторож проверяет его из другого потока
+    checker = threading.Thread(target=lambda: result.append(_check_later(watchdog)))
+    checker.start()
+    time.sleep(0.3)
+    checker.join()
+
+
+def _check_later(watchdog):
+    time.sleep(0.2)
+    return watchdog.check()
+
+
+class TestLoopWatchdog:
+
+    def test_percentiles(self):
+        watchdog = LoopWatchdog(interval=0.1, threshold=1.0)
+        for i in range(100):
+            watchdog.beat(i / 1000)
+
+        p = watchdog.percentiles()
+
+        assert p[0.5] == pytest.approx(0.05)
+        assert p[0.95] == pytest.approx(0.095)
+        assert p[0.99] == pytest.approx(0.099)
+
+    def test_percentiles_empty(self):
+        watchdog = LoopWatchdog(interval=0.1, threshold=1.0)
+
+        assert watchdog.percentiles() == {0.5: 0.0, 0.95: 0.0, 0.99: 0.0}
+
+    def test_check_without_loop(self):
+        watchdog = LoopWatchdog(interval=0.1, threshold=0.0)
+
+        assert watchdog.check() is None
+
+    def test_check_reports_blocking_function(self):
+        watchdog = LoopWatchdog(interval=0.01, threshold=0.05)
+        watchdog._loop_thread_id = threading.get_ident()
+        watchdog._last_beat = time.monotonic()
+        result = []
+
+        _blocking_caller(watchdog, result)
+
+        assert result and "_blocking_caller" in result[0]
+        assert "time.sleep" not in result[0]  # sleep — встроенная функция без кадра
+        assert LOOP_BLOCKED.value(function=result[0]) >= 1
+        # Повторно о той же блокировке не сообщаем
+        assert watchdog.check() is None
+
+    def test_describe_blocker_prefers_project_frame(self):
+        frames = [
+            traceback.FrameSummary("/root/project/main.py", 10, "handle"),
+            traceback.FrameSummary(__file__, 20, "download_video"),
+            traceback.FrameSummary("/usr/lib/python3/subprocess.py", 30, "run"),
+        ]
+
+        blocker = describe_blocker(frames)
+
+        assert blocker.startswith("subprocess.py:run ← ")
+        assert blocker.endswith("test_watchdog.py:download_video")
+
+    def test_describe_blocker_empty(self):
+        assert describe_blocker([]) == "unknown"
+
+    @pytest.mark.asyncio
+    async def test_run_records_lag(self):
+        watchdog = LoopWatchdog(interval=0.01, threshold=1.0)
+        task = asyncio.create_task(watchdog.run())
+        await asyncio.sleep(0.05)
+        watchdog.stop()
+        await asyncio.wait_for(task, timeout=1)
+
+        assert len(watchdog._samples) > 0
+        assert watchdog._loop_thread_id == threading.get_ident()
@@ -0,0 +1,88 @@
+from unittest.mock import MagicMock, patch
+
+import yt_dlp
+
+from providers.youtube import YouTubeProvider
+from providers.ytdlp_cache import CountingCache, cache_dir, install_cache, warm_cache
+
+
+class TestCacheDir:
+    def test_default_is_absolute(self, monkeypatch):
+        monkeypatch.delenv("YTDLP_CACHE_DIR", raising=False)
+        path = cache_dir()
+        assert path.endswith("ytdlp_cache")
+        assert path.startswith("/")
+
+    def test_empty_disables(self, monkeypatch):
+        monkeypatch.setenv("YTDLP_CACHE_DIR", "")
+        assert cache_dir() is False
+
+    def test_applied_to_provider_opts(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("YTDLP_CACHE_DIR", str(tmp_path))
+        opts = YouTubeProvider()._yt_opts("/tmp")
+        assert opts["cachedir"] == str(tmp_path)
+
+
+class TestCountingCache:
+    def _cache(self, tmp_path):
+        ydl = yt_dlp.YoutubeDL({"cachedir": str(tmp_path), "quiet": True})
+        install_cache(ydl)
+        return ydl.cache
+
+    def test_counts_hit_and_miss(self, tmp_path):
+        cache = self._cache(tmp_path)
+        assert isinstance(cache, CountingCache)
+        with patch("providers.ytdlp_cache.CACHE_LOOKUPS") as lookups:
+            assert cache.load("youtube-sigfuncs", "js_abc") is None
+            cache.store("youtube-sigfuncs", "js_abc", [3, 2, 1])
+            assert cache.load("youtube-sigfuncs", "js_abc") == [3, 2, 1]
+        lookups.inc.assert_any_call(cache="ytdlp:youtube-sigfuncs", result="miss")
+        lookups.inc.assert_any_call(cache="ytdlp:youtube-sigfuncs", result="hit")
+
+    def test_persists_across_instances(self, tmp_path):
+        self._cache(tmp_path).store("youtube-nsig", "player", {"a": 1})
+        assert self._cache(tmp_path).load("youtube-nsig", "player") == {"a": 1}
+
+    def test_disabled_cache_not_counted(self):
+        ydl = yt_dlp.YoutubeDL({"cachedir": False, "quiet": True})
+        install_cache(ydl)
+        with patch("providers.ytdlp_cache.CACHE_LOOKUPS") as lookups:
+            assert ydl.cache.load("youtube-sigfuncs", "js_abc") is None
+        lookups.inc.assert_not_called()
+
+
+class TestWarmCache:
+    def _provider(self):
+        provider = MagicMock()
+        provider.ytdlp_ie_key.return_value = "Youtube"
+        ydl = (
+            provider._ydl_pool.return_value.acquire.return_value.__enter__.return_value
+        )
+        return provider, ydl
+
+    def test_extracts_without_download(self):
+        provider, ydl = self._provider()
+        url = "https://www.youtube.com/watch?v=abc"
+        assert warm_cache(provider, url) is not None
+        provider._ydl_pool.assert_called_once_with("Youtube")
+        ydl.extract_info.assert_called_once_with(url, download=False, ie_key="Youtube")
+
+    def test_paced_before_extraction(self):
+        provider, ydl = self._provider()
+        calls = MagicMock()
+        calls.attach_mock(provider._pace, "pace")
+        calls.attach_mock(ydl.extract_info, "extract_info")
+        warm_cache(provider, "https://www.youtube.com/watch?v=abc")
+        assert [name for name, _, _ in calls.mock_calls] == ["pace", "extract_info"]
+
+    def test_disabled_by_empty_url(self, monkeypatch):
+        monkeypatch.setenv("YTDLP_CACHE_WARMUP_URL", "")
+        provider, _ = self._provider()
+        assert warm_cache(provider) is None
+        provider._ydl_pool.assert_not_called()
+        provider._pace.assert_not_called()
+
+    def test_failure_is_logged_not_raised(self):
+        provider, ydl = self._provider()
+        ydl.extract_info.side_effect = RuntimeError("offline")
+        assert warm_cache(provider, "https://www.youtube.com/watch?v=abc") is None
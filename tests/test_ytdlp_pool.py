@@ -0,0 +1,113 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+import yt_dlp
+
+from providers.errors import TOO_LONG, DownloadError
+from providers.ytdlp_pool import YoutubeDLPool, reset_job
+
+VIDEO = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 2048
+
+
+class _VideoHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(VIDEO)))
+        self.end_headers()
+
+    def do_GET(self):  # noqa: N802
+        self.do_HEAD()
+        self.wfile.write(VIDEO)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def video_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _VideoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+    server.shutdown()
+    server.server_close()
+
+
+def real_factory():
+    return yt_dlp.YoutubeDL(
+        {
+            "quiet": True,
+            "no_warnings": True,
+            "outtmpl": "%(id)s.%(ext)s",
+            "allowed_extractors": ["generic"],
+        }
+    )
+
+
+class TestYoutubeDLPool:
+
+    def test_reuses_instance_with_per_job_directory(self, video_url, tmp_path):
+        created = []
+
+        def factory():
+            created.append(real_factory())
+            return created[-1]
+
+        pool = YoutubeDLPool(factory, size=1)
+        for job in ("one", "two"):
+            home = tmp_path / job
+            home.mkdir()
+            with pool.acquire(str(home)) as ydl:
+                info = ydl.extract_info(video_url, download=False, ie_key="Generic")
+                ydl.process_ie_result(info, download=True)
+            assert os.listdir(home) == ["clip.mp4"]
+
+        assert len(created) == 1
+        assert created[0]._num_downloads == 0
+        assert "paths" not in created[0].params
+        pool.close()
+
+    def test_error_discards_instance(self):
+        ydl = MagicMock()
+        pool = YoutubeDLPool(lambda: ydl, size=2)
+
+        with pytest.raises(RuntimeError):
+            with pool.acquire("/tmp"):
+                raise RuntimeError("connection reset")
+
+        assert len(pool) == 0
+        ydl.close.assert_called_once()
+
+    def test_policy_rejection_keeps_instance(self):
+        pool = YoutubeDLPool(MagicMock, size=2)
+
+        with pytest.raises(DownloadError):
+            with pool.acquire("/tmp"):
+                raise DownloadError(TOO_LONG)
+
+        assert len(pool) == 1
+
+    def test_idle_size_is_capped(self):
+        pool = YoutubeDLPool(MagicMock, size=1)
+        with pool.acquire("/a") as first, pool.acquire("/b") as second:
+            assert first is not second
+
+        # Вложенный контекст вернулся первым и занял единственное место
+        assert len(pool) == 1
+        second.close.assert_not_called()
+        first.close.assert_called_once()
+
+    def test_reset_restores_format_selector(self):
+        ydl = MagicMock()
+        original = ydl.format_selector
+        ydl.format_selector = "best"
+        ydl._num_downloads = 3
+
+        reset_job(ydl, original)
+
+        assert ydl.format_selector is original
+        assert ydl._num_downloads == 0